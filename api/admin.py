@@ -8,6 +8,8 @@ admin.site.register(CryptoSymbols)
 admin.site.register(UserFeedback)
 admin.site.register(CryptoNews)
 admin.site.register(CryptoInsight)
+admin.site.register(TrackedCoin)
+admin.site.register(PredictionJob)
 
 
 # bitcoin history data
@@ -1,6 +1,26 @@
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        import api.coins  # noqa: F401, connects the tracked coin cache signals
+        from prometheus_client import REGISTRY
+
+        from api.cache_backends import CacheSizeCollector
+
+        try:
+            REGISTRY.register(CacheSizeCollector())
+        except ValueError:
+            # ready() ran before in this process (test runner, autoreload), the gauge is registered
+            pass
+
+        if settings.PREDICTION_MODEL_WARMUP:
+            from api.model_registry import registry
+
+            threading.Thread(target=registry.warm_up, name='model-warmup', daemon=True).start()
@@ -0,0 +1,120 @@
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from api import http_client
+from api.caching import aget_or_refresh
+from api.http_client import UpstreamError
+from api.views import (
+    CHART_PERIODS, MARKET_CAP_PARAMS, TOP_VOLUME_PARAMS, coin_summary, trending_summary,
+)
+
+# Async versions of the CoinGecko proxy views for an ASGI server. While CoinGecko answers, the
+# request waits on the event loop instead of holding a worker thread. They share cache entries
+# with the sync views and return the same payloads.
+
+
+def request_data(request):
+    """Body of a POST as request.data would parse it: JSON or form. None for malformed JSON."""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+async def fetch_crypto_data(request):
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+    coin = data.get("coin")
+    if not coin:
+        return JsonResponse({"error": "Coin parameter is required"}, status=400)
+
+    async def fetch():
+        return coin_summary(await http_client.aget_json('coingecko', f"/coins/{coin}"))
+
+    try:
+        coin_data = await aget_or_refresh(f"crypto_{coin}", fetch, timeout=7200, stale_timeout=3600)
+    except UpstreamError as e:
+        return JsonResponse({"error": "Failed to fetch data from API"}, status=e.status_code)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    return JsonResponse(coin_data)
+
+
+@csrf_exempt
+@require_POST
+async def fetch_crypto_chart(request):
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+    coin = data.get("coin")
+    period = data.get("period", "week")
+    if not coin:
+        return JsonResponse({"error": "Coin parameter is required"}, status=400)
+    if period not in CHART_PERIODS:
+        return JsonResponse({"error": "Invalid period"}, status=400)
+
+    days = CHART_PERIODS[period]
+    params = {"vs_currency": "usd", "days": days, "interval": "daily"}
+
+    async def fetch():
+        data = await http_client.aget_json('coingecko', f"/coins/{coin}/market_chart", params=params)
+        return data.get("prices", [])
+
+    try:
+        prices = await aget_or_refresh(f"crypto_history_{coin}_{days}", fetch, timeout=600, stale_timeout=3600)
+    except UpstreamError as e:
+        return JsonResponse({"error": "Failed to fetch historical data from API"}, status=e.status_code)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    if not prices:
+        return JsonResponse({"error": "No historical data available"}, status=404)
+    return JsonResponse({"chart": prices})
+
+
+async def cached_coingecko(key, fetch):
+    """Cached list endpoint as the sync views serve it: 300 s fresh, an hour stale."""
+    try:
+        data = await aget_or_refresh(key, fetch, timeout=300, stale_timeout=3600)
+    except UpstreamError as e:
+        return JsonResponse({"error": "Failed to fetch data from API"}, status=e.status_code)
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+async def top_volume_coins(request):
+    async def fetch():
+        return await http_client.aget_json('coingecko', '/coins/markets', params=TOP_VOLUME_PARAMS)
+
+    return await cached_coingecko('top_volume_coins', fetch)
+
+
+@require_GET
+async def trending_coins(request):
+    async def fetch():
+        return trending_summary(await http_client.aget_json('coingecko', '/search/trending'))
+
+    return await cached_coingecko('trending_coins', fetch)
+
+
+@require_GET
+async def market_cap_rankings(request):
+    async def fetch():
+        return await http_client.aget_json('coingecko', '/coins/markets', params=MARKET_CAP_PARAMS)
+
+    return await cached_coingecko('market_cap_rankings', fetch)
+
+
+@require_GET
+async def top_exchanges(request):
+    async def fetch():
+        return (await http_client.aget_json('coingecko', '/exchanges'))[:10]
+
+    return await cached_coingecko('top_exchanges', fetch)
@@ -0,0 +1,90 @@
+from django.core.cache import caches
+from django.core.cache.backends import filebased, locmem, redis
+from django_prometheus.cache.metrics import (
+    django_cache_get_fail_total,
+    django_cache_get_total,
+    django_cache_hits_total,
+    django_cache_misses_total,
+)
+from django_prometheus.conf import NAMESPACE
+from prometheus_client.core import GaugeMetricFamily
+
+MISSING = object()
+
+
+class MetricsMixin:
+    """
+    Counts hits and misses on the django_prometheus cache counters. Their own
+    backends take a cached falsy value for a miss and need django-redis.
+    """
+
+    metrics_label = None
+
+    def get(self, key, default=None, version=None):
+        django_cache_get_total.labels(backend=self.metrics_label).inc()
+        try:
+            value = super().get(key, MISSING, version=version)
+        except Exception:
+            django_cache_get_fail_total.labels(backend=self.metrics_label).inc()
+            raise
+        if value is MISSING:
+            django_cache_misses_total.labels(backend=self.metrics_label).inc()
+            return default
+        django_cache_hits_total.labels(backend=self.metrics_label).inc()
+        return value
+
+    def entry_count(self):
+        """Entries stored, None when the backend can't count them."""
+        return None
+
+
+class LocMemCache(MetricsMixin, locmem.LocMemCache):
+    """Per process, only for development or a single worker."""
+
+    metrics_label = 'locmem'
+
+    def entry_count(self):
+        return len(self._cache)
+
+
+class FileBasedCache(MetricsMixin, filebased.FileBasedCache):
+    """Shared by the workers of one host through a directory."""
+
+    metrics_label = 'filebased'
+
+    def entry_count(self):
+        return len(self._list_cache_files())
+
+
+class RedisCache(MetricsMixin, redis.RedisCache):
+    metrics_label = 'redis'
+
+    def entry_count(self):
+        # Whole database, give the cache a database of its own
+        return self._cache.get_client().dbsize()
+
+
+class CacheSizeCollector:
+    """Entries held by every configured cache, read when Prometheus scrapes."""
+
+    def gauge(self):
+        name = f'{NAMESPACE}_django_cache_entries' if NAMESPACE else 'django_cache_entries'
+        return GaugeMetricFamily(name, 'Entries stored in the cache', labels=['cache', 'backend'])
+
+    def describe(self):
+        # Keeps the registry from calling collect() at registration
+        yield self.gauge()
+
+    def collect(self):
+        gauge = self.gauge()
+        for alias in caches.settings:
+            backend = caches[alias]
+            if isinstance(backend, MetricsMixin):
+                try:
+                    entries = backend.entry_count()
+                except Exception:
+                    # An unreachable cache must not break the whole scrape
+                    continue
+                if entries is not None:
+                    gauge.add_metric([alias, backend.metrics_label], entries)
+        yield gauge
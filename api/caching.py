@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from api import http_client
+
+# How long a worker may hold the fetch lock of a key, and how often the others look for its result
+LOCK_TIMEOUT = 30
+POLL_INTERVAL = 0.05
+
+MISSING = object()
+
+# Value stored by get_or_refresh, served without a refresh until `fresh_until` (epoch seconds)
+Entry = namedtuple('Entry', ['value', 'fresh_until'])
+
+_refresh_executor = ThreadPoolExecutor(max_workers=settings.CACHE_REFRESH_WORKERS, thread_name_prefix='cache-refresh')
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _key_lock(key):
+    """Per-key lock for the threads of this process, dropped once nobody holds or waits for it."""
+    with _locks_guard:
+        entry = _locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[key]
+
+
+def get_or_set(key, fetch, timeout, lock_timeout=LOCK_TIMEOUT):
+    """
+    Cached value of `key`. On a miss only one caller runs `fetch()` and stores
+    its result for `timeout` seconds, concurrent callers wait for that result
+    instead of going upstream as well: threads of this process on a local
+    lock, other workers on a `cache.add` lock held for at most `lock_timeout`.
+    If `fetch` raises nothing is cached and the error propagates.
+    """
+    value = cache.get(key, MISSING)
+    if value is not MISSING:
+        return value
+
+    with _key_lock(key):
+        # The thread we waited for has stored it
+        value = cache.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        return _fetch_once(key, fetch, timeout, lock_timeout)
+
+
+def _fetch_once(key, fetch, timeout, lock_timeout):
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + lock_timeout
+
+    while not cache.add(lock_key, token, lock_timeout):
+        # Another worker is fetching
+        time.sleep(POLL_INTERVAL)
+        values = cache.get_many([key, lock_key])
+        if key in values:
+            return values[key]
+        if time.monotonic() > deadline:
+            # Its lock should have expired by now, don't wait any longer
+            break
+
+    try:
+        value = fetch()
+        cache.set(key, value, timeout)
+        return value
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def _refresh_job(key, fetch, timeout, stale_timeout, lock_key):
+    close_old_connections()
+    try:
+        cache.set(key, Entry(fetch(), time.time() + timeout), timeout + stale_timeout)
+    except Exception as e:
+        # The stale value stays until its hard expiry, the next request past the soft one tries again
+        print(f"[cache refresh] {key}: {e}")
+    finally:
+        cache.delete(lock_key)
+        close_old_connections()
+
+
+def get_or_refresh(key, fetch, timeout, stale_timeout, lock_timeout=LOCK_TIMEOUT):
+    """
+    Stale-while-revalidate version of get_or_set. The value is fresh for
+    `timeout` seconds and may be served stale for `stale_timeout` more: a
+    caller past the soft expiry gets it at once while one background refresh
+    per key (across workers, through a `cache.add` lock) fetches the new one.
+    Only a miss, after the hard expiry, waits for `fetch` as in get_or_set.
+    """
+    entry = cache.get(key)
+    if not isinstance(entry, Entry):
+        entry = get_or_set(key, lambda: Entry(fetch(), time.time() + timeout), timeout + stale_timeout, lock_timeout)
+        return entry.value
+
+    if time.time() >= entry.fresh_until:
+        lock_key = f'{key}:refresh'
+        if cache.add(lock_key, 1, lock_timeout):
+            _refresh_executor.submit(_refresh_job, key, fetch, timeout, stale_timeout, lock_key)
+    return entry.value
+
+
+# Running fetches of aget_or_set by key
+_tasks = {}
+
+
+async def aget_or_set(key, fetch, timeout, lock_timeout=LOCK_TIMEOUT):
+    """get_or_set for coroutines, `fetch` is a coroutine function. Callers on one event loop share its task."""
+    value = await cache.aget(key, MISSING)
+    if value is not MISSING:
+        return value
+
+    task = _tasks.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_afetch_once(key, fetch, timeout, lock_timeout))
+        _tasks[key] = task
+        task.add_done_callback(lambda done: _tasks.pop(key) if _tasks.get(key) is done else None)
+    # A cancelled caller must not cancel the fetch the others wait for
+    return await asyncio.shield(task)
+
+
+async def _afetch_once(key, fetch, timeout, lock_timeout):
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + lock_timeout
+
+    while not await cache.aadd(lock_key, token, lock_timeout):
+        await asyncio.sleep(POLL_INTERVAL)
+        values = await cache.aget_many([key, lock_key])
+        if key in values:
+            return values[key]
+        if time.monotonic() > deadline:
+            break
+
+    try:
+        value = await fetch()
+        await cache.aset(key, value, timeout)
+        return value
+    finally:
+        if await cache.aget(lock_key) == token:
+            await cache.adelete(lock_key)
+
+
+async def _arefresh(key, fetch, timeout, stale_timeout, lock_key):
+    try:
+        await cache.aset(key, Entry(await fetch(), time.time() + timeout), timeout + stale_timeout)
+    except Exception as e:
+        print(f"[cache refresh] {key}: {e}")
+    finally:
+        await cache.adelete(lock_key)
+        await http_client.aclose_async_client()
+
+
+def _arefresh_job(key, fetch, timeout, stale_timeout, lock_key):
+    # A loop of its own: a task on the caller's loop would be cancelled with it when that loop
+    # only lives for one request (async_to_sync)
+    close_old_connections()
+    try:
+        asyncio.run(_arefresh(key, fetch, timeout, stale_timeout, lock_key))
+    finally:
+        close_old_connections()
+
+
+async def aget_or_refresh(key, fetch, timeout, stale_timeout, lock_timeout=LOCK_TIMEOUT):
+    """
+    get_or_refresh for coroutines, `fetch` is a coroutine function. Entries are
+    shared with get_or_refresh; the refresh runs on the same background threads.
+    """
+    entry = await cache.aget(key)
+    if not isinstance(entry, Entry):
+        async def fetch_entry():
+            return Entry(await fetch(), time.time() + timeout)
+
+        entry = await aget_or_set(key, fetch_entry, timeout + stale_timeout, lock_timeout)
+        return entry.value
+
+    if time.time() >= entry.fresh_until:
+        lock_key = f'{key}:refresh'
+        if await cache.aadd(lock_key, 1, lock_timeout):
+            _refresh_executor.submit(_arefresh_job, key, fetch, timeout, stale_timeout, lock_key)
+    return entry.value
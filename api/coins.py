@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.models import TrackedCoin
+
+TRACKED_COINS_CACHE_KEY = 'tracked_coins'
+TRACKED_COINS_TIMEOUT = 300
+
+# Response of AllCoinDetailListView, dropped whenever the snapshots are refreshed
+ALL_COIN_DETAILS_CACHE_KEY = 'all_coin_details'
+
+
+def tracked_coins():
+    """Active TrackedCoin rows, cached briefly since every view and command asks for them."""
+    coins = cache.get(TRACKED_COINS_CACHE_KEY)
+    if coins is None:
+        coins = list(TrackedCoin.objects.filter(active=True))
+        cache.set(TRACKED_COINS_CACHE_KEY, coins, TRACKED_COINS_TIMEOUT)
+    return coins
+
+
+@receiver(post_save, sender=TrackedCoin)
+@receiver(post_delete, sender=TrackedCoin)
+def forget_tracked_coins(**kwargs):
+    cache.delete(TRACKED_COINS_CACHE_KEY)
+
+
+def tracked_symbols():
+    return [coin.symbol for coin in tracked_coins()]
+
+
+def get_coin(symbol):
+    """Tracked coin by Binance pair (BTCUSDT) or base asset (BTC), None when not tracked."""
+    symbol = symbol.upper()
+    for coin in tracked_coins():
+        if symbol in (coin.symbol, coin.base_asset):
+            return coin
+    return None
+
+
+def is_tracked(symbol):
+    symbol = symbol.upper()
+    return any(coin.symbol == symbol for coin in tracked_coins())
+
+
+def forget_coin_snapshots():
+    cache.delete(ALL_COIN_DETAILS_CACHE_KEY)
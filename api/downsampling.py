@@ -0,0 +1,45 @@
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Indices of the `threshold` points Largest-Triangle-Three-Buckets keeps
+    from the series (x, y). `x` must be increasing. The first and last points
+    are always kept, every bucket in between keeps the point that forms the
+    largest triangle with the previously kept point and the mean of the next
+    bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket bounds and next-bucket means for every bucket at once. Integer arithmetic: a float
+    # bucket width can floor an exact edge one point short.
+    edges = np.arange(threshold - 1, dtype=np.int64) * (n - 2) // (threshold - 2) + 1
+    starts, ends = edges[:-1], edges[1:]
+    next_starts, next_ends = ends, np.append(ends[1:], n)
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    counts = next_ends - next_starts
+    mean_x = (x_sums[next_ends] - x_sums[next_starts]) / counts
+    mean_y = (y_sums[next_ends] - y_sums[next_starts]) / counts
+
+    # Each pick depends on the previous one, so only this walk is sequential
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket, (start, end) in enumerate(zip(starts, ends)):
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - mean_x[bucket]) * (by - y[a]) - (x[a] - bx) * (mean_y[bucket] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return selected
+
+
+def lttb(x, y, threshold):
+    """Downsample (x, y) to at most `threshold` points, returns the kept (x, y) arrays."""
+    x, y = np.asarray(x), np.asarray(y)
+    keep = lttb_indices(x, y, threshold)
+    return x[keep], y[keep]
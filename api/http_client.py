@@ -0,0 +1,186 @@
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from api.ratelimit import SharedTokenBucket
+
+# Retried with exponential backoff (or the Retry-After header); Binance answers 418 to clients
+# that kept going after a 429.
+RETRY_STATUSES = (418, 429, 500, 502, 503, 504)
+
+
+class CappedRetry(Retry):
+    """
+    Retry-After honoured up to HTTP_MAX_RETRY_AFTER seconds: the retries sleep in
+    the request's thread, a provider asking for a minute must not hold a worker that long.
+    """
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, settings.HTTP_MAX_RETRY_AFTER)
+
+
+class UpstreamError(Exception):
+    """A provider answered with an error status."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ProviderSession(requests.Session):
+    """
+    Session bound to one provider. URLs without a scheme are resolved against
+    `base_url`, every request waits for `weight` tokens of `limiter` and gets
+    the default `timeout` unless one is passed. Connections are kept alive in a
+    pool of `pool_size` per host, retries happen inside urllib3 and are not
+    charged to the limiter.
+    """
+
+    def __init__(self, base_url, limiter, timeout=None, pool_size=None, retries=None):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self.limiter = limiter
+        self.timeout = timeout or (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+
+        retry = CappedRetry(
+            total=settings.HTTP_MAX_RETRIES if retries is None else retries,
+            backoff_factor=0.5,
+            backoff_max=settings.HTTP_MAX_RETRY_AFTER,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=['GET', 'HEAD'],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_size or settings.HTTP_POOL_SIZE, max_retries=retry)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, weight=1, **kwargs):
+        if '://' not in url:
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        self.limiter.acquire(weight)
+        return super().request(method, url, **kwargs)
+
+
+_sessions = {}
+_limiters = {}
+_lock = threading.Lock()
+_pid = None
+
+
+def limiter(provider):
+    """Rate limiter of `provider`, shared with every other process on the host."""
+    with _lock:
+        if provider not in _limiters:
+            config = settings.HTTP_PROVIDERS[provider]
+            path = os.path.join(settings.HTTP_RATE_LIMIT_DIR, f'{provider}.bucket')
+            _limiters[provider] = SharedTokenBucket(path, config['rate'], config.get('capacity'))
+        return _limiters[provider]
+
+
+def session(provider):
+    """Pooled session of `provider`, one per process and shared by its threads."""
+    global _pid
+    bucket = limiter(provider)
+    with _lock:
+        # Pooled sockets must not be shared with the parent of a forked worker
+        if _pid != os.getpid():
+            _sessions.clear()
+            _pid = os.getpid()
+        if provider not in _sessions:
+            _sessions[provider] = ProviderSession(settings.HTTP_PROVIDERS[provider]['base_url'], bucket)
+        return _sessions[provider]
+
+
+def get(provider, url, **kwargs):
+    """GET `url` (absolute or relative to the provider's base URL), see ProviderSession.request."""
+    return session(provider).get(url, **kwargs)
+
+
+def get_json(provider, url, **kwargs):
+    """Decoded JSON body of a GET, raises UpstreamError unless the provider answered 200."""
+    response = get(provider, url, **kwargs)
+    if response.status_code != 200:
+        raise UpstreamError(f'{provider} answered {response.status_code} for {url}', response.status_code)
+    return response.json()
+
+
+# httpx.AsyncClient of each event loop, its connections can't be used from another loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def async_client():
+    """httpx.AsyncClient shared by every coroutine of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=settings.HTTP_ASYNC_POOL_SIZE),
+            )
+    return client
+
+
+async def aclose_async_client():
+    """Close the client of the running loop. Loops that end before the process (asyncio.run) must call it."""
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def retry_delay(response, attempt):
+    """Seconds before retrying `response`: Retry-After or the backoff, at most HTTP_MAX_RETRY_AFTER."""
+    try:
+        delay = float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        delay = 0.5 * 2 ** attempt
+    return min(max(delay, 0), settings.HTTP_MAX_RETRY_AFTER)
+
+
+async def aget(provider, url, weight=1, **kwargs):
+    """`get` for coroutines: same base URL, rate limiter, timeouts and retries, on the shared httpx client."""
+    if '://' not in url:
+        url = f"{settings.HTTP_PROVIDERS[provider]['base_url'].rstrip('/')}/{url.lstrip('/')}"
+    return await aget_with_retries(async_client(), limiter(provider), url, weight, **kwargs)
+
+
+async def aget_with_retries(client, bucket, url, weight=1, **kwargs):
+    """
+    GET `url` on the httpx `client`, `weight` tokens of `bucket` per attempt. Transport
+    errors and RETRY_STATUSES are retried HTTP_MAX_RETRIES times, after retry_delay;
+    the last response is returned whatever its status.
+    """
+    for attempt in range(settings.HTTP_MAX_RETRIES + 1):
+        await bucket.acquire_async(weight)
+        try:
+            response = await client.get(url, **kwargs)
+        except httpx.TransportError:
+            if attempt == settings.HTTP_MAX_RETRIES:
+                raise
+            await asyncio.sleep(min(0.5 * 2 ** attempt, settings.HTTP_MAX_RETRY_AFTER))
+            continue
+
+        if response.status_code not in RETRY_STATUSES or attempt == settings.HTTP_MAX_RETRIES:
+            return response
+        await asyncio.sleep(retry_delay(response, attempt))
+
+
+async def aget_json(provider, url, **kwargs):
+    """Async get_json."""
+    response = await aget(provider, url, **kwargs)
+    if response.status_code != 200:
+        raise UpstreamError(f'{provider} answered {response.status_code} for {url}', response.status_code)
+    return response.json()
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from api import http_client
+from api.market_data import DAY_MS, KLINES_LIMIT, KLINES_WEIGHT, MarketDataError
+from api.ratelimit import TokenBucket
+
+def split_ranges(start_time, end_time, limit=KLINES_LIMIT):
+    """Split [start_time, end_time) into ranges of at most `limit` daily candles."""
+    ranges = []
+    span = limit * DAY_MS
+    while start_time < end_time:
+        ranges.append((start_time, min(start_time + span, end_time)))
+        start_time += span
+    return ranges
+
+
+async def fetch_range(client, bucket, base_url, symbol, start_time, end_time):
+    """Fetch the daily klines of `symbol` opening within [start_time, end_time)."""
+    candles = []
+    while start_time < end_time:
+        params = {
+            'symbol': symbol,
+            'interval': '1d',
+            'startTime': start_time,
+            'endTime': end_time - 1,
+            'limit': KLINES_LIMIT,
+        }
+
+        # Same retries as http_client.aget, Retry-After capped at HTTP_MAX_RETRY_AFTER
+        response = await http_client.aget_with_retries(
+            client, bucket, f'{base_url}/api/v3/klines', weight=KLINES_WEIGHT, params=params)
+        if response.status_code in http_client.RETRY_STATUSES:
+            response.raise_for_status()
+
+        data = response.json()
+        if isinstance(data, dict):
+            raise MarketDataError(data.get('msg', f'Failed to fetch Binance data for {symbol}.'))
+        if not data:
+            break
+
+        candles.extend(data)
+        if len(data) < KLINES_LIMIT:
+            break
+        start_time = data[-1][0] + DAY_MS
+    return candles
+
+
+async def fetch_klines_concurrently(jobs, writer, concurrency=4, base_url=None,
+                                    weight_per_minute=None, queue_size=8):
+    """
+    Fetch daily klines for many symbols at once.
+
+    `jobs` maps symbol -> (start_time, end_time) in ms. Every job is split into
+    1000-candle ranges that are fetched concurrently (at most `concurrency`
+    requests in flight, paced by the shared Binance request weight budget of
+    api.http_client, or by a private bucket when `weight_per_minute` is given).
+    Finished ranges go through a bounded queue to a single writer, called as
+    ``writer(symbol, start_time, end_time, candles, error)`` from one thread
+    so it can use the ORM.
+    """
+    base_url = base_url or settings.BINANCE_API_URL
+    if weight_per_minute:
+        bucket = TokenBucket(weight_per_minute / 60, capacity=KLINES_WEIGHT * concurrency)
+    else:
+        bucket = http_client.limiter('binance')
+    semaphore = asyncio.Semaphore(concurrency)
+    queue = asyncio.Queue(maxsize=queue_size)
+    write = sync_to_async(writer, thread_sensitive=True)
+
+    timeout = httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT)
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        async def produce(symbol, start_time, end_time):
+            candles, error = None, None
+            async with semaphore:
+                try:
+                    candles = await fetch_range(client, bucket, base_url, symbol, start_time, end_time)
+                except (httpx.HTTPError, MarketDataError, ValueError) as e:
+                    error = e
+            await queue.put((symbol, start_time, end_time, candles, error))
+
+        async def consume():
+            # Keep draining after a writer failure so producers never block on a full queue
+            failure = None
+            while True:
+                item = await queue.get()
+                if item is None:
+                    if failure is not None:
+                        raise failure
+                    return
+                if failure is None:
+                    try:
+                        await write(*item)
+                    except Exception as e:
+                        failure = e
+
+        consumer = asyncio.create_task(consume())
+        try:
+            await asyncio.gather(*(
+                produce(symbol, range_start, range_end)
+                for symbol, (start_time, end_time) in jobs.items()
+                for range_start, range_end in split_ranges(start_time, end_time)
+            ))
+        finally:
+            await queue.put(None)
+            await consumer
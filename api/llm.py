@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from prometheus_client import Counter, Histogram
+
+from api.models import LLMResponse
+
+# Every chat completion of the app goes through here: at most LLM_MAX_CONCURRENCY calls run at once,
+# identical requests in flight share one call, and answers are kept in LLMResponse for
+# LLM_CACHE_TTL seconds, so a repeated prompt costs nothing after a restart either.
+
+Completion = namedtuple('Completion', ['content', 'prompt_tokens', 'completion_tokens'])
+
+llm_requests = Counter(
+    'llm_requests_total', 'Chat completions asked of the gateway, by how they were answered',
+    ['model', 'result'],  # result: cached, shared, called, error
+)
+llm_latency = Histogram(
+    'llm_request_latency_seconds', 'Time the LLM backend took to answer',
+    ['model', 'backend'], buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+llm_tokens = Counter('llm_tokens_total', 'Tokens used by LLM backend calls', ['model', 'type'])
+
+
+class OpenAIBackend:
+    name = 'openai'
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        # Created on first use, so importing the gateway needs neither the key nor the network
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+
+                self._client = OpenAI(timeout=settings.LLM_TIMEOUT, max_retries=settings.LLM_MAX_RETRIES)
+            return self._client
+
+    def complete(self, model, messages, **params):
+        response = self.client().chat.completions.create(model=model, messages=messages, **params)
+        usage = response.usage
+        return Completion(
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
+
+
+class StubBackend:
+    """Offline backend for tests and local runs: answers with `reply(messages)` after `latency` seconds."""
+
+    name = 'stub'
+
+    def __init__(self, reply=None, latency=0.0):
+        self.reply = reply or (lambda messages: f"[stub] {request_key('stub', 'stub', messages)[:12]}")
+        self.latency = latency
+        self.calls = 0
+
+    def complete(self, model, messages, **params):
+        self.calls += 1
+        time.sleep(self.latency)
+        content = self.reply(messages)
+        prompt_tokens = sum(len(message['content'].split()) for message in messages)
+        return Completion(content, prompt_tokens, len(content.split()))
+
+
+BACKENDS = {
+    'openai': OpenAIBackend,
+    'stub': lambda: StubBackend(latency=settings.LLM_STUB_LATENCY),
+}
+
+_backend = None
+_executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONCURRENCY, thread_name_prefix='llm')
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[settings.LLM_BACKEND]()
+    return _backend
+
+
+def set_backend(backend):
+    """Swap the backend, e.g. StubBackend(reply=...) in a test. Returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+def request_key(backend, model, messages, **params):
+    # The backend is part of the key: stub answers must never be served as real ones
+    payload = json.dumps(
+        {'backend': backend, 'model': model, 'messages': messages, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _call(backend, key, model, messages, params, cache):
+    if cache:
+        cutoff = timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL)
+        content = LLMResponse.objects.filter(key=key, created_at__gte=cutoff) \
+            .values_list('content', flat=True).first()
+        if content is not None:
+            llm_requests.labels(model=model, result='cached').inc()
+            return content
+
+    start = time.perf_counter()
+    try:
+        completion = backend.complete(model, messages, **params)
+    except Exception:
+        llm_requests.labels(model=model, result='error').inc()
+        raise
+    llm_latency.labels(model=model, backend=backend.name).observe(time.perf_counter() - start)
+    llm_requests.labels(model=model, result='called').inc()
+    llm_tokens.labels(model=model, type='prompt').inc(completion.prompt_tokens)
+    llm_tokens.labels(model=model, type='completion').inc(completion.completion_tokens)
+
+    if cache:
+        LLMResponse.objects.bulk_create([
+            LLMResponse(
+                key=key, model=model, content=completion.content, created_at=timezone.now(),
+                prompt_tokens=completion.prompt_tokens, completion_tokens=completion.completion_tokens,
+            ),
+        ], update_conflicts=True, unique_fields=['key'],
+            update_fields=['content', 'created_at', 'prompt_tokens', 'completion_tokens'])
+    return completion.content
+
+
+def _job(backend, key, model, messages, params, cache):
+    close_old_connections()
+    try:
+        return _call(backend, key, model, messages, params, cache)
+    finally:
+        close_old_connections()
+
+
+def _forget(key, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def submit(messages, model=None, cache=True, **params):
+    """
+    Chat completion of `messages` in the gateway pool, returns a future of the
+    answer's text. `params` (temperature, max_tokens...) go to the backend and
+    are part of the cache key.
+    """
+    model = model or settings.LLM_MODEL
+    backend = get_backend()
+    key = request_key(backend.name, model, messages, **params)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            llm_requests.labels(model=model, result='shared').inc()
+            return future
+        future = _executor.submit(_job, backend, key, model, messages, params, cache)
+        _inflight[key] = future
+    future.add_done_callback(lambda done: _forget(key, done))
+    return future
+
+
+def complete(messages, model=None, cache=True, **params):
+    return submit(messages, model=model, cache=cache, **params).result()
+
+
+async def acomplete(messages, model=None, cache=True, **params):
+    return await asyncio.wrap_future(submit(messages, model=model, cache=cache, **params))
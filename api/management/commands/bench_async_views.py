@@ -0,0 +1,121 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import httpx
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.bench_cache_stampede import StubCoinGeckoHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'{process.args[0]} exited with {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'{process.args[0]} did not start listening on {port}')
+
+
+async def load(url, requests, concurrency):
+    """POST `requests` FetchCryptoData requests for distinct coins, so every one goes upstream."""
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, failures = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        # The first request imports the URLconf and the views
+        await client.post(url, json={'coin': 'warm-up'})
+
+        async def one(i):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(url, json={'coin': f'coin-{i}-{time.time_ns()}'})
+                timings.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return time.perf_counter() - start, timings, failures
+
+
+class Command(BaseCommand):
+    help = ('Concurrent FetchCryptoData requests against the sync views under gunicorn (gthread) and '
+            'the async views under uvicorn, one process each, with a local CoinGecko stub')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--threads', type=int, default=8, help='gunicorn threads of the sync process')
+        parser.add_argument('--latency', type=float, default=0.3, help='Stub response time in seconds')
+
+    def handle(self, *args, **options):
+        StubCoinGeckoHandler.latency = options['latency']
+        stub = StubServer(('127.0.0.1', 0), StubCoinGeckoHandler)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+        rate_limit_dir = tempfile.mkdtemp()
+        env = dict(
+            os.environ,
+            COINGECKO_API_URL=f'http://127.0.0.1:{stub.server_port}/api/v3',
+            COINGECKO_RATE_PER_SECOND='1000000',
+            HTTP_RATE_LIMIT_DIR=rate_limit_dir,
+            DJANGO_SETTINGS_MODULE='backend.settings',
+        )
+        servers = [
+            ('sync, gunicorn', '/api/v1/fetchCryptoData/', lambda port: [
+                sys.executable, '-m', 'gunicorn', 'backend.wsgi', '--workers', '1',
+                '--threads', str(options['threads']), '--bind', f'127.0.0.1:{port}',
+            ]),
+            ('async, uvicorn', '/api/v1/async/fetchCryptoData/', lambda port: [
+                sys.executable, '-m', 'uvicorn', 'backend.asgi:application', '--workers', '1',
+                '--port', str(port), '--log-level', 'warning', '--no-access-log',
+            ]),
+        ]
+
+        self.stdout.write(f"{options['requests']} requests, {options['concurrency']} concurrent, "
+                          f"stub latency {options['latency'] * 1000:.0f} ms, one server process each")
+        try:
+            for name, path, command in servers:
+                port = free_port()
+                process = subprocess.Popen(command(port), cwd=settings.BASE_DIR, env=env,
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                try:
+                    wait_for_port(port, process)
+                    elapsed, timings, failures = asyncio.run(
+                        load(f'http://127.0.0.1:{port}{path}', options['requests'], options['concurrency']))
+                finally:
+                    process.terminate()
+                    process.wait()
+
+                p50, p99 = np.percentile(timings, [50, 99]) * 1000
+                self.stdout.write(
+                    f"  {name:15}: {len(timings) / elapsed:7.1f} req/s, p50 {p50:7.1f} ms, "
+                    f"p99 {p99:7.1f} ms, {failures} failed")
+        finally:
+            stub.shutdown()
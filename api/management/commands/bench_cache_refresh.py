@@ -0,0 +1,89 @@
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from api import http_client
+from api.caching import get_or_refresh, get_or_set
+from api.management.commands.bench_cache_stampede import StubCoinGeckoHandler
+
+# Entry and locks of the benchmarked key, see api.caching
+BENCH_KEYS = ['bench_rankings', 'bench_rankings:lock', 'bench_rankings:refresh']
+
+
+class Command(BaseCommand):
+    help = ('Steady load on one CoinGecko-backed cache key with a short TTL, latency percentiles of '
+            'get_or_set (hard expiry) against get_or_refresh (stale-while-revalidate), against a local stub')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of load per strategy')
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--timeout', type=float, default=1, help='Cache timeout (soft expiry) in seconds')
+        parser.add_argument('--latency', type=float, default=0.2, help='Stub response time in seconds')
+
+    def handle(self, *args, **options):
+        StubCoinGeckoHandler.latency = options['latency']
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubCoinGeckoHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        providers = dict(settings.HTTP_PROVIDERS)
+        providers['coingecko'] = {
+            'base_url': f'http://127.0.0.1:{server.server_port}/api/v3',
+            'rate': 1e6,
+            'capacity': 1e6,
+        }
+        params = {'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': 10, 'page': 1}
+
+        def fetch():
+            return http_client.get_json('coingecko', '/coins/markets', params=params)
+
+        timeout = options['timeout']
+        strategies = [
+            ('get_or_set', lambda: get_or_set('bench_rankings', fetch, timeout=timeout)),
+            ('get_or_refresh', lambda: get_or_refresh('bench_rankings', fetch, timeout=timeout,
+                                                      stale_timeout=3600)),
+        ]
+
+        self.stdout.write(f"{options['clients']} clients for {options['duration']:.0f} s per strategy, "
+                          f"timeout {timeout} s, stub latency {options['latency'] * 1000:.0f} ms")
+        try:
+            with tempfile.TemporaryDirectory() as directory, \
+                    override_settings(HTTP_PROVIDERS=providers, HTTP_RATE_LIMIT_DIR=directory):
+                for name, call in strategies:
+                    self.load(name, call, options)
+        finally:
+            server.shutdown()
+            cache.delete_many(BENCH_KEYS)
+
+    def load(self, name, call, options):
+        # Only the benchmark's own keys: the configured cache may be the one production uses
+        cache.delete_many(BENCH_KEYS)
+        call()
+        StubCoinGeckoHandler.calls.clear()
+        timings = []
+        deadline = time.monotonic() + options['duration']
+
+        def client():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                call()
+                timings.append(time.perf_counter() - start)
+                time.sleep(0.005)
+
+        threads = [threading.Thread(target=client) for _ in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        p50, p99, p999 = np.percentile(timings, [50, 99, 99.9]) * 1000
+        self.stdout.write(
+            f"  {name:15}: {len(timings):6} requests, p50 {p50:6.2f} ms, p99 {p99:7.2f} ms, "
+            f"p99.9 {p999:7.2f} ms, max {max(timings) * 1000:7.2f} ms, "
+            f"{sum(StubCoinGeckoHandler.calls.values())} upstream calls")
@@ -0,0 +1,147 @@
+import json
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from api import http_client
+from api.views import (
+    FetchCryptoChart, FetchCryptoData, MarketCapRankingView, TopExchangesView, TopVolumeCoinView,
+    TrendingCoinView,
+)
+
+USD = {'usd': 1.0}
+COIN = {
+    'market_cap_rank': 1,
+    'market_data': {
+        'current_price': USD, 'market_cap': USD, 'total_volume': USD,
+        'ath': USD, 'ath_change_percentage': USD, 'ath_date': USD,
+        'atl': USD, 'atl_change_percentage': USD, 'atl_date': USD,
+    },
+    'links': {'homepage': [], 'blockchain_site': []},
+    'description': {'en': ''},
+}
+# The views cache under the keys production uses: benchmarks get a private in-memory cache instead
+# of CACHE_URL, so they neither clear nor overwrite shared entries
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}}
+TRENDING = {'coins': [{'item': {'name': 'Bitcoin', 'symbol': 'BTC', 'market_cap_rank': 1, 'price_btc': 1.0}}]}
+
+
+class StubCoinGeckoHandler(BaseHTTPRequestHandler):
+    """Answers the CoinGecko endpoints used by the views after a fixed latency and counts the calls."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.2
+    calls = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = urlparse(self.path).path.removeprefix('/api/v3')
+        with StubCoinGeckoHandler.lock:
+            StubCoinGeckoHandler.calls[path] += 1
+        time.sleep(self.latency)
+
+        if path in ('/coins/markets', '/exchanges'):
+            data = [{'id': f'coin-{i}'} for i in range(20)]
+        elif path == '/search/trending':
+            data = TRENDING
+        elif path.endswith('/market_chart'):
+            data = {'prices': [[0, 1.0]]}
+        else:
+            data = COIN
+
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def uncoalesced_top_volume(request):
+    # The previous TopVolumeCoinView: every miss goes upstream
+    data = cache.get('top_volume_coins')
+    if data is None:
+        params = {'vs_currency': 'usd', 'order': 'volume_desc', 'per_page': 10, 'page': 1}
+        data = http_client.get_json('coingecko', '/coins/markets', params=params)
+        cache.set('top_volume_coins', data, 300)
+    return data
+
+
+class Command(BaseCommand):
+    help = ('Fire concurrent requests at the CoinGecko-backed views right after their cache entry expired '
+            'and count the upstream calls, against a local stub')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--latency', type=float, default=0.2, help='Stub response time in seconds')
+
+    def handle(self, *args, **options):
+        StubCoinGeckoHandler.latency = options['latency']
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubCoinGeckoHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        providers = dict(settings.HTTP_PROVIDERS)
+        providers['coingecko'] = {
+            'base_url': f'http://127.0.0.1:{server.server_port}/api/v3',
+            'rate': 1e6,
+            'capacity': 1e6,
+        }
+        factory = APIRequestFactory()
+        cases = [
+            ('uncoalesced get/set', uncoalesced_top_volume, lambda: None),
+            ('TopVolumeCoinView', TopVolumeCoinView.as_view(), lambda: factory.get('/')),
+            ('TrendingCoinView', TrendingCoinView.as_view(), lambda: factory.get('/')),
+            ('MarketCapRankingView', MarketCapRankingView.as_view(), lambda: factory.get('/')),
+            ('TopExchangesView', TopExchangesView.as_view(), lambda: factory.get('/')),
+            ('FetchCryptoData', FetchCryptoData.as_view(),
+             lambda: factory.post('/', {'coin': 'bitcoin'}, format='json')),
+            ('FetchCryptoChart', FetchCryptoChart.as_view(),
+             lambda: factory.post('/', {'coin': 'bitcoin', 'period': 'week'}, format='json')),
+        ]
+
+        self.stdout.write(f"{options['clients']} concurrent clients per expiry, "
+                          f"stub latency {options['latency'] * 1000:.0f} ms")
+        try:
+            with tempfile.TemporaryDirectory() as directory, \
+                    override_settings(CACHES=BENCH_CACHES, HTTP_PROVIDERS=providers, HTTP_RATE_LIMIT_DIR=directory):
+                for name, view, make_request in cases:
+                    self.stampede(name, view, make_request, options['clients'])
+        finally:
+            server.shutdown()
+
+    def stampede(self, name, view, make_request, clients):
+        cache.clear()
+        StubCoinGeckoHandler.calls.clear()
+        barrier = threading.Barrier(clients)
+        timings = []
+
+        def client():
+            request = make_request()
+            barrier.wait()
+            start = time.perf_counter()
+            view(request)
+            timings.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        timings.sort()
+        self.stdout.write(
+            f"  {name:22}: {sum(StubCoinGeckoHandler.calls.values()):3} upstream calls, "
+            f"p50 {timings[len(timings) // 2] * 1000:6.1f} ms, max {timings[-1] * 1000:6.1f} ms")
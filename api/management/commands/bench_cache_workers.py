@@ -0,0 +1,43 @@
+import multiprocessing
+import random
+
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand
+
+
+def worker(args):
+    seed, keys, requests = args
+    rng = random.Random(seed)
+    hits = 0
+    for _ in range(requests):
+        key = f'bench_workers:{rng.randrange(keys)}'
+        if cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.set(key, 1, 300)
+    return hits
+
+
+class Command(BaseCommand):
+    help = ('Hit rate of the configured cache (CACHE_URL) when the same requests are spread over '
+            '1..N forked workers, like gunicorn workers behind a load balancer')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+        parser.add_argument('--keys', type=int, default=200, help='Distinct cache keys requested')
+        parser.add_argument('--requests', type=int, default=4000, help='Requests in total, per run')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(f"{type(caches['default']).__name__}: "
+                          f"{options['requests']} requests over {options['keys']} keys")
+        # Only the benchmark's own keys: the configured cache may be the one production uses
+        keys = [f'bench_workers:{i}' for i in range(options['keys'])]
+        for workers in options['workers']:
+            cache.delete_many(keys)
+            per_worker = options['requests'] // workers
+            with context.Pool(workers) as pool:
+                hits = sum(pool.map(worker, [(seed, options['keys'], per_worker) for seed in range(workers)]))
+            total = per_worker * workers
+            self.stdout.write(f"  {workers:2} workers: hit rate {hits / total:6.1%}")
+        cache.delete_many(keys)
@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from api.coins import tracked_coins
+from api.management.commands.bench_cache_stampede import BENCH_CACHES
+from api.models import CoinDetail
+from api.rollups import rebuild_rollups
+from api.views import CoinChartView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Seed hourly prices and rollups (rolled back afterwards) and compare full and downsampled CoinChartView responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, nargs='+', default=[24, 720, 8760, 43800])
+        parser.add_argument('--points', type=int, default=600)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        coin = tracked_coins()[0]
+        try:
+            # The seeded charts are rolled back, their cached responses must not reach the shared cache
+            with override_settings(CACHES=BENCH_CACHES), transaction.atomic():
+                CoinDetail.objects.for_symbol(coin.symbol).delete()
+                self.seed(coin.symbol, max(options['hours']))
+                for hours in options['hours']:
+                    self.stdout.write(f"hours={hours}")
+                    self.measure('full', coin, {'hours': hours}, options['repeat'])
+                    self.measure(f"points={options['points']}", coin,
+                                 {'hours': hours, 'points': options['points']}, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, symbol, hours):
+        end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        closes = 100 + np.cumsum(np.random.default_rng(42).normal(size=hours))
+        CoinDetail.objects.bulk_create([
+            CoinDetail(symbol=symbol, time=end - timedelta(hours=hours - i), close_price=float(close))
+            for i, close in enumerate(closes)
+        ], batch_size=5000)
+        rebuild_rollups(symbol)
+
+    def measure(self, name, coin, params, repeat):
+        view = CoinChartView.as_view()
+        timings = []
+        for _ in range(repeat):
+            cache.clear()
+            start = time.perf_counter()
+            response = view(APIRequestFactory().get('/chart/', params), coin_symbol=coin.base_asset)
+            response.render()
+            timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f"  {name:12}: {min(timings) * 1000:8.2f} ms, {len(response.data):6} points, "
+            f"{len(response.content) / 1024:8.1f} KB")
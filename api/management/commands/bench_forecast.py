@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.forecasting import BASE_DAYS, ForecastEngine
+from api.model_registry import registry
+
+
+def legacy_forecast(model, window, no_of_days):
+    # The per-day predict + np.append loop previously used by the view and the command
+    last_seq = window.reshape(1, BASE_DAYS, 1)
+    future = []
+    for _ in range(no_of_days):
+        next_day = model.predict(last_seq, verbose=0)
+        future.append(next_day[0][0])
+        last_seq = np.append(last_seq[:, 1:, :], next_day.reshape(1, 1, -1), axis=1)
+    return np.array(future)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the batched forecast engine against the per-day model.predict loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model-path', help='Path to the .keras model (default: PREDICTION_MODELS["lstm"])')
+        parser.add_argument('--symbols', type=int, default=20)
+        parser.add_argument('--days', type=int, default=14)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        from tensorflow.keras.models import load_model
+
+        model = load_model(options['model_path'] or registry.get_path())
+        engine = ForecastEngine(model)
+        symbols, days, repeat = options['symbols'], options['days'], options['repeat']
+
+        rng = np.random.default_rng(42)
+        windows = rng.random((symbols, BASE_DAYS, 1)).astype(np.float32)
+
+        # Trace the compiled rollout once so the timings below are steady-state
+        engine.forecast(windows[:1], days)
+
+        legacy_times, engine_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            legacy = np.stack([legacy_forecast(model, w, days) for w in windows])
+            legacy_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            batched = engine.forecast(windows, days)
+            engine_times.append(time.perf_counter() - start)
+
+        legacy_best, engine_best = min(legacy_times), min(engine_times)
+        self.stdout.write(f"{symbols} symbols x {days} days, best of {repeat}")
+        self.stdout.write(f"  legacy loop : {legacy_best * 1000:9.1f} ms ({symbols * days} predict calls)")
+        self.stdout.write(f"  engine      : {engine_best * 1000:9.1f} ms ({days} batched steps)")
+        self.stdout.write(f"  speedup     : {legacy_best / engine_best:9.1f}x")
+        self.stdout.write(f"  max abs diff: {np.abs(legacy - batched).max():.2e}")
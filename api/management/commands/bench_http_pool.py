@@ -0,0 +1,124 @@
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from api.http_client import ProviderSession
+from api.ratelimit import SharedTokenBucket, TokenBucket
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Small JSON answer over keep-alive HTTP/1.1."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in two writes, Nagle would hold the second for the client's delayed ACK
+    disable_nagle_algorithm = True
+    body = b'{"ok": true}'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TLSStubServer(ThreadingHTTPServer):
+    """Counts accepted connections, every one of them costs a TCP + TLS handshake."""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, context):
+        super().__init__(address, handler)
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def get_request(self):
+        request = super().get_request()
+        with self.lock:
+            self.connections += 1
+        return request
+
+
+def make_certificate(directory):
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    try:
+        subprocess.run([
+            'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+            '-keyout', key, '-out', cert, '-subj', '/CN=127.0.0.1',
+            '-addext', 'subjectAltName=IP:127.0.0.1',
+        ], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise CommandError(f'Could not create a self-signed certificate with openssl: {e}')
+    return cert, key
+
+
+class Command(BaseCommand):
+    help = 'Compare a new connection per request with the pooled api.http_client session against a local TLS stub'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=4)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            cert, key = make_certificate(directory)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert, key)
+            server = TLSStubServer(('127.0.0.1', 0), StubHandler, context)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f'https://127.0.0.1:{server.server_port}'
+
+            unlimited = TokenBucket(rate=1e9)
+            shared = SharedTokenBucket(os.path.join(directory, 'bench.bucket'), rate=1e9)
+            pooled = ProviderSession(base_url, unlimited, pool_size=options['threads'])
+            pooled_shared = ProviderSession(base_url, shared, pool_size=options['threads'])
+            for session in (pooled, pooled_shared):
+                # REQUESTS_CA_BUNDLE from the environment would win over session.verify
+                session.trust_env = False
+                session.verify = cert
+
+            def new_connection(_):
+                # What a bare requests.get does: a throwaway session and connection
+                return requests.get(f'{base_url}/ping', verify=cert, timeout=10).status_code
+
+            def warm(session):
+                session.get('/ping')
+                return lambda _: session.get('/ping').status_code
+
+            try:
+                self.stdout.write(f"{options['requests']} GETs over {options['threads']} threads, TLS on 127.0.0.1")
+                baseline = self.measure('new connection', server, new_connection, options)
+                self.measure('pooled', server, warm(pooled), options, baseline)
+                self.measure('pooled + shared limiter', server, warm(pooled_shared), options, baseline)
+            finally:
+                pooled.close()
+                pooled_shared.close()
+                server.shutdown()
+
+    def measure(self, name, server, call, options, baseline=None):
+        server.connections = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            statuses = list(executor.map(call, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        if any(status != 200 for status in statuses):
+            raise CommandError(f'{name}: stub answered {set(statuses)}')
+        line = (f"  {name:24}: {elapsed * 1000 / options['requests']:6.2f} ms/request, "
+                f"{server.connections:4} handshakes")
+        if baseline is not None:
+            line += f", {baseline / elapsed:5.1f}x"
+        self.stdout.write(line)
+        return elapsed
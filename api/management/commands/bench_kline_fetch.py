@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from django.core.management.base import BaseCommand
+
+from api.kline_fetcher import fetch_klines_concurrently
+from api.market_data import DAY_MS, KLINES_LIMIT
+
+
+class StubKlineHandler(BaseHTTPRequestHandler):
+    """Answers /api/v3/klines with synthetic daily candles after a fixed latency."""
+
+    latency = 0.1
+    requests_served = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        start_time = int(query['startTime'])
+        end_time = int(query.get('endTime', time.time() * 1000))
+        limit = int(query.get('limit', 500))
+
+        with StubKlineHandler.lock:
+            StubKlineHandler.requests_served += 1
+        time.sleep(self.latency)
+
+        candles = []
+        open_time = start_time
+        while open_time <= end_time and len(candles) < limit:
+            candles.append([open_time, '1.0', '1.1', '0.9', '1.05', '100', open_time + DAY_MS - 1,
+                            '105', 10, '50', '52', '0'])
+            open_time += DAY_MS
+
+        body = json.dumps(candles).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def sequential_fetch(base_url, symbols, start_time, end_time, page_sleep):
+    # Same paging as the previous fetch_crypto_data loop, one symbol after another
+    candles = 0
+    for symbol in symbols:
+        cursor = start_time
+        while cursor < end_time:
+            params = {'symbol': symbol, 'interval': '1d', 'startTime': cursor, 'limit': KLINES_LIMIT}
+            data = requests.get(f'{base_url}/api/v3/klines', params=params, timeout=10).json()
+            if not data:
+                break
+            candles += len(data)
+            cursor = data[-1][0] + DAY_MS
+            time.sleep(page_sleep)
+    return candles
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the concurrent kline fetcher against the sequential loop on a local stub server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', type=int, default=20)
+        parser.add_argument('--days', type=int, default=5 * 365)
+        parser.add_argument('--latency', type=float, default=0.1, help='Stub response latency in seconds')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--page-sleep', type=float, default=0.2,
+                            help='Fixed sleep between pages in the sequential loop')
+        parser.add_argument('--weight-per-minute', type=int, default=6000)
+
+    def handle(self, *args, **options):
+        StubKlineHandler.latency = options['latency']
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubKlineHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        symbols = [f'COIN{i}USDT' for i in range(options['symbols'])]
+        end_time = int(datetime.now().timestamp() * 1000)
+        start_time = int((datetime.now() - timedelta(days=options['days'])).timestamp() * 1000)
+
+        try:
+            StubKlineHandler.requests_served = 0
+            start = time.perf_counter()
+            sequential_candles = sequential_fetch(base_url, symbols, start_time, end_time, options['page_sleep'])
+            sequential_time = time.perf_counter() - start
+            sequential_requests = StubKlineHandler.requests_served
+
+            received = []
+
+            def writer(symbol, range_start, range_end, candles, error):
+                if error is not None:
+                    raise error
+                received.append(len(candles))
+
+            StubKlineHandler.requests_served = 0
+            start = time.perf_counter()
+            asyncio.run(fetch_klines_concurrently(
+                {symbol: (start_time, end_time) for symbol in symbols}, writer,
+                concurrency=options['concurrency'], base_url=base_url,
+                weight_per_minute=options['weight_per_minute'],
+            ))
+            concurrent_time = time.perf_counter() - start
+            concurrent_requests = StubKlineHandler.requests_served
+        finally:
+            server.shutdown()
+
+        self.stdout.write(
+            f"{len(symbols)} symbols x {options['days']} days, stub latency {options['latency'] * 1000:.0f} ms")
+        self.stdout.write(
+            f"  sequential : {sequential_time:7.2f} s, {sequential_requests} requests, {sequential_candles} candles")
+        self.stdout.write(
+            f"  concurrent : {concurrent_time:7.2f} s, {concurrent_requests} requests, {sum(received)} candles"
+            f" (concurrency {options['concurrency']})")
+        self.stdout.write(f"  speedup    : {sequential_time / concurrent_time:7.1f}x")
@@ -0,0 +1,76 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.models import PredictionPoint, PredictionRun
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_latest(symbol, days):
+    # Python-side dedupe previously done by PredictionAPIView
+    unique_by_date = {}
+    points = PredictionPoint.objects.filter(symbol=symbol).select_related('run') \
+        .order_by('-run__created_at', '-date')
+    for item in points:
+        if item.date not in unique_by_date:
+            unique_by_date[item.date] = item
+        if len(unique_by_date) == days:
+            break
+    return sorted(unique_by_date.values(), key=lambda x: x.date, reverse=True)
+
+
+def indexed_latest(symbol, days):
+    return list(PredictionPoint.objects.latest_per_date(symbol).select_related('run')[:days])
+
+
+class Command(BaseCommand):
+    help = 'Seed a year of daily prediction runs (rolled back afterwards) and time the latest-per-date query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=365, help='Daily runs to seed')
+        parser.add_argument('--horizon', type=int, default=14, help='Forecast days per run')
+        parser.add_argument('--days', type=int, default=14, help='Dates requested, like ?days=')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        symbol = 'BENCHUSDT'
+        try:
+            with transaction.atomic():
+                self.seed(symbol, options['runs'], options['horizon'])
+                for name, query in (('python dedupe', legacy_latest), ('latest_per_date', indexed_latest)):
+                    self.measure(name, query, symbol, options['days'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, symbol, runs, horizon):
+        start = timezone.now() - timedelta(days=runs)
+        for day in range(runs):
+            created_at = start + timedelta(days=day)
+            run = PredictionRun.objects.create(
+                symbol=symbol, price_analysis=[{'prediction_summary': 'x' * 2000}],
+                sentiment_label='Neutral', recommendation='Hold', final_score=50.0, summarize='x' * 1000,
+            )
+            PredictionPoint.objects.bulk_create([
+                PredictionPoint(run=run, symbol=symbol, created_at=created_at,
+                                date=created_at.date() + timedelta(days=offset), predicted_price=float(offset))
+                for offset in range(horizon)
+            ])
+        self.stdout.write(f"Seeded {runs} runs x {horizon} points for {symbol}")
+
+    def measure(self, name, query, symbol, days, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                result = query(symbol, days)
+                timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f"  {name:16}: {min(timings) * 1000:8.2f} ms, {len(queries.captured_queries)} queries, {len(result)} rows")
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.forecasting import BASE_DAYS
+from api.windowing import sliding_windows
+
+
+def legacy_windows(scaled_data, base_days):
+    # The append loop previously used by the view and train_crypto_prediction
+    x_data, y_data = [], []
+    for i in range(base_days, len(scaled_data)):
+        x_data.append(scaled_data[i - base_days:i])
+        y_data.append(scaled_data[i])
+    return np.array(x_data), np.array(y_data)
+
+
+def owned_bytes(array):
+    # Bytes of the buffer an array owns, zero for views on another array
+    return array.nbytes if array.base is None else 0
+
+
+class Command(BaseCommand):
+    help = 'Benchmark strided sliding windows against the append loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int, default=5000, help='Number of candles in the series')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        length, repeat = options['length'], options['repeat']
+        scaled_data = np.random.default_rng(42).random((length, 1))
+
+        legacy_times, strided_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            legacy_x, legacy_y = legacy_windows(scaled_data, BASE_DAYS)
+            legacy_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            x, y = sliding_windows(scaled_data, BASE_DAYS)
+            strided_times.append(time.perf_counter() - start)
+
+        assert np.array_equal(legacy_x, x) and np.array_equal(legacy_y, y)
+
+        legacy_best, strided_best = min(legacy_times), min(strided_times)
+        legacy_mb = (owned_bytes(legacy_x) + owned_bytes(legacy_y)) / 1e6
+        strided_mb = (owned_bytes(x) + owned_bytes(y)) / 1e6
+        self.stdout.write(f"{length} candles -> {len(x)} windows of {BASE_DAYS}, best of {repeat}")
+        self.stdout.write(f"  append loop : {legacy_best * 1000:8.2f} ms, {legacy_mb:8.2f} MB allocated")
+        self.stdout.write(f"  strided view: {strided_best * 1000:8.2f} ms, {strided_mb:8.2f} MB allocated")
+        self.stdout.write(f"  speedup     : {legacy_best / strided_best:8.1f}x")
@@ -1,127 +1,145 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Max
 from django.utils import timezone
-from api.models import (
-    BTCUSDTDetail, ETHUSDTDetail, BNBUSDTDetail, SOLUSDTDetail, XRPUSDTDetail,
-    TONUSDTDetail, ADAUSDTDetail, DOGEUSDTDetail, AVAXUSDTDetail, LINKUSDTDetail,
-    DOTUSDTDetail, MATICUSDTDetail, ICPUSDTDetail, LTCUSDTDetail, SHIBUSDTDetail,
-    BCHUSDTDetail, UNIUSDTDetail, APTUSDTDetail, NEARUSDTDetail, XLMUSDTDetail
-)
 import os
-import time
-
-COINS = {
-    'BTC': ('bitcoin', BTCUSDTDetail),
-    'ETH': ('ethereum', ETHUSDTDetail),
-    'BNB': ('binancecoin', BNBUSDTDetail),
-    'SOL': ('solana', SOLUSDTDetail),
-    'XRP': ('ripple', XRPUSDTDetail),
-    'TON': ('the-open-network', TONUSDTDetail),
-    'ADA': ('cardano', ADAUSDTDetail),
-    'DOGE': ('dogecoin', DOGEUSDTDetail),
-    'AVAX': ('avalanche-2', AVAXUSDTDetail),
-    'LINK': ('chainlink', LINKUSDTDetail),
-    'DOT': ('polkadot', DOTUSDTDetail),
-    'MATIC': ('matic-network', MATICUSDTDetail),
-    'ICP': ('internet-computer', ICPUSDTDetail),
-    'LTC': ('litecoin', LTCUSDTDetail),
-    'SHIB': ('shiba-inu', SHIBUSDTDetail),
-    'BCH': ('bitcoin-cash', BCHUSDTDetail),
-    'UNI': ('uniswap', UNIUSDTDetail),
-    'APT': ('aptos', APTUSDTDetail),
-    'NEAR': ('near', NEARUSDTDetail),
-    'XLM': ('stellar', XLMUSDTDetail),
-}
+
+from api import http_client
+from api.coins import forget_coin_snapshots, tracked_coins
+from api.models import CoinDetail, CoinMetadata, LatestCoinSnapshot
+from api.rollups import update_rollups
 
 CRYPTO_COMPARE_API_KEY = os.environ.get("CRYPTO_COMPARE_API_KEY")
 
+# histohour returns at most this many hours per request
+MAX_HOURS = 720
+
+
 class Command(BaseCommand):
     help = 'Fetch full hourly + market + description + % change from CryptoCompare & CoinGecko'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Coins processed in parallel')
+
+    def handle(self, *args, **options):
         if not CRYPTO_COMPARE_API_KEY:
             self.stdout.write(self.style.ERROR("❌ CRYPTO_COMPARE_API_KEY not found"))
             return
 
         headers = {"Authorization": f"Apikey {CRYPTO_COMPARE_API_KEY}"}
 
-        for symbol, (cg_id, model) in COINS.items():
-            self.stdout.write(f"\n🔄 Fetching {symbol} data...")
-
-            try:
-                # 1. Get hourly prices
-                histo_url = "https://min-api.cryptocompare.com/data/v2/histohour"
-                histo_params = {"fsym": symbol, "tsym": "USDT", "limit": 720}
-                histo_res = requests.get(histo_url, headers=headers, params=histo_params)
-                histo_data = histo_res.json()
-
-                if histo_res.status_code != 200 or histo_data.get("Response") != "Success":
-                    self.stdout.write(self.style.ERROR(f"❌ Histohour failed for {symbol}"))
-                    continue
-
-                hourly = histo_data["Data"]["Data"]
-
-                # 2. Get market info
-                market_url = "https://min-api.cryptocompare.com/data/pricemultifull"
-                market_params = {"fsyms": symbol, "tsyms": "USDT"}
-                market_res = requests.get(market_url, headers=headers, params=market_params)
-                raw_data = market_res.json().get("RAW", {}).get(symbol, {}).get("USDT", {})
-
-                market_cap = raw_data.get("MKTCAP")
-                supply = raw_data.get("SUPPLY")
-                max_supply = raw_data.get("MAXSUPPLY") or None
-                circulating_supply = raw_data.get("CIRCULATINGSUPPLY")
-                image_path = raw_data.get("IMAGEURL")
-                image_url = f"https://www.cryptocompare.com{image_path}" if image_path else None
-
-                # 3. Get description and percent changes from CoinGecko
-                cg_url = f"https://api.coingecko.com/api/v3/coins/{cg_id}"
-                cg_res = requests.get(cg_url)
-                if cg_res.status_code != 200:
-                    self.stdout.write(self.style.WARNING(f"⚠️ CoinGecko failed for {symbol}"))
-                    continue
-
-                cg_data = cg_res.json()
-                description = cg_data.get("description", {}).get("en", "")
-                percent_change_24h = cg_data.get("market_data", {}).get("price_change_percentage_24h")
-                percent_change_7d = cg_data.get("market_data", {}).get("price_change_percentage_7d")
-
-                # 4. Store entries
-                entries = []
-                for row in hourly:
-                    t = timezone.make_aware(datetime.utcfromtimestamp(row["time"]))
-
-                    if model.objects.filter(time=t).exists():
-                        continue
-
-                    entries.append(model(
-                        time=t,
-                        open_price=row.get("open"),
-                        high_price=row.get("high"),
-                        low_price=row.get("low"),
-                        close_price=row.get("close"),
-                        volume_from=row.get("volumefrom"),
-                        volume_to=row.get("volumeto"),
-                        market_cap=market_cap,
-                        supply=supply,
-                        max_supply=max_supply,
-                        circulating_supply=circulating_supply,
-                        image_url=image_url,
-                        description=description,
-                        percent_change_24h=percent_change_24h,
-                        percent_change_7d=percent_change_7d,
-                    ))
-
-                if entries:
-                    model.objects.bulk_create(entries, batch_size=500)
-                    self.stdout.write(self.style.SUCCESS(
-                        f"✅ {symbol}: {len(entries)} entries saved | 24h: {percent_change_24h:.2f}% | 7d: {percent_change_7d:.2f}%"
-                    ))
-                else:
+        # Newest stored hour of every coin in one query
+        latest_times = dict(CoinDetail.objects.values_list('symbol').annotate(latest=Max('time')))
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [
+                executor.submit(self.fetch_coin, coin, latest_times.get(coin.symbol), headers)
+                for coin in tracked_coins()
+            ]
+            for future in futures:
+                future.result()
+
+        forget_coin_snapshots()
+
+    def fetch_coin(self, coin, latest, headers):
+        try:
+            self.fetch_coin_data(coin, latest, headers)
+        finally:
+            # Each worker thread has its own DB connection
+            connections.close_all()
+
+    def fetch_coin_data(self, coin, latest, headers):
+        symbol = coin.base_asset
+        self.stdout.write(f"🔄 Fetching {symbol} data...")
+
+        try:
+            # 0. Only the hours after the newest stored one are requested
+            now = timezone.now()
+            if latest is None:
+                limit = MAX_HOURS
+            else:
+                limit = min(MAX_HOURS, int((now - latest).total_seconds() // 3600))
+                if limit < 1:
                     self.stdout.write(self.style.WARNING(f"⚠️ {symbol}: Already up to date"))
-
-                time.sleep(1)  # Respect CoinGecko rate limit
-
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"❌ Error for {symbol}: {str(e)}"))
+                    return
+
+            # 1. Get hourly prices
+            histo_params = {"fsym": symbol, "tsym": "USDT", "limit": limit, "toTs": int(now.timestamp())}
+            histo_res = http_client.get('cryptocompare', '/data/v2/histohour', headers=headers, params=histo_params)
+            histo_data = histo_res.json()
+
+            if histo_res.status_code != 200 or histo_data.get("Response") != "Success":
+                self.stdout.write(self.style.ERROR(f"❌ Histohour failed for {symbol}"))
+                return
+
+            hourly = [
+                row for row in histo_data["Data"]["Data"]
+                if latest is None or row["time"] > latest.timestamp()
+            ]
+            if not hourly:
+                self.stdout.write(self.style.WARNING(f"⚠️ {symbol}: Already up to date"))
+                return
+
+            # 2. Get market info
+            market_params = {"fsyms": symbol, "tsyms": "USDT"}
+            market_res = http_client.get('cryptocompare', '/data/pricemultifull', headers=headers, params=market_params)
+            raw_data = market_res.json().get("RAW", {}).get(symbol, {}).get("USDT", {})
+
+            market_cap = raw_data.get("MKTCAP")
+            supply = raw_data.get("SUPPLY")
+            max_supply = raw_data.get("MAXSUPPLY") or None
+            circulating_supply = raw_data.get("CIRCULATINGSUPPLY")
+            image_path = raw_data.get("IMAGEURL")
+            image_url = f"https://www.cryptocompare.com{image_path}" if image_path else None
+
+            # 3. Get description and percent changes from CoinGecko
+            cg_res = http_client.get('coingecko', f"/coins/{coin.coingecko_id}")
+            if cg_res.status_code != 200:
+                self.stdout.write(self.style.WARNING(f"⚠️ CoinGecko failed for {symbol}"))
+                return
+
+            cg_data = cg_res.json()
+            description = cg_data.get("description", {}).get("en", "")
+            percent_change_24h = cg_data.get("market_data", {}).get("price_change_percentage_24h")
+            percent_change_7d = cg_data.get("market_data", {}).get("price_change_percentage_7d")
+
+            # 4. Store hourly prices, rows that already exist are skipped by the unique constraint on
+            # (symbol, time). The attributes shared by the whole run are written once per coin.
+            entries = [
+                CoinDetail(
+                    symbol=coin.symbol,
+                    time=timezone.make_aware(datetime.utcfromtimestamp(row["time"])),
+                    open_price=row.get("open"),
+                    high_price=row.get("high"),
+                    low_price=row.get("low"),
+                    close_price=row.get("close"),
+                    volume_from=row.get("volumefrom"),
+                    volume_to=row.get("volumeto"),
+                )
+                for row in hourly
+            ]
+
+            # The snapshot and rollups move together with the rows they are built from
+            with transaction.atomic():
+                CoinDetail.objects.bulk_create(entries, batch_size=500, ignore_conflicts=True)
+                update_rollups(coin.symbol, since=min(entry.time for entry in entries))
+                CoinMetadata.objects.update_or_create(symbol=coin.symbol, defaults={
+                    "market_cap": market_cap,
+                    "supply": supply,
+                    "max_supply": max_supply,
+                    "circulating_supply": circulating_supply,
+                    "image_url": image_url,
+                    "description": description,
+                    "percent_change_24h": percent_change_24h,
+                    "percent_change_7d": percent_change_7d,
+                })
+                LatestCoinSnapshot.objects.refresh([coin.symbol])
+
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {symbol}: {len(entries)} entries saved | 24h: {percent_change_24h:.2f}% | 7d: {percent_change_7d:.2f}%"
+            ))
+
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"❌ Error for {symbol}: {str(e)}"))
@@ -1,97 +1,93 @@
-import requests
-import time
+import asyncio
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
-from django.utils import timezone
+from django.db.models import Max
 
-from api.models import (
-    BTCUSDT, ETHUSDT, BNBUSDT, SOLUSDT, XRPUSDT, TONUSDT, ADAUSDT,
-    DOGEUSDT, AVAXUSDT, LINKUSDT, DOTUSDT, MATICUSDT, ICPUSDT, LTCUSDT,
-    SHIBUSDT, BCHUSDT, UNIUSDT, APTUSDT, NEARUSDT, XLMUSDT
-)
+from api.coins import tracked_symbols
+from api.kline_fetcher import fetch_klines_concurrently, split_ranges
+from api.market_data import DAY_MS, timestamp_to_ms, upsert_candles
+from api.models import Candle, SyncCheckpoint
+
+CHECKPOINT_SOURCE = 'binance_1d'
 
-symbol_to_model = {
-    'BTCUSDT': BTCUSDT,
-    'ETHUSDT': ETHUSDT,
-    'BNBUSDT': BNBUSDT,
-    'SOLUSDT': SOLUSDT,
-    'XRPUSDT': XRPUSDT,
-    'TONUSDT': TONUSDT,
-    'ADAUSDT': ADAUSDT,
-    'DOGEUSDT': DOGEUSDT,
-    'AVAXUSDT': AVAXUSDT,
-    'LINKUSDT': LINKUSDT,
-    'DOTUSDT': DOTUSDT,
-    'MATICUSDT': MATICUSDT,
-    'ICPUSDT': ICPUSDT,
-    'LTCUSDT': LTCUSDT,
-    'SHIBUSDT': SHIBUSDT,
-    'BCHUSDT': BCHUSDT,
-    'UNIUSDT': UNIUSDT,
-    'APTUSDT': APTUSDT,
-    'NEARUSDT': NEARUSDT,
-    'XLMUSDT': XLMUSDT,
-}
 
 class Command(BaseCommand):
-    help = 'Fetch historical daily data for top 20 coins from Binance'
+    help = 'Fetch historical daily data for the tracked coins from Binance'
 
-    def handle(self, *args, **kwargs):
-        top_20_symbols = list(symbol_to_model.keys())
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Re-download the whole history instead of resuming from stored data')
+        parser.add_argument('--days', type=int, default=5 * 365,
+                            help='History to backfill for symbols without stored data')
+        parser.add_argument('--overlap', type=int, default=1,
+                            help='Days re-fetched before the newest stored candle')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Maximum number of Binance requests in flight')
 
-        for symbol in top_20_symbols:
-            self.stdout.write(self.style.WARNING(f'Fetching {symbol}...'))
-            model = symbol_to_model[symbol]
+    def get_start_time(self, symbol, latest, checkpoint, options):
+        if checkpoint and not checkpoint.completed and not options['full']:
+            self.stdout.write(f'Resuming {symbol} from checkpoint')
+            return checkpoint.cursor
 
-            end_time = int(datetime.now().timestamp() * 1000)
-            start_time = int((datetime.now() - timedelta(days=5 * 365)).timestamp() * 1000)
+        if not options['full'] and latest is not None:
+            return timestamp_to_ms(latest) - options['overlap'] * DAY_MS
 
-            total_saved = 0
+        return int((datetime.now() - timedelta(days=options['days'])).timestamp() * 1000)
 
-            while start_time < end_time:
-                url = 'https://api.binance.com/api/v3/klines'
-                params = {
-                    'symbol': symbol,
-                    'interval': '1d',
-                    'startTime': start_time,
-                    'limit': 1000
-                }
+    def handle(self, *args, **options):
+        end_time = int(datetime.now().timestamp() * 1000)
+        jobs = {}
+        # Newest stored candle and checkpoint of every symbol, one query each
+        latest = dict(Candle.objects.values_list('symbol').annotate(latest=Max('timestamp')))
+        checkpoints = {
+            checkpoint.symbol: checkpoint
+            for checkpoint in SyncCheckpoint.objects.filter(source=CHECKPOINT_SOURCE)
+        }
+        for symbol in tracked_symbols():
+            start_time = self.get_start_time(symbol, latest.get(symbol), checkpoints.get(symbol), options)
+            jobs[symbol] = (start_time, end_time)
 
-                try:
-                    response = requests.get(url, params=params, timeout=10)
-                    response.raise_for_status()
-                    data = response.json()
+            # Later ranges can land before earlier ones, so pin the resume point first
+            SyncCheckpoint.objects.update_or_create(
+                source=CHECKPOINT_SOURCE, symbol=symbol,
+                defaults={'cursor': start_time, 'completed': False},
+            )
 
-                    if not data or isinstance(data, dict):
-                        self.stdout.write(self.style.WARNING(f'No data returned for {symbol} at {start_time}'))
-                        break
+        # Ranges of every symbol in order, finished ones and the running totals
+        pending = {symbol: split_ranges(*job) for symbol, job in jobs.items()}
+        finished = {symbol: set() for symbol in jobs}
+        failed = set()
+        totals = {symbol: [0, 0] for symbol in jobs}
 
-                    for candle in data:
-                        ts = timezone.make_aware(datetime.fromtimestamp(candle[0] / 1000))
-                        _, created = model.objects.update_or_create(
-                            timestamp=ts,
-                            defaults={
-                                'open': float(candle[1]),
-                                'high': float(candle[2]),
-                                'low': float(candle[3]),
-                                'close': float(candle[4]),
-                                'volume': float(candle[5]),
-                                'close_time': int(candle[6]),
-                                'quote_asset_volume': float(candle[7]),
-                                'num_trades': int(candle[8]),
-                                'taker_buy_base_vol': float(candle[9]),
-                                'taker_buy_quote_vol': float(candle[10]),
-                            }
-                        )
-                        if created:
-                            total_saved += 1
+        def write(symbol, start_time, range_end, candles, error):
+            if error is not None:
+                failed.add(symbol)
+                self.stdout.write(self.style.ERROR(f'Error fetching {symbol} at {start_time}: {error}'))
+            else:
+                inserted, updated = upsert_candles(symbol, candles)
+                totals[symbol][0] += inserted
+                totals[symbol][1] += updated
+                finished[symbol].add(start_time)
 
-                    # Move to next batch
-                    start_time = data[-1][0] + 86400000
-                    time.sleep(0.2)
+            # Ranges complete out of order, the checkpoint only moves past a contiguous prefix
+            ranges = pending[symbol]
+            done = 0
+            while done < len(ranges) and ranges[done][0] in finished[symbol]:
+                done += 1
+            if done:
+                SyncCheckpoint.objects.update_or_create(
+                    source=CHECKPOINT_SOURCE, symbol=symbol,
+                    defaults={'cursor': ranges[done - 1][1], 'completed': done == len(ranges)},
+                )
+            if done == len(ranges):
+                saved, updated = totals[symbol]
+                self.stdout.write(self.style.SUCCESS(
+                    f'{symbol} done: {saved} records saved, {updated} updated.'))
 
-                except requests.exceptions.RequestException as e:
-                    self.stdout.write(self.style.ERROR(f'Error fetching {symbol}: {e}'))
-                    time.sleep(5)  # wait before retrying
+        self.stdout.write(self.style.WARNING(
+            f'Fetching {len(jobs)} symbols with concurrency {options["concurrency"]}...'))
+        asyncio.run(fetch_klines_concurrently(jobs, write, concurrency=options['concurrency']))
 
-            self.stdout.write(self.style.SUCCESS(f'{symbol} done: {total_saved} records saved or updated.'))
+        if failed:
+            self.stdout.write(self.style.ERROR(
+                f'Incomplete: {", ".join(sorted(failed))}. Run again to resume from the checkpoints.'))
@@ -1,66 +1,78 @@
+import json
 import os
 import re
-import requests
 from datetime import datetime, timezone as dt_timezone
 from django.utils import timezone
 from django.core.management.base import BaseCommand
+from api import http_client, llm
 from api.models import CryptoInsight
-from openai import OpenAI
 
-import os
+# Characters of each article body put in the classification prompt
+BODY_CHARS = 600
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)  # API key dari env OPENAI_API_KEY otomatis
 
 class Command(BaseCommand):
     help = 'Fetch latest crypto insight news and classify them using OpenAI'
 
     VALID_CATEGORIES = {"BITCOIN", "ETHEREUM", "SOLANA", "ALTCOIN", "MULTICOIN", "GENERAL"}
 
-    def classify_category(self, title, body):
+    def classify_categories(self, articles):
+        """Category of every (title, body) in `articles`, one request for the whole batch."""
+        if not articles:
+            return []
+
+        numbered = "\n\n".join(
+            f"[{i}] Title: {title}\nBody: {body[:BODY_CHARS]}"
+            for i, (title, body) in enumerate(articles, start=1)
+        )
         prompt = (
             "You're an assistant that classifies crypto news articles. "
-            "Given the title and body of a news article, categorize it as one of:\n"
+            "Categorize each numbered article below as one of:\n"
             "- BITCOIN\n- ETHEREUM\n- SOLANA\n- ALTCOIN\n- MULTICOIN\n- GENERAL (if unrelated to specific coin)\n\n"
-            f"Title: {title}\n"
-            f"Body: {body}\n"
-            "Category:"
+            f"{numbered}\n\n"
+            "Return only a JSON object mapping each article number to its category, "
+            "e.g. {\"1\": \"BITCOIN\", \"2\": \"GENERAL\"}."
         )
 
+        categories = ["GENERAL"] * len(articles)
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=15,
+            raw_output = llm.complete(
+                [{"role": "user", "content": prompt}],
+                max_tokens=10 * len(articles) + 20,
                 temperature=0.2,
-            )
-            raw_output = response.choices[0].message.content.strip()
+            ).strip()
             print(f"[OpenAI RAW OUTPUT] {raw_output}")
 
-            match = re.search(r"\b(BITCOIN|ETHEREUM|SOLANA|ALTCOIN|MULTICOIN|GENERAL)\b", raw_output.upper())
-            if match:
-                return match.group(1)
-            return "GENERAL"
+            match = re.search(r"\{.*\}", raw_output, re.DOTALL)
+            parsed = json.loads(match.group(0)) if match else {}
         except Exception as e:
             print(f"[OpenAI ERROR] {e}")
-            return "GENERAL"
+            return categories
+
+        for number, category in parsed.items():
+            try:
+                index = int(number) - 1
+            except (TypeError, ValueError):
+                continue
+            category = str(category).strip().upper()
+            if 0 <= index < len(articles) and category in self.VALID_CATEGORIES:
+                categories[index] = category
+        return categories
 
     def handle(self, *args, **kwargs):
         crypto_api_key = os.getenv('CRYPTOCOMPARE_API_KEY')
-        url = f'https://min-api.cryptocompare.com/data/v2/news/?lang=EN&api_key={crypto_api_key}&limit=30'
+        params = {'lang': 'EN', 'api_key': crypto_api_key, 'limit': 30}
 
         try:
-            response = requests.get(url, timeout=10)
+            response = http_client.get('cryptocompare', '/data/v2/news/', params=params)
             response.raise_for_status()
             data = response.json()
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"Failed to fetch news: {e}"))
             return
 
-        articles = data.get('Data', [])
-        count = 0
-
-        for article in articles:
+        articles = []
+        for article in data.get('Data', []):
             title = article.get('title', '').strip()
             body = article.get('body', '').strip()
             link = article.get('url', '').strip()
@@ -85,20 +97,36 @@ class Command(BaseCommand):
                 self.stderr.write(f"Date parse error for article '{title[:40]}...': {e}")
                 date = timezone.now()
 
-            if CryptoInsight.objects.filter(title=title, link=link).exists():
-                continue
-
-            category = self.classify_category(title, body)
-
-            CryptoInsight.objects.create(
+            articles.append((CryptoInsight(
                 title=title,
                 link=link,
                 date=date,
                 source=source,
                 image=image_url,
-                category=category
-            )
-            count += 1
-            print(f"[SAVED] {title[:60]}... | Category: {category} | Date: {date.isoformat()}")
-
-        self.stdout.write(self.style.SUCCESS(f'Successfully saved {count} new crypto insight articles.'))
+            ), body))
+
+        # Articles already saved, one query for the whole batch
+        known = set(CryptoInsight.objects.filter(link__in=[insight.link for insight, _ in articles])
+                    .values_list('title', 'link'))
+        new_articles = []
+        for insight, body in articles:
+            if (insight.title, insight.link) not in known:
+                known.add((insight.title, insight.link))
+                new_articles.append((insight, body))
+
+        categories = self.classify_categories([(insight.title, body) for insight, body in new_articles])
+        insights = []
+        for (insight, _), category in zip(new_articles, categories):
+            insight.category = category
+            insights.append(insight)
+
+        # A concurrent run may have saved some of them meanwhile, the unique constraint skips those
+        # and bulk_create doesn't tell which, so the saved rows are counted on the batch's links
+        batch = CryptoInsight.objects.filter(link__in=[insight.link for insight in insights])
+        before = batch.count()
+        CryptoInsight.objects.bulk_create(insights, ignore_conflicts=True)
+        saved = batch.count() - before
+        for insight in insights:
+            print(f"[SAVED] {insight.title[:60]}... | Category: {insight.category} | Date: {insight.date.isoformat()}")
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully saved {saved} new crypto insight articles.'))
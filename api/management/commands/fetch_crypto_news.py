@@ -4,6 +4,7 @@ from django.core.management.base import BaseCommand
 from newsapi import NewsApiClient
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from api import http_client
 from api.models import CryptoNews
 from api.sentiment_analysis import news_analyze
 
@@ -14,7 +15,7 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write("Fetching up to 100 crypto news articles...")
 
-        newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'))
+        newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'), session=http_client.session('newsapi'))
         valid_extensions = ('.jpg', '.jpeg', '.png')
 
         fallback_images = [
@@ -1,5 +1,6 @@
 import requests
 from django.core.management.base import BaseCommand
+from api import http_client
 from api.models import CryptoSymbols
 
 class Command(BaseCommand):
@@ -8,8 +9,7 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         try:
             # Ambil data symbol dari Binance API
-            url = "https://api.binance.com/api/v3/exchangeInfo"
-            response = requests.get(url)
+            response = http_client.get('binance', '/api/v3/exchangeInfo', weight=20)
             response.raise_for_status()
             data = response.json()
 
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.coins import tracked_symbols
+from api.rollups import check_rollups, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the 4h/1d/1w rollups from the hourly coin data, or check them with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Binance symbols, every tracked coin by default')
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare the stored rollups with a fresh aggregation of the hourly rows')
+
+    def handle(self, *args, **options):
+        symbols = [symbol.upper() for symbol in options['symbols']] or tracked_symbols()
+
+        if not options['check']:
+            for symbol in symbols:
+                count = rebuild_rollups(symbol)
+                self.stdout.write(self.style.SUCCESS(f'{symbol}: {count} rollups rebuilt'))
+            return
+
+        problems = []
+        for symbol in symbols:
+            problems += check_rollups(symbol)
+        for problem in problems[:50]:
+            self.stdout.write(self.style.ERROR(problem))
+        if problems:
+            raise CommandError(f'{len(problems)} rollup differences, run rebuild_rollups to repair them.')
+        self.stdout.write(self.style.SUCCESS(f'Rollups of {len(symbols)} symbols match the hourly data.'))
@@ -0,0 +1,86 @@
+import signal
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from api.model_registry import registry
+from api.models import PredictionJob
+from api.prediction_pipeline import PredictionError, run_prediction
+
+
+class Command(BaseCommand):
+    help = 'Run queued fetchCryptoPrediction jobs (PredictionJob), in a pool of threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.PREDICTION_WORKERS,
+                            help='Jobs run in parallel')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between checks of an empty queue')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        self.once = options['once']
+        self.poll = options['poll']
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # Finish the running jobs, then exit
+            signal.signal(sig, lambda *_: self.stopping.set())
+
+        # Load the model once, before the first job needs it
+        registry.warm_up()
+
+        workers = [
+            threading.Thread(target=self.work, name=f'prediction-worker-{i}')
+            for i in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Prediction worker running with {len(workers)} threads")
+        for worker in workers:
+            # join() with a timeout so the main thread keeps handling signals
+            while worker.is_alive():
+                worker.join(timeout=1)
+
+    def work(self):
+        timeout = timedelta(seconds=settings.PREDICTION_JOB_TIMEOUT)
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    PredictionJob.objects.requeue_stale(timeout, settings.PREDICTION_JOB_MAX_ATTEMPTS)
+                    job = PredictionJob.objects.claim()
+                except DatabaseError as e:
+                    # Lost connection, or SQLite busy with another thread's write: try again later
+                    self.stdout.write(self.style.ERROR(f"Prediction queue unavailable: {e}"))
+                    self.stopping.wait(self.poll)
+                    continue
+                if job is None:
+                    if self.once:
+                        return
+                    self.stopping.wait(self.poll)
+                    continue
+                self.run(job)
+        finally:
+            # Each worker thread has its own DB connection
+            close_old_connections()
+
+    def run(self, job):
+        self.stdout.write(f"{job.symbol} {job.no_of_days}d: job {job.pk} started")
+        try:
+            result = run_prediction(job.symbol, job.no_of_days, progress=job.report)
+        except PredictionError as e:
+            stored = job.fail(str(e))
+            message = self.style.WARNING(f"{job.symbol} {job.no_of_days}d: {e}")
+        except Exception as e:
+            stored = job.fail(str(e))
+            message = self.style.ERROR(f"{job.symbol} {job.no_of_days}d: job {job.pk} failed: {e}")
+        else:
+            stored = job.finish(result)
+            message = self.style.SUCCESS(f"{job.symbol} {job.no_of_days}d: job {job.pk} done")
+        if not stored:
+            # Requeued as stale while this run was still going, the newer run owns the job now
+            message = self.style.WARNING(
+                f"{job.symbol} {job.no_of_days}d: job {job.pk} was requeued meanwhile, result dropped")
+        self.stdout.write(message)
@@ -1,42 +1,18 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
 from datetime import timedelta, date
 
 from django.core.management.base import BaseCommand
 from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import load_model
 
-from api.models import *
+from api import llm
+from api.coins import tracked_symbols
+from api.model_registry import registry
+from api.models import Candle
+from api.plotting import line_chart, line_series, plot_url, submit as submit_plot
 from api.utils import save_prediction_to_db
+from api.windowing import sliding_windows
 
-import os
-from openai import OpenAI
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-# Load pretrained model once
-model = load_model('D:/Documents/Haikal Politeknik Negeri Batam/Semester 6/PBL/crypto_price_prediction/backend/backend/api/lstm_model.keras')
-
-# Coin model mapping
-coin_models = {
-    "BTCUSDT": BTCUSDT, "ETHUSDT": ETHUSDT, "BNBUSDT": BNBUSDT, "SOLUSDT": SOLUSDT,
-    "XRPUSDT": XRPUSDT, "TONUSDT": TONUSDT, "ADAUSDT": ADAUSDT, "DOGEUSDT": DOGEUSDT,
-    "AVAXUSDT": AVAXUSDT, "LINKUSDT": LINKUSDT, "DOTUSDT": DOTUSDT, "MATICUSDT": MATICUSDT,
-    "ICPUSDT": ICPUSDT, "LTCUSDT": LTCUSDT, "SHIBUSDT": SHIBUSDT, "BCHUSDT": BCHUSDT,
-    "UNIUSDT": UNIUSDT, "APTUSDT": APTUSDT, "NEARUSDT": NEARUSDT, "XLMUSDT": XLMUSDT,
-}
-
-def plot_to_base64(fig):
-    buf = BytesIO()
-    fig.savefig(buf, format='png')
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-    return f"data:image/png;base64,{image_base64}"
 
 def summarize_coin_sentiment(symbol):
     prompt = (
@@ -44,11 +20,7 @@ def summarize_coin_sentiment(symbol):
         "social media sentiment, and price movement insights. Limit your summary to 50–100 words."
     )
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
+        return llm.complete([{"role": "user", "content": prompt}]).strip()
     except Exception:
         return (
             f"{symbol} has seen a mixed market sentiment recently, with some investors bullish on the long-term potential of "
@@ -66,11 +38,7 @@ def analyze_predictions(symbol, predicted_prices):
         "- A final score from 0 to 100."
     )
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        content = response.choices[0].message.content.strip()
+        content = llm.complete([{"role": "user", "content": prompt}]).strip()
 
         sentiment = "neutral"
         recommendation = "Hold"
@@ -115,11 +83,7 @@ def explain_each_prediction(symbol, predicted_prices):
             f"These are the next 14-day predicted prices for {symbol}: {joined}. "
             "Give a short explanation (1–2 sentences) for each day’s price movement and what factors might cause those movements. Return 14 separate explanations."
         )
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        raw = response.choices[0].message.content.strip().split("\n")
+        raw = llm.complete([{"role": "user", "content": prompt}]).strip().split("\n")
         return [e.strip("- ").strip() for e in raw if e.strip()]
     except Exception:
         for i in range(len(predicted_prices)):
@@ -138,12 +102,16 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         base_days = 100
+        forecast_days = 14
+        forecast_engine = registry.get_engine()
+        model = forecast_engine.model
+        prepared = {}
 
-        for symbol, model_cls in coin_models.items():
+        for symbol in tracked_symbols():
             self.stdout.write(self.style.WARNING(f"Processing {symbol}..."))
 
-            df = pd.DataFrame(list(model_cls.objects.all().values('timestamp', 'close')))
-            if df.empty or len(df) <= base_days + 14:
+            df = pd.DataFrame(list(Candle.objects.for_symbol(symbol).values('timestamp', 'close')))
+            if df.empty or len(df) <= base_days + forecast_days:
                 self.stdout.write(self.style.ERROR(f"Not enough data for {symbol}"))
                 continue
 
@@ -156,48 +124,53 @@ class Command(BaseCommand):
             scaler = MinMaxScaler()
             scaled_data = scaler.fit_transform(data)
 
-            x_data, y_data = [], []
-            for i in range(base_days, len(scaled_data)):
-                x_data.append(scaled_data[i - base_days:i])
-                y_data.append(scaled_data[i])
-
-            x_data = np.array(x_data)
-            y_data = np.array(y_data)
+            x_data, y_data = sliding_windows(scaled_data, base_days, dtype=np.float32)
 
             predictions = model.predict(x_data)
             inv_pred = scaler.inverse_transform(predictions.reshape(-1, 1))
             inv_actual = scaler.inverse_transform(y_data.reshape(-1, 1))
 
-            fig1 = plt.figure(figsize=(10, 4))
-            plt.plot(data['Close'], label="Close Price")
-            plt.legend()
-            original_plot = plot_to_base64(fig1)
-            plt.close(fig1)
-
-            fig2 = plt.figure(figsize=(10, 4))
-            plt.plot(inv_actual.flatten(), label="Actual", color='blue')
-            plt.plot(inv_pred.flatten(), label="Predicted", color='red')
-            plt.legend()
-            predicted_plot = plot_to_base64(fig2)
-            plt.close(fig2)
-
-            last_seq = scaled_data[-base_days:].reshape(1, base_days, 1)
-            future_scaled = []
-            for _ in range(14):
-                next_pred = model.predict(last_seq)
-                future_scaled.append(next_pred[0][0])
-                last_seq = np.append(last_seq[:, 1:, :], [[[next_pred[0][0]]]], axis=1)
-
-            future_scaled_array = np.array(future_scaled).reshape(-1, 1)
-            future_prices = scaler.inverse_transform(future_scaled_array).flatten()
+            positions = np.arange(len(inv_actual))
+            original_plot = submit_plot(line_chart(
+                f"{symbol} Closing Price Over Time",
+                [line_series("Close Price", data.index, data['Close'])],
+                figsize=(10, 4),
+            ))
+            predicted_plot = submit_plot(line_chart(
+                "Actual vs Predicted",
+                [
+                    line_series("Actual", positions, inv_actual.flatten(), color='blue'),
+                    line_series("Predicted", positions, inv_pred.flatten(), color='red'),
+                ],
+                xlabel="Day",
+                figsize=(10, 4),
+            ))
+
+            prepared[symbol] = {
+                "scaler": scaler,
+                "last_seq": scaled_data[-base_days:],
+                "original_plot": original_plot,
+                "predicted_plot": predicted_plot,
+            }
+
+        # One batched rollout for every coin instead of 14 predict calls per coin
+        future_scaled = forecast_engine.forecast_many(
+            {symbol: item["last_seq"] for symbol, item in prepared.items()}, forecast_days)
+
+        for symbol, item in prepared.items():
+            future_scaled_array = future_scaled[symbol].reshape(-1, 1)
+            future_prices = item["scaler"].inverse_transform(future_scaled_array).flatten()
 
             summary_text = summarize_coin_sentiment(symbol)
             analysis_result = analyze_predictions(symbol, future_prices)
             daily_explanations = explain_each_prediction(symbol, future_prices)
 
+            original_plot = item["original_plot"].result()
+            predicted_plot = item["predicted_plot"].result()
+
             result = {
-                "original_plot": original_plot,
-                "predicted_plot": predicted_plot,
+                "original_plot": plot_url(original_plot),
+                "predicted_plot": plot_url(predicted_plot),
                 "future_plot": [float(p) for p in future_prices],
                 "summarize": summary_text,
                 "predict_price_analysis": {
@@ -209,5 +182,5 @@ class Command(BaseCommand):
                 "final_score": analysis_result["final_score"]
             }
 
-            save_prediction_to_db(symbol, result)
-            self.stdout.write(self.style.SUCCESS(f"Saved prediction for {symbol}"))
\ No newline at end of file
+            save_prediction_to_db(symbol, result, original_plot=original_plot, predicted_plot=predicted_plot)
+            self.stdout.write(self.style.SUCCESS(f"Saved prediction for {symbol}"))
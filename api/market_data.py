@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api import http_client
+from api.coins import is_tracked
+from api.models import Candle
+
+DAY_MS = 24 * 60 * 60 * 1000
+KLINES_LIMIT = 1000
+# Request weight of GET /api/v3/klines
+KLINES_WEIGHT = 2
+
+CANDLE_FIELDS = [
+    'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume',
+    'num_trades', 'taker_buy_base_vol', 'taker_buy_quote_vol',
+]
+
+
+class MarketDataError(Exception):
+    pass
+
+
+def candle_timestamp(candle):
+    return timezone.make_aware(datetime.fromtimestamp(candle[0] / 1000))
+
+
+def timestamp_to_ms(ts):
+    # Inverse of candle_timestamp
+    return int(timezone.make_naive(ts).timestamp() * 1000)
+
+
+def candle_fields(candle):
+    return {
+        'open': float(candle[1]),
+        'high': float(candle[2]),
+        'low': float(candle[3]),
+        'close': float(candle[4]),
+        'volume': float(candle[5]),
+        'close_time': int(candle[6]),
+        'quote_asset_volume': float(candle[7]),
+        'num_trades': int(candle[8]),
+        'taker_buy_base_vol': float(candle[9]),
+        'taker_buy_quote_vol': float(candle[10]),
+    }
+
+
+def fetch_klines(symbol, start_time, limit=KLINES_LIMIT):
+    """Fetch one page of daily klines starting at `start_time` (ms)."""
+    params = {
+        'symbol': symbol.upper(),
+        'interval': '1d',
+        'startTime': start_time,
+        'limit': limit,
+    }
+    response = http_client.get('binance', '/api/v3/klines', params=params, weight=KLINES_WEIGHT)
+    data = response.json()
+
+    if isinstance(data, dict):
+        raise MarketDataError(data.get('msg', 'Failed to fetch Binance data.'))
+    return data
+
+
+def fetch_klines_since(symbol, start_time):
+    """Walk Binance pages from `start_time` (ms) up to now."""
+    end_time = int(datetime.now().timestamp() * 1000)
+    all_data = []
+    while start_time < end_time:
+        data = fetch_klines(symbol, start_time)
+        if not data:
+            break
+
+        all_data.extend(data)
+        if len(data) < KLINES_LIMIT:
+            break
+        start_time = data[-1][0] + DAY_MS
+    return all_data
+
+
+def upsert_candles(symbol, candles):
+    """
+    Write a page of Binance klines of `symbol` into the daily candle table with
+    one INSERT ... ON CONFLICT (symbol, timestamp) DO UPDATE. Returns (inserted, updated).
+    """
+    rows = {candle_timestamp(candle): candle_fields(candle) for candle in candles}
+    if not rows:
+        return 0, 0
+
+    with transaction.atomic():
+        existing = Candle.objects.for_symbol(symbol).filter(timestamp__in=list(rows)).count()
+        Candle.objects.bulk_create(
+            [Candle(symbol=symbol, timestamp=ts, **fields) for ts, fields in rows.items()],
+            update_conflicts=True,
+            unique_fields=['symbol', 'timestamp'],
+            update_fields=CANDLE_FIELDS,
+        )
+
+    return len(rows) - existing, existing
+
+
+def sync_tail(symbol, history_days=365 * 10):
+    """
+    Bring the stored candles of `symbol` up to date. Only candles from the newest
+    stored one onwards are requested, the newest one included so the
+    still-open daily candle gets refreshed.
+    """
+    latest = Candle.objects.for_symbol(symbol).aggregate(latest=Max('timestamp'))['latest']
+
+    if latest is None:
+        start_time = int((datetime.now() - timedelta(days=history_days)).timestamp() * 1000)
+    else:
+        start_time = timestamp_to_ms(latest)
+
+    inserted, _ = upsert_candles(symbol, fetch_klines_since(symbol, start_time))
+    return inserted
+
+
+def load_daily_closes(symbol, history_days=365 * 10):
+    """
+    Daily close prices of `symbol` as a DataFrame indexed by timestamp with a
+    single 'Close' column. Tracked coins are served from the candle table
+    after a tail sync, any other Binance symbol is fetched upstream.
+    """
+    symbol = symbol.upper()
+
+    if is_tracked(symbol):
+        sync_tail(symbol, history_days=history_days)
+        rows = Candle.objects.for_symbol(symbol).order_by('timestamp').values_list('timestamp', 'close')
+        df = pd.DataFrame(list(rows), columns=['timestamp', 'Close'])
+    else:
+        start_time = int((datetime.now() - timedelta(days=history_days)).timestamp() * 1000)
+        data = fetch_klines_since(symbol, start_time)
+        df = pd.DataFrame(
+            [(candle[0], candle[4]) for candle in data], columns=['timestamp', 'Close'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+
+    df.set_index('timestamp', inplace=True)
+    df['Close'] = df['Close'].astype(float)
+    return df
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_sync_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedPlot',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('content_type', models.CharField(max_length=32)),
+                ('image', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
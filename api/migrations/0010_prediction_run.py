@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_rendered_plot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(db_index=True, max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('price_analysis', models.JSONField()),
+                ('sentiment_label', models.CharField(max_length=20)),
+                ('recommendation', models.CharField(max_length=20)),
+                ('final_score', models.FloatField()),
+                ('summarize', models.TextField()),
+                ('original_plot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.renderedplot')),
+                ('predicted_plot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.renderedplot')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PredictionPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('predicted_price', models.FloatField()),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points', to='api.predictionrun')),
+            ],
+        ),
+    ]
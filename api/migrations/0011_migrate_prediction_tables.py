@@ -0,0 +1,99 @@
+import base64
+import hashlib
+import re
+from datetime import timedelta
+
+from django.db import migrations
+
+SYMBOLS = [
+    'BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT', 'TONUSDT', 'ADAUSDT',
+    'DOGEUSDT', 'AVAXUSDT', 'LINKUSDT', 'DOTUSDT', 'MATICUSDT', 'ICPUSDT', 'LTCUSDT',
+    'SHIBUSDT', 'BCHUSDT', 'UNIUSDT', 'APTUSDT', 'NEARUSDT', 'XLMUSDT',
+]
+
+SHARED_FIELDS = ('original_plot', 'predicted_plot', 'summarize', 'sentiment_label', 'recommendation', 'final_score')
+
+# Rows written by one save_prediction_to_db call are created within this window
+RUN_GAP = timedelta(seconds=60)
+
+DATA_URI = re.compile(r'^data:(image/[\w+.-]+);base64,(.*)$', re.S)
+PLOT_URL = re.compile(r'/plots/([0-9a-f]{64})\.\w+$')
+
+
+def store_plot(RenderedPlot, value):
+    """Turn a legacy base64 data URI (or a plot URL) into a RenderedPlot digest."""
+    if not value:
+        return None
+
+    digest = None
+    url_match = PLOT_URL.search(value)
+    if url_match:
+        digest = url_match.group(1)
+        if not RenderedPlot.objects.filter(digest=digest).exists():
+            digest = None
+    else:
+        uri_match = DATA_URI.match(value)
+        if uri_match:
+            image = base64.b64decode(uri_match.group(2))
+            digest = hashlib.sha256(image).hexdigest()
+            RenderedPlot.objects.get_or_create(
+                digest=digest, defaults={'content_type': uri_match.group(1), 'image': image})
+    return digest
+
+
+def copy_predictions(apps, schema_editor):
+    RenderedPlot = apps.get_model('api', 'RenderedPlot')
+    PredictionRun = apps.get_model('api', 'PredictionRun')
+    PredictionPoint = apps.get_model('api', 'PredictionPoint')
+
+    for symbol in SYMBOLS:
+        Legacy = apps.get_model('api', f'{symbol}_Prediction')
+        run, run_key, last_row = None, None, None
+        points = []
+
+        for row in Legacy.objects.order_by('created_at', 'id').iterator(chunk_size=200):
+            key = tuple(getattr(row, field) for field in SHARED_FIELDS)
+            new_run = (
+                run is None
+                or key != run_key
+                or row.created_at - last_row.created_at > RUN_GAP
+                or row.date <= last_row.date
+            )
+            if new_run:
+                run = PredictionRun.objects.create(
+                    symbol=symbol,
+                    original_plot_id=store_plot(RenderedPlot, row.original_plot),
+                    predicted_plot_id=store_plot(RenderedPlot, row.predicted_plot),
+                    price_analysis=row.price_analysis,
+                    sentiment_label=row.sentiment_label,
+                    recommendation=row.recommendation,
+                    final_score=row.final_score,
+                    summarize=row.summarize,
+                )
+                # auto_now_add ignores the value passed to create()
+                PredictionRun.objects.filter(pk=run.pk).update(created_at=row.created_at)
+                run_key = key
+
+            points.append(PredictionPoint(run=run, date=row.date, predicted_price=row.predicted_price))
+            last_row = row
+
+            if len(points) >= 1000:
+                PredictionPoint.objects.bulk_create(points)
+                points = []
+
+        PredictionPoint.objects.bulk_create(points)
+
+
+def remove_runs(apps, schema_editor):
+    apps.get_model('api', 'PredictionRun').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_prediction_run'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_predictions, remove_runs),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_migrate_prediction_tables'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ADAUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='APTUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='AVAXUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='BCHUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='BNBUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='BTCUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='DOGEUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='DOTUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='ETHUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='ICPUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='LINKUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='LTCUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='MATICUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='NEARUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='SHIBUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='SOLUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='TONUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='UNIUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='XLMUSDT_Prediction',
+        ),
+        migrations.DeleteModel(
+            name='XRPUSDT_Prediction',
+        ),
+    ]
@@ -0,0 +1,40 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_run_fields(apps, schema_editor):
+    PredictionRun = apps.get_model('api', 'PredictionRun')
+    PredictionPoint = apps.get_model('api', 'PredictionPoint')
+
+    run = PredictionRun.objects.filter(pk=models.OuterRef('run_id'))
+    PredictionPoint.objects.update(
+        symbol=models.Subquery(run.values('symbol')[:1]),
+        created_at=models.Subquery(run.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_delete_legacy_prediction_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionpoint',
+            name='symbol',
+            field=models.CharField(default='', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='predictionpoint',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_run_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='predictionpoint',
+            index=models.Index(fields=['symbol', 'date', 'created_at'], name='prediction_point_latest_idx'),
+        ),
+    ]
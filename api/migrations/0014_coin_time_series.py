@@ -0,0 +1,159 @@
+from django.db import migrations, models
+
+COINS = [
+    ('BTCUSDT', 'BTC', 'bitcoin'),
+    ('ETHUSDT', 'ETH', 'ethereum'),
+    ('BNBUSDT', 'BNB', 'binancecoin'),
+    ('SOLUSDT', 'SOL', 'solana'),
+    ('XRPUSDT', 'XRP', 'ripple'),
+    ('TONUSDT', 'TON', 'the-open-network'),
+    ('ADAUSDT', 'ADA', 'cardano'),
+    ('DOGEUSDT', 'DOGE', 'dogecoin'),
+    ('AVAXUSDT', 'AVAX', 'avalanche-2'),
+    ('LINKUSDT', 'LINK', 'chainlink'),
+    ('DOTUSDT', 'DOT', 'polkadot'),
+    ('MATICUSDT', 'MATIC', 'matic-network'),
+    ('ICPUSDT', 'ICP', 'internet-computer'),
+    ('LTCUSDT', 'LTC', 'litecoin'),
+    ('SHIBUSDT', 'SHIB', 'shiba-inu'),
+    ('BCHUSDT', 'BCH', 'bitcoin-cash'),
+    ('UNIUSDT', 'UNI', 'uniswap'),
+    ('APTUSDT', 'APT', 'aptos'),
+    ('NEARUSDT', 'NEAR', 'near'),
+    ('XLMUSDT', 'XLM', 'stellar'),
+]
+
+# Symbol-keyed time-series tables
+TIME_SERIES = ['Candle', 'CoinDetail']
+
+
+def seed_tracked_coins(apps, schema_editor):
+    TrackedCoin = apps.get_model('api', 'TrackedCoin')
+    TrackedCoin.objects.bulk_create([
+        TrackedCoin(symbol=symbol, base_asset=base_asset, coingecko_id=coingecko_id)
+        for symbol, base_asset, coingecko_id in COINS
+    ])
+
+
+def create_partitioned_table(schema_editor, model):
+    """
+    Postgres: LIST-partition by symbol with one partition per seeded coin and a
+    DEFAULT partition, so a coin added later is only a TrackedCoin row. The
+    primary key has to contain the partition key, hence (id, symbol).
+    """
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+
+    columns = ['%s bigserial NOT NULL' % quote('id')]
+    for field in model._meta.local_fields:
+        if field.primary_key:
+            continue
+        definition, _ = schema_editor.column_sql(model, field, include_default=False)
+        columns.append('%s %s' % (quote(field.column), definition))
+    columns.append('PRIMARY KEY (%s, %s)' % (quote('id'), quote('symbol')))
+    for constraint in model._meta.constraints:
+        # Unique constraints of a partitioned table must include symbol, ours all start with it
+        columns.append('CONSTRAINT %s UNIQUE (%s)' % (quote(constraint.name), ', '.join(
+            quote(model._meta.get_field(name).column) for name in constraint.fields)))
+
+    schema_editor.execute('CREATE TABLE %s (%s) PARTITION BY LIST (%s)' % (
+        quote(table), ', '.join(columns), quote('symbol')))
+    for symbol, _, _ in COINS:
+        schema_editor.execute('CREATE TABLE %s PARTITION OF %s FOR VALUES IN (%s)' % (
+            quote(f'{table}_{symbol.lower()}'), quote(table), schema_editor.quote_value(symbol)))
+    schema_editor.execute('CREATE TABLE %s PARTITION OF %s DEFAULT' % (
+        quote(f'{table}_default'), quote(table)))
+
+
+def create_time_series_tables(apps, schema_editor):
+    for name in TIME_SERIES:
+        model = apps.get_model('api', name)
+        if schema_editor.connection.vendor == 'postgresql':
+            create_partitioned_table(schema_editor, model)
+        else:
+            schema_editor.create_model(model)
+
+
+def drop_time_series_tables(apps, schema_editor):
+    for name in TIME_SERIES:
+        # Dropping the parent drops its partitions as well
+        schema_editor.delete_model(apps.get_model('api', name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_prediction_point_latest_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackedCoin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20, unique=True)),
+                ('base_asset', models.CharField(max_length=10, unique=True)),
+                ('coingecko_id', models.CharField(blank=True, max_length=50)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(seed_tracked_coins, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Candle',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('symbol', models.CharField(max_length=20)),
+                        ('timestamp', models.DateTimeField()),
+                        ('open', models.FloatField()),
+                        ('high', models.FloatField()),
+                        ('low', models.FloatField()),
+                        ('close', models.FloatField()),
+                        ('volume', models.FloatField()),
+                        ('close_time', models.BigIntegerField()),
+                        ('quote_asset_volume', models.FloatField()),
+                        ('num_trades', models.IntegerField()),
+                        ('taker_buy_base_vol', models.FloatField()),
+                        ('taker_buy_quote_vol', models.FloatField()),
+                    ],
+                ),
+                migrations.CreateModel(
+                    name='CoinDetail',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('symbol', models.CharField(max_length=20)),
+                        ('time', models.DateTimeField()),
+                        ('open_price', models.FloatField(null=True)),
+                        ('high_price', models.FloatField(null=True)),
+                        ('low_price', models.FloatField(null=True)),
+                        ('close_price', models.FloatField(null=True)),
+                        ('volume_from', models.FloatField(null=True)),
+                        ('volume_to', models.FloatField(null=True)),
+                        ('market_cap', models.FloatField(null=True)),
+                        ('supply', models.FloatField(null=True)),
+                        ('max_supply', models.FloatField(null=True)),
+                        ('circulating_supply', models.FloatField(null=True)),
+                        ('image_url', models.URLField(blank=True, null=True)),
+                        ('description', models.TextField(blank=True, null=True)),
+                        ('percent_change_24h', models.FloatField(blank=True, null=True)),
+                        ('percent_change_7d', models.FloatField(blank=True, null=True)),
+                    ],
+                ),
+                migrations.AddConstraint(
+                    model_name='candle',
+                    constraint=models.UniqueConstraint(fields=('symbol', 'timestamp'), name='unique_candle'),
+                ),
+                migrations.AddConstraint(
+                    model_name='coindetail',
+                    constraint=models.UniqueConstraint(fields=('symbol', 'time'), name='unique_coin_detail'),
+                ),
+            ],
+        ),
+        # Tables are created by hand so Postgres gets them partitioned
+        migrations.RunPython(create_time_series_tables, drop_time_series_tables),
+    ]
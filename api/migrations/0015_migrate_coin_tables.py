@@ -0,0 +1,54 @@
+from django.db import migrations
+
+SYMBOLS = [
+    'BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT', 'TONUSDT', 'ADAUSDT',
+    'DOGEUSDT', 'AVAXUSDT', 'LINKUSDT', 'DOTUSDT', 'MATICUSDT', 'ICPUSDT', 'LTCUSDT',
+    'SHIBUSDT', 'BCHUSDT', 'UNIUSDT', 'APTUSDT', 'NEARUSDT', 'XLMUSDT',
+]
+
+
+def table_pairs(apps):
+    """(legacy model, unified model, symbol) for every per-coin table."""
+    Candle = apps.get_model('api', 'Candle')
+    CoinDetail = apps.get_model('api', 'CoinDetail')
+    for symbol in SYMBOLS:
+        yield apps.get_model('api', symbol), Candle, symbol
+        yield apps.get_model('api', f'{symbol}Detail'), CoinDetail, symbol
+
+
+def data_columns(model):
+    return [field.column for field in model._meta.local_fields if not field.auto_created]
+
+
+def copy_to_unified(apps, schema_editor):
+    # One INSERT ... SELECT per legacy table, the rows never pass through Python
+    quote = schema_editor.quote_name
+    for legacy, unified, symbol in table_pairs(apps):
+        columns = ', '.join(quote(column) for column in data_columns(legacy))
+        schema_editor.execute(
+            'INSERT INTO %s (%s, %s) SELECT %%s, %s FROM %s' % (
+                quote(unified._meta.db_table), quote('symbol'), columns, columns, quote(legacy._meta.db_table)),
+            [symbol],
+        )
+
+
+def copy_to_legacy(apps, schema_editor):
+    quote = schema_editor.quote_name
+    for legacy, unified, symbol in table_pairs(apps):
+        columns = ', '.join(quote(column) for column in data_columns(legacy))
+        schema_editor.execute(
+            'INSERT INTO %s (%s) SELECT %s FROM %s WHERE %s = %%s' % (
+                quote(legacy._meta.db_table), columns, columns, quote(unified._meta.db_table), quote('symbol')),
+            [symbol],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_coin_time_series'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_to_unified, copy_to_legacy),
+    ]
@@ -0,0 +1,131 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_migrate_coin_tables'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ADAUSDT',
+        ),
+        migrations.DeleteModel(
+            name='ADAUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='APTUSDT',
+        ),
+        migrations.DeleteModel(
+            name='APTUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='AVAXUSDT',
+        ),
+        migrations.DeleteModel(
+            name='AVAXUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='BCHUSDT',
+        ),
+        migrations.DeleteModel(
+            name='BCHUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='BNBUSDT',
+        ),
+        migrations.DeleteModel(
+            name='BNBUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='BTCUSDT',
+        ),
+        migrations.DeleteModel(
+            name='BTCUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='DOGEUSDT',
+        ),
+        migrations.DeleteModel(
+            name='DOGEUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='DOTUSDT',
+        ),
+        migrations.DeleteModel(
+            name='DOTUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='ETHUSDT',
+        ),
+        migrations.DeleteModel(
+            name='ETHUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='ICPUSDT',
+        ),
+        migrations.DeleteModel(
+            name='ICPUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='LINKUSDT',
+        ),
+        migrations.DeleteModel(
+            name='LINKUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='LTCUSDT',
+        ),
+        migrations.DeleteModel(
+            name='LTCUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='MATICUSDT',
+        ),
+        migrations.DeleteModel(
+            name='MATICUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='NEARUSDT',
+        ),
+        migrations.DeleteModel(
+            name='NEARUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='SHIBUSDT',
+        ),
+        migrations.DeleteModel(
+            name='SHIBUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='SOLUSDT',
+        ),
+        migrations.DeleteModel(
+            name='SOLUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='TONUSDT',
+        ),
+        migrations.DeleteModel(
+            name='TONUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='UNIUSDT',
+        ),
+        migrations.DeleteModel(
+            name='UNIUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='XLMUSDT',
+        ),
+        migrations.DeleteModel(
+            name='XLMUSDTDetail',
+        ),
+        migrations.DeleteModel(
+            name='XRPUSDT',
+        ),
+        migrations.DeleteModel(
+            name='XRPUSDTDetail',
+        ),
+    ]
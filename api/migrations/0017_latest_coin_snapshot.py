@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+def build_snapshots(apps, schema_editor):
+    CoinDetail = apps.get_model('api', 'CoinDetail')
+    LatestCoinSnapshot = apps.get_model('api', 'LatestCoinSnapshot')
+
+    fields = [field.name for field in LatestCoinSnapshot._meta.concrete_fields if field.name != 'updated_at']
+    snapshots = []
+    for symbol in CoinDetail.objects.values_list('symbol', flat=True).distinct():
+        latest = CoinDetail.objects.filter(symbol=symbol).order_by('-time').first()
+        snapshots.append(LatestCoinSnapshot(**{name: getattr(latest, name) for name in fields}))
+    LatestCoinSnapshot.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_delete_legacy_coin_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestCoinSnapshot',
+            fields=[
+                ('symbol', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('time', models.DateTimeField()),
+                ('open_price', models.FloatField(null=True)),
+                ('high_price', models.FloatField(null=True)),
+                ('low_price', models.FloatField(null=True)),
+                ('close_price', models.FloatField(null=True)),
+                ('volume_from', models.FloatField(null=True)),
+                ('volume_to', models.FloatField(null=True)),
+                ('market_cap', models.FloatField(null=True)),
+                ('supply', models.FloatField(null=True)),
+                ('max_supply', models.FloatField(null=True)),
+                ('circulating_supply', models.FloatField(null=True)),
+                ('image_url', models.URLField(blank=True, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('percent_change_24h', models.FloatField(blank=True, null=True)),
+                ('percent_change_7d', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:40
+
+import sys
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+
+TEXT_FIELDS = ['image_url', 'description']
+FLOAT_FIELDS = ['market_cap', 'supply', 'max_supply', 'circulating_supply', 'percent_change_24h', 'percent_change_7d']
+
+
+def payload_bytes(queryset):
+    """Approximate bytes held by the metadata columns: text length plus 8 bytes per stored float."""
+    totals = queryset.aggregate(
+        **{name: Sum(Length(name)) for name in TEXT_FIELDS},
+        **{name: Count(name) for name in FLOAT_FIELDS},
+    )
+    return sum(totals[name] or 0 for name in TEXT_FIELDS) + 8 * sum(totals[name] for name in FLOAT_FIELDS)
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def copy_metadata(apps, schema_editor):
+    CoinDetail = apps.get_model('api', 'CoinDetail')
+    CoinMetadata = apps.get_model('api', 'CoinMetadata')
+
+    # Every row of an ingest carries the same values, the newest row holds the current ones
+    metadata = []
+    for symbol in CoinDetail.objects.values_list('symbol', flat=True).distinct():
+        latest = CoinDetail.objects.filter(symbol=symbol).order_by('-time').first()
+        metadata.append(CoinMetadata(symbol=symbol, **{
+            name: getattr(latest, name) for name in TEXT_FIELDS + FLOAT_FIELDS
+        }))
+    CoinMetadata.objects.bulk_create(metadata)
+
+    # Reported to whoever runs migrate, not on every test database creation
+    rows = CoinDetail.objects.count()
+    if not rows or not sys.stdout.isatty():
+        return
+    before = payload_bytes(CoinDetail.objects.all())
+    after = payload_bytes(CoinMetadata.objects.all())
+    saved = 100 * (1 - after / before) if before else 0
+    sys.stdout.write(f"\n  Coin metadata: {format_bytes(before)} over {rows} hourly rows -> "
+                     f"{format_bytes(after)} in {len(metadata)} CoinMetadata rows ({saved:.1f}% smaller)\n")
+    if schema_editor.connection.vendor == 'postgresql':
+        sys.stdout.write("  Dropped columns are reclaimed on the next table rewrite, "
+                         "e.g. VACUUM FULL on the coindetail partitions\n")
+
+
+def restore_metadata(apps, schema_editor):
+    CoinDetail = apps.get_model('api', 'CoinDetail')
+    CoinMetadata = apps.get_model('api', 'CoinMetadata')
+
+    for metadata in CoinMetadata.objects.all():
+        CoinDetail.objects.filter(symbol=metadata.symbol).update(**{
+            name: getattr(metadata, name) for name in TEXT_FIELDS + FLOAT_FIELDS
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_latest_coin_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoinMetadata',
+            fields=[
+                ('symbol', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('market_cap', models.FloatField(null=True)),
+                ('supply', models.FloatField(null=True)),
+                ('max_supply', models.FloatField(null=True)),
+                ('circulating_supply', models.FloatField(null=True)),
+                ('image_url', models.URLField(blank=True, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('percent_change_24h', models.FloatField(blank=True, null=True)),
+                ('percent_change_7d', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(copy_metadata, restore_metadata),
+        migrations.RemoveField(
+            model_name='coindetail',
+            name='circulating_supply',
+        ),
+        migrations.RemoveField(
+            model_name='coindetail',
+            name='description',
+        ),
+        migrations.RemoveField(
+            model_name='coindetail',
+            name='image_url',
+        ),
+        migrations.RemoveField(
+            model_name='coindetail',
+            name='market_cap',
+        ),
+        migrations.RemoveField(
+            model_name='coindetail',
+            name='max_supply',
+        ),
+        migrations.RemoveField(
+            model_name='coindetail',
+            name='percent_change_24h',
+        ),
+        migrations.RemoveField(
+            model_name='coindetail',
+            name='percent_change_7d',
+        ),
+        migrations.RemoveField(
+            model_name='coindetail',
+            name='supply',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_coin_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoinRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('interval', models.CharField(choices=[('4h', '4 hours'), ('1d', '1 day'), ('1w', '1 week')], max_length=3)),
+                ('bucket', models.DateTimeField()),
+                ('open_price', models.FloatField(null=True)),
+                ('high_price', models.FloatField(null=True)),
+                ('low_price', models.FloatField(null=True)),
+                ('close_price', models.FloatField(null=True)),
+                ('volume_from', models.FloatField()),
+                ('volume_to', models.FloatField()),
+                ('hours', models.IntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('symbol', 'interval', 'bucket'), name='unique_coin_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:12
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicates(apps, schema_editor):
+    CryptoInsight = apps.get_model('api', 'CryptoInsight')
+
+    # Keep the first row saved for every (title, link)
+    duplicated = CryptoInsight.objects.values('title', 'link') \
+        .annotate(first=Min('id'), rows=Count('id')).filter(rows__gt=1)
+    deleted = 0
+    for row in duplicated:
+        deleted += CryptoInsight.objects.filter(title=row['title'], link=row['link']) \
+            .exclude(id=row['first']).delete()[0]
+    if deleted:
+        print(f"\n  Crypto insight: deleted {deleted} duplicate rows")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_llm_response'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cryptoinsight',
+            constraint=models.UniqueConstraint(fields=('title', 'link'), name='unique_crypto_insight'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from api.forecasting import BASE_DAYS, ForecastEngine
+
+DEFAULT_MODEL = 'lstm'
+
+
+class ModelRegistry:
+    """
+    Loads the prediction models listed in ``settings.PREDICTION_MODELS`` on
+    first use, so importing views or running unrelated management commands
+    never pays for TensorFlow.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._engines = {}
+        self._ready = set()
+        self._lock = threading.Lock()
+
+    def get_path(self, name=DEFAULT_MODEL):
+        models = getattr(settings, 'PREDICTION_MODELS', {})
+        if name not in models:
+            raise KeyError(f"Prediction model '{name}' is not configured in PREDICTION_MODELS")
+        return str(models[name])
+
+    def get_model(self, name=DEFAULT_MODEL):
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    from tensorflow.keras.models import load_model
+
+                    model = load_model(self.get_path(name))
+                    self._models[name] = model
+        return model
+
+    def get_engine(self, name=DEFAULT_MODEL):
+        engine = self._engines.get(name)
+        if engine is None:
+            model = self.get_model(name)
+            with self._lock:
+                engine = self._engines.setdefault(name, ForecastEngine(model))
+        return engine
+
+    def warm_up(self, name=DEFAULT_MODEL):
+        """Load the model and run one dummy inference so the first request doesn't pay for tracing."""
+        engine = self.get_engine(name)
+        dummy = np.zeros((1, BASE_DAYS, 1), dtype=np.float32)
+        engine.model.predict(dummy, verbose=0)
+        engine.forecast(dummy, 1)
+        self._ready.add(name)
+
+    def is_ready(self, name=DEFAULT_MODEL):
+        return name in self._ready
+
+    def is_loaded(self, name=DEFAULT_MODEL):
+        return name in self._models
+
+
+registry = ModelRegistry()
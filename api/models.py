@@ -1,5 +1,5 @@
 from enum import unique
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 from django.utils import timezone
@@ -117,12 +117,50 @@ class CryptoInsight(models.Model):
     image = models.URLField(null=True, blank=True)
     category = models.CharField(max_length=50, default='GENERAL')  # Nama coin seperti BTC, ETH, dll
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['title', 'link'], name='unique_crypto_insight'),
+        ]
+
     def __str__(self):
         return f"{self.category} - {self.title[:100]}"
     
 
-class BaseCoinModel(models.Model):
-    timestamp = models.DateTimeField(primary_key=True)
+# rendered chart images, addressed by the hash of what was plotted
+class RenderedPlot(models.Model):
+    digest = models.CharField(max_length=64, primary_key=True)
+    content_type = models.CharField(max_length=32)
+    image = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.digest
+
+
+# coins served by the API, tracking a new coin is a row here instead of a new table
+class TrackedCoin(models.Model):
+    symbol = models.CharField(max_length=20, unique=True)  # Binance pair, e.g. BTCUSDT
+    base_asset = models.CharField(max_length=10, unique=True)  # e.g. BTC, used by CryptoCompare and the URLs
+    coingecko_id = models.CharField(max_length=50, blank=True)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return self.symbol
+
+
+class SymbolQuerySet(models.QuerySet):
+    def for_symbol(self, symbol):
+        return self.filter(symbol=symbol.upper())
+
+
+# daily OHLCV of every tracked coin, list-partitioned by symbol on Postgres
+class Candle(models.Model):
+    symbol = models.CharField(max_length=20)
+    timestamp = models.DateTimeField()
     open = models.FloatField()
     high = models.FloatField()
     low = models.FloatField()
@@ -134,34 +172,151 @@ class BaseCoinModel(models.Model):
     taker_buy_base_vol = models.FloatField()
     taker_buy_quote_vol = models.FloatField()
 
+    objects = SymbolQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'timestamp'], name='unique_candle'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.timestamp}"
+
+
+# per-symbol progress of the historical ingestion commands
+class SyncCheckpoint(models.Model):
+    source = models.CharField(max_length=50)  # ingestion job, e.g. binance_1d
+    symbol = models.CharField(max_length=20)
+    cursor = models.BigIntegerField()  # open time (ms) of the next candle to fetch
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'symbol'], name='unique_sync_checkpoint'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.symbol} @ {self.cursor}"
+
+
+class CoinDetailQuerySet(SymbolQuerySet):
+    def latest_per_symbol(self):
+        """Newest hourly row of every symbol, one query for all coins."""
+        if connection.features.can_distinct_on_fields:
+            return self.order_by('symbol', '-time').distinct('symbol')
+
+        newest = CoinDetail.objects.filter(symbol=models.OuterRef('symbol')).order_by('-time').values('id')[:1]
+        return self.filter(id=models.Subquery(newest)).order_by('symbol')
+
+
+# hourly CryptoCompare prices of every tracked coin, list-partitioned by symbol on Postgres
+class CoinDetail(models.Model):
+    symbol = models.CharField(max_length=20)
+    time = models.DateTimeField()
+    open_price = models.FloatField(null=True)
+    high_price = models.FloatField(null=True)
+    low_price = models.FloatField(null=True)
+    close_price = models.FloatField(null=True)
+    volume_from = models.FloatField(null=True)
+    volume_to = models.FloatField(null=True)
+
+    objects = CoinDetailQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'time'], name='unique_coin_detail'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.time}"
+
+
+# OHLCV of CoinDetail aggregated into 4h, 1d and 1w buckets, kept current by fetch_coin_detail
+class CoinRollup(models.Model):
+    INTERVAL_CHOICES = [
+        ('4h', '4 hours'),
+        ('1d', '1 day'),
+        ('1w', '1 week'),
+    ]
+
+    symbol = models.CharField(max_length=20)
+    interval = models.CharField(max_length=3, choices=INTERVAL_CHOICES)
+    bucket = models.DateTimeField()  # start of the bucket
+    open_price = models.FloatField(null=True)
+    high_price = models.FloatField(null=True)
+    low_price = models.FloatField(null=True)
+    close_price = models.FloatField(null=True)
+    volume_from = models.FloatField()
+    volume_to = models.FloatField()
+    hours = models.IntegerField()  # hourly rows aggregated, less than the interval for the newest bucket
+
+    objects = SymbolQuerySet.as_manager()
+
     class Meta:
-        abstract = True
-
-
-class BTCUSDT(BaseCoinModel): pass
-class ETHUSDT(BaseCoinModel): pass
-class BNBUSDT(BaseCoinModel): pass
-class SOLUSDT(BaseCoinModel): pass
-class XRPUSDT(BaseCoinModel): pass
-class TONUSDT(BaseCoinModel): pass
-class ADAUSDT(BaseCoinModel): pass
-class DOGEUSDT(BaseCoinModel): pass
-class AVAXUSDT(BaseCoinModel): pass
-class LINKUSDT(BaseCoinModel): pass
-class DOTUSDT(BaseCoinModel): pass
-class MATICUSDT(BaseCoinModel): pass
-class ICPUSDT(BaseCoinModel): pass
-class LTCUSDT(BaseCoinModel): pass
-class SHIBUSDT(BaseCoinModel): pass
-class BCHUSDT(BaseCoinModel): pass
-class UNIUSDT(BaseCoinModel): pass
-class APTUSDT(BaseCoinModel): pass
-class NEARUSDT(BaseCoinModel): pass
-class XLMUSDT(BaseCoinModel): pass
-
-
-class BaseCoinDetail(models.Model):
-    time = models.DateTimeField(unique=True)
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'interval', 'bucket'], name='unique_coin_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.interval} {self.bucket}"
+
+
+# slowly changing CryptoCompare/CoinGecko attributes, one row per coin rewritten by each ingest
+class CoinMetadata(models.Model):
+    symbol = models.CharField(max_length=20, primary_key=True)
+    market_cap = models.FloatField(null=True)
+    supply = models.FloatField(null=True)
+    max_supply = models.FloatField(null=True)
+    circulating_supply = models.FloatField(null=True)
+    image_url = models.URLField(null=True, blank=True)
+    description = models.TextField(null=True, blank=True)
+    percent_change_24h = models.FloatField(null=True, blank=True)
+    percent_change_7d = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.symbol
+
+
+class LatestCoinSnapshotQuerySet(models.QuerySet):
+    def refresh(self, symbols=None):
+        """
+        Rebuild the snapshot of `symbols` (every coin when None) from the newest
+        CoinDetail row and the CoinMetadata of each coin.
+        """
+        latest = CoinDetail.objects.all()
+        metadata = CoinMetadata.objects.all()
+        if symbols is not None:
+            latest = latest.filter(symbol__in=symbols)
+            metadata = metadata.filter(symbol__in=symbols)
+        metadata = {row.symbol: row for row in metadata}
+
+        hourly_fields = [field.name for field in CoinDetail._meta.concrete_fields if not field.primary_key]
+        metadata_fields = [
+            field.name for field in CoinMetadata._meta.concrete_fields if field.name not in ('symbol', 'updated_at')
+        ]
+        snapshots = []
+        for row in latest.latest_per_symbol():
+            snapshot = LatestCoinSnapshot(**{name: getattr(row, name) for name in hourly_fields})
+            if row.symbol in metadata:
+                for name in metadata_fields:
+                    setattr(snapshot, name, getattr(metadata[row.symbol], name))
+            snapshots.append(snapshot)
+
+        self.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['symbol'],
+            update_fields=[name for name in hourly_fields + metadata_fields if name != 'symbol'] + ['updated_at'],
+        )
+        return len(snapshots)
+
+
+# newest CoinDetail row of every coin with its metadata, rewritten by fetch_coin_detail after each ingest
+class LatestCoinSnapshot(models.Model):
+    symbol = models.CharField(max_length=20, primary_key=True)
+    time = models.DateTimeField()
     open_price = models.FloatField(null=True)
     high_price = models.FloatField(null=True)
     low_price = models.FloatField(null=True)
@@ -176,41 +331,22 @@ class BaseCoinDetail(models.Model):
     description = models.TextField(null=True, blank=True)
     percent_change_24h = models.FloatField(null=True, blank=True)
     percent_change_7d = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LatestCoinSnapshotQuerySet.as_manager()
 
-    class Meta:
-        abstract = True
-
-class BTCUSDTDetail(BaseCoinDetail): pass
-class ETHUSDTDetail(BaseCoinDetail): pass
-class BNBUSDTDetail(BaseCoinDetail): pass
-class SOLUSDTDetail(BaseCoinDetail): pass
-class XRPUSDTDetail(BaseCoinDetail): pass
-class TONUSDTDetail(BaseCoinDetail): pass
-class ADAUSDTDetail(BaseCoinDetail): pass
-class DOGEUSDTDetail(BaseCoinDetail): pass
-class AVAXUSDTDetail(BaseCoinDetail): pass
-class LINKUSDTDetail(BaseCoinDetail): pass
-class DOTUSDTDetail(BaseCoinDetail): pass
-class MATICUSDTDetail(BaseCoinDetail): pass
-class ICPUSDTDetail(BaseCoinDetail): pass
-class LTCUSDTDetail(BaseCoinDetail): pass
-class SHIBUSDTDetail(BaseCoinDetail): pass
-class BCHUSDTDetail(BaseCoinDetail): pass
-class UNIUSDTDetail(BaseCoinDetail): pass
-class APTUSDTDetail(BaseCoinDetail): pass
-class NEARUSDTDetail(BaseCoinDetail): pass
-class XLMUSDTDetail(BaseCoinDetail): pass
-
-
-class BasePrediction(models.Model):
+    def __str__(self):
+        return f"{self.symbol} @ {self.time}"
+
+
+# one prediction run per coin, the per-day prices live in PredictionPoint
+class PredictionRun(models.Model):
+    symbol = models.CharField(max_length=20, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    date = models.DateField()  # tanggal prediksi untuk satu hari
-    predicted_price = models.FloatField()
 
-    # Plot images
-    original_plot = models.TextField()  # base64
-    predicted_plot = models.TextField()  # base64
+    # Plot images, stored once in RenderedPlot
+    original_plot = models.ForeignKey(RenderedPlot, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    predicted_plot = models.ForeignKey(RenderedPlot, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
 
     # Analysis
     price_analysis = models.JSONField()
@@ -219,32 +355,166 @@ class BasePrediction(models.Model):
     final_score = models.FloatField()
     summarize = models.TextField()
 
+    def __str__(self):
+        return f"{self.symbol} - {self.created_at}"
+
+
+class PredictionPointQuerySet(models.QuerySet):
+    def latest_per_date(self, symbol):
+        """Newest prediction for every forecast date of `symbol`, most recent date first."""
+        points = self.filter(symbol=symbol)
+        if connection.features.can_distinct_on_fields:
+            return points.order_by('-date', '-created_at', '-id').distinct('date')
+
+        newest = PredictionPoint.objects.filter(symbol=symbol, date=models.OuterRef('date')) \
+            .order_by('-created_at', '-id').values('id')[:1]
+        return points.filter(id=models.Subquery(newest)).order_by('-date')
+
+
+class PredictionPoint(models.Model):
+    run = models.ForeignKey(PredictionRun, on_delete=models.CASCADE, related_name='points')
+    date = models.DateField()  # tanggal prediksi untuk satu hari
+    predicted_price = models.FloatField()
+
+    # Copied from the run so "newest prediction per date" is an index scan
+    symbol = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+
+    objects = PredictionPointQuerySet.as_manager()
+
     class Meta:
-        abstract = True
-
-
-# Coin-specific tables
-class BTCUSDT_Prediction(BasePrediction): pass
-class ETHUSDT_Prediction(BasePrediction): pass
-class BNBUSDT_Prediction(BasePrediction): pass
-class SOLUSDT_Prediction(BasePrediction): pass
-class XRPUSDT_Prediction(BasePrediction): pass
-class TONUSDT_Prediction(BasePrediction): pass
-class ADAUSDT_Prediction(BasePrediction): pass
-class DOGEUSDT_Prediction(BasePrediction): pass
-class AVAXUSDT_Prediction(BasePrediction): pass
-class LINKUSDT_Prediction(BasePrediction): pass
-class DOTUSDT_Prediction(BasePrediction): pass
-class MATICUSDT_Prediction(BasePrediction): pass
-class ICPUSDT_Prediction(BasePrediction): pass
-class LTCUSDT_Prediction(BasePrediction): pass
-class SHIBUSDT_Prediction(BasePrediction): pass
-class BCHUSDT_Prediction(BasePrediction): pass
-class UNIUSDT_Prediction(BasePrediction): pass
-class APTUSDT_Prediction(BasePrediction): pass
-class NEARUSDT_Prediction(BasePrediction): pass
-class XLMUSDT_Prediction(BasePrediction): pass
+        indexes = [
+            models.Index(fields=['symbol', 'date', 'created_at'], name='prediction_point_latest_idx'),
+        ]
 
+    def __str__(self):
+        return f"{self.run.symbol} {self.date}: {self.predicted_price}"
+
+
+class PredictionJobQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(status__in=PredictionJob.ACTIVE)
+
+    def enqueue(self, symbol, no_of_days, reuse_for=None):
+        """
+        Job predicting `no_of_days` of `symbol` and whether it was created: the queued or
+        running one if there is one, else a job that finished less than `reuse_for` ago.
+        """
+        while True:
+            existing = self.active().filter(symbol=symbol, no_of_days=no_of_days).first()
+            if existing is None and reuse_for is not None:
+                existing = self.filter(
+                    symbol=symbol, no_of_days=no_of_days, status=PredictionJob.DONE,
+                    finished_at__gte=timezone.now() - reuse_for,
+                ).order_by('-finished_at').first()
+            if existing is not None:
+                return existing, False
+            try:
+                with transaction.atomic():
+                    return self.create(symbol=symbol, no_of_days=no_of_days), True
+            except IntegrityError:
+                # Another request enqueued the same prediction in between
+                continue
+
+    def claim(self):
+        """Oldest queued job, marked running for the caller. None when the queue is empty."""
+        while True:
+            with transaction.atomic():
+                job = self.select_for_update(skip_locked=True) \
+                    .filter(status=PredictionJob.QUEUED).order_by('created_at', 'id').first()
+                if job is None:
+                    return None
+                now = timezone.now()
+                # Conditional, so databases without row locks (SQLite) can't hand a job out twice
+                claimed = self.filter(pk=job.pk, status=PredictionJob.QUEUED).update(
+                    status=PredictionJob.RUNNING, started_at=now, heartbeat_at=now,
+                    attempts=models.F('attempts') + 1,
+                )
+            if claimed:
+                job.refresh_from_db()
+                return job
+
+    def requeue_stale(self, timeout, max_attempts):
+        """Running jobs without a heartbeat for `timeout` lost their worker: retry or fail them."""
+        stale = self.filter(status=PredictionJob.RUNNING, heartbeat_at__lt=timezone.now() - timeout)
+        failed = stale.filter(attempts__gte=max_attempts).update(
+            status=PredictionJob.FAILED, error='Worker stopped responding', finished_at=timezone.now())
+        requeued = stale.update(status=PredictionJob.QUEUED, stage='', progress=0)
+        return requeued, failed
+
+
+# fetchCryptoPrediction work, run by the run_prediction_worker command
+class PredictionJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE = [QUEUED, RUNNING]
+
+    symbol = models.CharField(max_length=20)
+    no_of_days = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    stage = models.CharField(max_length=30, blank=True)  # step of api.prediction_pipeline running now
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    result = models.JSONField(null=True, blank=True)  # plots as RenderedPlot digests
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = PredictionJobQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # One queued or running job per prediction, concurrent requests share it
+            models.UniqueConstraint(
+                fields=['symbol', 'no_of_days'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_prediction_job',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='prediction_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.no_of_days}d {self.status}"
 
+    def claimed(self):
+        """This run's row, empty once the job was requeued and claimed again by another run."""
+        return PredictionJob.objects.filter(pk=self.pk, status=self.RUNNING, attempts=self.attempts)
 
+    def report(self, stage, progress):
+        self.stage, self.progress = stage, progress
+        self.claimed().update(stage=stage, progress=progress, heartbeat_at=timezone.now())
 
+    def finish(self, result):
+        """Store the result, False when this run was superseded and nothing was written."""
+        self.status, self.result, self.progress, self.finished_at = self.DONE, result, 100, timezone.now()
+        return bool(self.claimed().update(
+            status=self.status, result=result, progress=100, finished_at=self.finished_at))
+
+    def fail(self, error):
+        self.status, self.error, self.finished_at = self.FAILED, error, timezone.now()
+        return bool(self.claimed().update(status=self.status, error=error, finished_at=self.finished_at))
+
+
+# chat completions cached by api.llm, keyed by the hash of the model, messages and parameters
+class LLMResponse(models.Model):
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=50)
+    content = models.TextField()
+    prompt_tokens = models.IntegerField(default=0)
+    completion_tokens = models.IntegerField(default=0)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.model} {self.key[:12]}"
@@ -0,0 +1,106 @@
+import hashlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import reverse
+
+from api.models import RenderedPlot
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+_executor = ThreadPoolExecutor(max_workers=settings.PLOT_RENDER_WORKERS, thread_name_prefix='plot-render')
+
+
+def line_series(label, x, y, color=None):
+    return {'label': label, 'x': np.asarray(x), 'y': np.asarray(y, dtype=float), 'color': color}
+
+
+def line_chart(title, series, xlabel='Date', ylabel='Close Price', figsize=(15, 6)):
+    return {'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'figsize': list(figsize), 'series': series}
+
+
+def _hashable(values):
+    """`values` as a numeric array whose bytes stand for the values themselves."""
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ns]')
+    if values.dtype == object:
+        # Timestamps of a tz-aware DatetimeIndex: the bytes would be object pointers, hash epoch ns
+        import pandas as pd
+
+        try:
+            return pd.DatetimeIndex(values).asi8.view('datetime64[ns]')
+        except (TypeError, ValueError):
+            raise TypeError('Chart series must be numeric or datetime-like, got an object array')
+    return values
+
+
+def chart_digest(chart, fmt='png'):
+    """Hash of everything that goes into the image, so identical charts are rendered once."""
+    digest = hashlib.sha256()
+    layout = {key: value for key, value in chart.items() if key != 'series'}
+    digest.update(json.dumps([fmt, layout], sort_keys=True).encode())
+    for series in chart['series']:
+        digest.update(json.dumps([series['label'], series['color']]).encode())
+        for values in (series['x'], series['y']):
+            values = _hashable(values)
+            digest.update(str(values.dtype).encode())
+            digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+def render_chart(chart, fmt='png'):
+    # Imported here: serializers import this module for plot_url, the URLconf shouldn't load matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    # Object-oriented Agg API: no pyplot global state, safe to run in worker threads
+    fig = Figure(figsize=chart['figsize'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for series in chart['series']:
+        ax.plot(series['x'], series['y'], label=series['label'], color=series['color'])
+    ax.set_title(chart['title'])
+    ax.set_xlabel(chart['xlabel'])
+    ax.set_ylabel(chart['ylabel'])
+    ax.legend()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt)
+    return buf.getvalue()
+
+
+def get_or_render(chart, fmt='png'):
+    """Render and store `chart` unless an identical one is stored already, returns its digest."""
+    digest = chart_digest(chart, fmt)
+    if not RenderedPlot.objects.filter(digest=digest).exists():
+        RenderedPlot.objects.bulk_create([
+            RenderedPlot(digest=digest, content_type=CONTENT_TYPES[fmt], image=render_chart(chart, fmt)),
+        ], ignore_conflicts=True)
+    return digest
+
+
+def _render_job(chart, fmt):
+    close_old_connections()
+    try:
+        return get_or_render(chart, fmt)
+    finally:
+        close_old_connections()
+
+
+def submit(chart, fmt='png'):
+    """Render `chart` in the plot worker pool, returns a future of its digest."""
+    return _executor.submit(_render_job, chart, fmt)
+
+
+def plot_url(digest, fmt='png', request=None):
+    path = reverse('plot-image', kwargs={'digest': digest, 'fmt': fmt})
+    if request is not None:
+        return request.build_absolute_uri(path)
+    return f"{settings.PUBLIC_BASE_URL}{path}"
@@ -1,16 +1,10 @@
 from datetime import datetime, timedelta
 import json
-from openai import OpenAI  # adjust this import based on your OpenAI library version
-import os
-from dotenv import load_dotenv
 
 from django.core.cache import cache
 import hashlib
 
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI()
+from api import llm
 
 def price_prediction_analysis(coin, future_predictions):
     today = datetime.today()
@@ -20,7 +14,7 @@ def price_prediction_analysis(coin, future_predictions):
 
     cached_result = cache.get(cache_key)
     if cached_result:
-        cached_result
+        return cached_result
 
     date_price_pairs = [
         {
@@ -54,13 +48,7 @@ def price_prediction_analysis(coin, future_predictions):
     Return the result as a valid JSON array. Do not include markdown or explanation.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7
-    )
-
-    content = response.choices[0].message.content
+    content = llm.complete([{"role": "user", "content": prompt}], temperature=0.7)
 
     try:
         prediction_analysis = json.loads(content)
@@ -0,0 +1,180 @@
+import concurrent.futures
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from sklearn.preprocessing import MinMaxScaler
+
+from api.forecasting import BASE_DAYS
+from api.market_data import MarketDataError, load_daily_closes
+from api.model_registry import registry
+from api.plotting import line_chart, line_series, submit as submit_plot
+from api.prediction_analysis import price_prediction_analysis
+from api.sentiment_analysis import get_news_data, score_sentiment, summarize_news
+from api.windowing import sliding_windows
+
+# Network-bound analysis stages (OpenAI, NewsAPI) of concurrent predictions. A stage that runs
+# past its timeout keeps its thread until it returns, its answer still lands in the LLM cache.
+_executor = ThreadPoolExecutor(max_workers=settings.PREDICTION_ANALYSIS_WORKERS, thread_name_prefix='prediction-analysis')
+
+
+class PredictionError(Exception):
+    """The coin can't be predicted (unknown symbol, not enough history), retrying won't help."""
+
+
+class StageTimings(dict):
+    """Seconds and outcome (ok, error, timeout) of each pipeline stage, returned in the result's meta."""
+
+    def __init__(self):
+        super().__init__()
+        self._submitted = {}
+
+    def record(self, name, started, status):
+        # First outcome wins: a stage finishing after its timeout was recorded stays a timeout
+        self.setdefault(name, {'seconds': round(time.perf_counter() - started, 3), 'status': status})
+
+    @contextmanager
+    def stage(self, name):
+        started, status = time.perf_counter(), 'error'
+        try:
+            yield
+            status = 'ok'
+        finally:
+            self.record(name, started, status)
+
+    def submit(self, name, fn, *args):
+        """Run `fn(*args)` as stage `name` in the analysis pool, returns a future of its result."""
+        started = self._submitted[name] = time.perf_counter()
+
+        def run():
+            try:
+                result = fn(*args)
+            except Exception:
+                self.record(name, started, 'error')
+                raise
+            self.record(name, started, 'ok')
+            return result
+
+        return _executor.submit(run)
+
+    def wait(self, name, future):
+        """Result of a submitted stage, None when it failed or ran past PREDICTION_STAGE_TIMEOUTS[name]."""
+        started = self._submitted[name]
+        remaining = settings.PREDICTION_STAGE_TIMEOUTS[name] - (time.perf_counter() - started)
+        try:
+            return future.result(timeout=max(remaining, 0))
+        except concurrent.futures.TimeoutError:
+            self.record(name, started, 'timeout')
+        except Exception as e:
+            print(f"[prediction] {name} failed: {e}")
+        return None
+
+    def partial(self):
+        return [name for name, timing in self.items() if timing['status'] != 'ok']
+
+
+def run_prediction(symbol, no_of_days, progress=None):
+    """
+    Forecast `no_of_days` daily closes of `symbol` with the analysis and charts
+    fetchCryptoPrediction used to build inside the request. Plots are returned
+    as RenderedPlot digests. `progress(stage, percent)` is called between stages.
+
+    Analysis stages that fail or time out come back as None and are listed in
+    meta.partial; meta.stages has the seconds each stage took.
+    """
+    report = progress or (lambda stage, percent: None)
+    timings = StageTimings()
+
+    # Daily closes from the local OHLCV table, synced up to today
+    report('market_data', 5)
+    try:
+        with timings.stage('market_data'):
+            df = load_daily_closes(symbol)
+    except MarketDataError as e:
+        raise PredictionError(str(e))
+
+    if df.empty:
+        raise PredictionError("No historical data found for this coin.")
+
+    coin_data = df[['Close']]
+    splitting_len = int(len(coin_data) * 0.8)
+    x_test = coin_data[["Close"]][splitting_len:]
+
+    if x_test.empty:
+        raise PredictionError("Not enough data to make a prediction.")
+
+    # Scale data
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaled_data = scaler.fit_transform(x_test)
+
+    x_data, y_data = sliding_windows(scaled_data, BASE_DAYS, dtype=np.float32)
+
+    if len(x_data) == 0:
+        raise PredictionError("Not enough data after scaling to make prediction.")
+
+    # Predictions
+    report('inference', 20)
+    with timings.stage('inference'):
+        forecast_engine = registry.get_engine()
+        predictions = forecast_engine.model.predict(x_data)
+        inv_predictions = scaler.inverse_transform(predictions)
+        inv_y_test = scaler.inverse_transform(y_data)
+
+        # Both charts render in the plot worker pool while the forecast and the analysis run
+        plot_index = x_test.index[BASE_DAYS:]
+        original_plot_job = submit_plot(line_chart(
+            f'{symbol.upper()} Closing Price Over Time',
+            [line_series('Close Price', coin_data.index, coin_data['Close'])],
+        ))
+        predicted_plot_job = submit_plot(line_chart(
+            'Original vs Predicted',
+            [
+                line_series('Original Test Data', plot_index, inv_y_test.flatten(), color='blue'),
+                line_series('Predicted Test Data', plot_index, inv_predictions.flatten(), color='red'),
+            ],
+        ))
+
+        # Predict future prices
+        last_100 = coin_data.tail(BASE_DAYS)
+        last_100_scaled = scaler.transform(last_100)
+        last_100_scaled = last_100_scaled.reshape(1, -1, 1)
+
+        future_scaled = forecast_engine.forecast(last_100_scaled, no_of_days)
+        future_predictions = scaler.inverse_transform(future_scaled.reshape(-1, 1)).flatten()
+
+    # Analysis: the OpenAI price analysis and the news download run together, the news
+    # summary starts as soon as the news is in. A stage past its timeout is left out.
+    report('analysis', 50)
+    price_analysis_job = timings.submit('price_analysis', price_prediction_analysis, symbol, future_predictions)
+    news_job = timings.submit('news', get_news_data, symbol)
+
+    news_data = timings.wait('news', news_job)
+    summarize = None
+    if news_data is not None:
+        summary_job = timings.submit('news_summary', summarize_news, news_data, symbol)
+        summarize = timings.wait('news_summary', summary_job)
+    price_analysis_data = timings.wait('price_analysis', price_analysis_job)
+
+    # VADER over the headlines, no network
+    sentiment_label, recommendation, final_score = score_sentiment(news_data or [], future_predictions)
+
+    report('plots', 90)
+    with timings.stage('plots'):
+        original_plot, predicted_plot = original_plot_job.result(), predicted_plot_job.result()
+
+    return {
+        "original_plot": original_plot,
+        "predicted_plot": predicted_plot,
+        "future_plot": future_predictions.tolist(),
+        "predict_price_analysis": price_analysis_data,
+        "sentiment_label": sentiment_label,
+        "recommendation": recommendation,
+        "final_score": final_score,
+        "summarize": summarize,
+        "meta": {
+            "stages": dict(timings),
+            "partial": timings.partial(),
+        },
+    }
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `rate` tokens are added per second up to
+    `capacity`; `acquire(n)` blocks until n tokens are available.
+    """
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = self.clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens):
+        """Take `tokens` if available, else return how long to wait for them."""
+        now = self.clock()
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """`acquire` for coroutines, sleeps without blocking the event loop."""
+        while True:
+            with self._lock:
+                wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket kept in the file at `path`, so every thread and process on
+    the host that uses the same file draws from one budget. Without fcntl
+    (Windows) it falls back to a per-process bucket.
+    """
+
+    clock = staticmethod(time.time)
+
+    def __init__(self, path, rate, capacity=None):
+        super().__init__(rate, capacity)
+        self.path = path
+        self._file = None
+        self._pid = None
+
+    def _open(self):
+        # A descriptor inherited through fork shares its flock with the parent
+        if self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a+')
+            self._pid = os.getpid()
+        return self._file
+
+    def _reserve(self, tokens):
+        if fcntl is None:
+            return super()._reserve(tokens)
+
+        state = self._open()
+        fcntl.flock(state, fcntl.LOCK_EX)
+        try:
+            state.seek(0)
+            saved = state.read().split()
+            if len(saved) == 2:
+                self._tokens, self._updated = float(saved[0]), float(saved[1])
+            wait = super()._reserve(tokens)
+            state.seek(0)
+            state.truncate()
+            state.write(f'{self._tokens!r} {self._updated!r}')
+            state.flush()
+            return wait
+        finally:
+            fcntl.flock(state, fcntl.LOCK_UN)
@@ -0,0 +1,168 @@
+import math
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+
+from api.models import CoinDetail, CoinRollup
+
+HOUR = 3600
+
+# Bucket length and alignment in epoch seconds, finest first. Weeks start on Monday.
+INTERVALS = {
+    '4h': (4 * HOUR, 0),
+    '1d': (24 * HOUR, 0),
+    '1w': (7 * 24 * HOUR, 4 * 24 * HOUR),
+}
+
+# Seconds per point for the ?resolution= values of the chart endpoints, 1h reads the hourly rows
+RESOLUTIONS = {'1h': HOUR, **{interval: size for interval, (size, _) in INTERVALS.items()}}
+
+HOURLY_FIELDS = ['open_price', 'high_price', 'low_price', 'close_price', 'volume_from', 'volume_to']
+ROLLUP_FIELDS = HOURLY_FIELDS + ['hours']
+
+
+def bucket_start(seconds, interval):
+    """Start of the `interval` bucket holding `seconds` (epoch), works on arrays too."""
+    size, origin = INTERVALS[interval]
+    return seconds - (seconds - origin) % size
+
+
+def to_datetime(seconds):
+    return datetime.fromtimestamp(int(seconds), tz=dt_timezone.utc)
+
+
+def load_hourly(symbol, since=None):
+    """Hourly rows of `symbol` as (epoch seconds, values) arrays, values columns follow HOURLY_FIELDS."""
+    rows = CoinDetail.objects.for_symbol(symbol)
+    if since is not None:
+        rows = rows.filter(time__gte=since)
+    rows = list(rows.order_by('time').values_list('time', *HOURLY_FIELDS))
+
+    times = np.fromiter((row[0].timestamp() for row in rows), dtype=np.int64, count=len(rows))
+    # NULL prices become NaN
+    values = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, len(HOURLY_FIELDS))
+    return times, values
+
+
+def aggregate(times, values, interval):
+    """OHLCV per bucket of sorted hourly rows, returns (bucket starts, rows ordered like ROLLUP_FIELDS)."""
+    if not len(times):
+        return np.empty(0, dtype=np.int64), np.empty((0, len(ROLLUP_FIELDS)))
+
+    buckets, first = np.unique(bucket_start(times, interval), return_index=True)
+    last = np.append(first[1:], len(times)) - 1
+    volumes = np.nan_to_num(values[:, 4:6])
+    stats = np.column_stack([
+        values[first, 0],
+        np.fmax.reduceat(values[:, 1], first),
+        np.fmin.reduceat(values[:, 2], first),
+        values[last, 3],
+        np.add.reduceat(volumes[:, 0], first),
+        np.add.reduceat(volumes[:, 1], first),
+        last - first + 1,
+    ])
+    return buckets, stats
+
+
+def build_rollups(symbol, interval, times, values):
+    buckets, stats = aggregate(times, values, interval)
+    rollups = []
+    for bucket, row in zip(buckets.tolist(), stats.tolist()):
+        fields = {name: None if math.isnan(value) else value for name, value in zip(ROLLUP_FIELDS, row)}
+        fields['hours'] = int(fields['hours'])
+        rollups.append(CoinRollup(symbol=symbol, interval=interval, bucket=to_datetime(bucket), **fields))
+    return rollups
+
+
+def save_rollups(rollups):
+    CoinRollup.objects.bulk_create(
+        rollups,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['symbol', 'interval', 'bucket'],
+        update_fields=ROLLUP_FIELDS,
+    )
+
+
+def update_rollups(symbol, since):
+    """
+    Recompute only the buckets touched by hourly rows from `since` on. The
+    hours are read once from the start of the oldest touched bucket (the week).
+    """
+    since = int(since.timestamp())
+    starts = {interval: bucket_start(since, interval) for interval in INTERVALS}
+    times, values = load_hourly(symbol, since=to_datetime(min(starts.values())))
+
+    rollups = []
+    for interval, start in starts.items():
+        touched = times >= start
+        rollups += build_rollups(symbol, interval, times[touched], values[touched])
+    save_rollups(rollups)
+    return len(rollups)
+
+
+def rebuild_rollups(symbol):
+    times, values = load_hourly(symbol)
+    rollups = []
+    for interval in INTERVALS:
+        rollups += build_rollups(symbol, interval, times, values)
+
+    with transaction.atomic():
+        CoinRollup.objects.for_symbol(symbol).delete()
+        save_rollups(rollups)
+    return len(rollups)
+
+
+def check_rollups(symbol):
+    """Compare stored rollups with an aggregation of the hourly rows, returns a list of differences."""
+    times, values = load_hourly(symbol)
+    expected = {
+        (rollup.interval, rollup.bucket): rollup
+        for interval in INTERVALS
+        for rollup in build_rollups(symbol, interval, times, values)
+    }
+    stored = {(rollup.interval, rollup.bucket): rollup for rollup in CoinRollup.objects.for_symbol(symbol)}
+
+    problems = []
+    for key in sorted(expected.keys() - stored.keys()):
+        problems.append(f"{symbol} {key[0]} {key[1]:%Y-%m-%d %H:%M}: missing")
+    for key in sorted(stored.keys() - expected.keys()):
+        problems.append(f"{symbol} {key[0]} {key[1]:%Y-%m-%d %H:%M}: no hourly rows")
+    for key in sorted(expected.keys() & stored.keys()):
+        for name in ROLLUP_FIELDS:
+            want, have = getattr(expected[key], name), getattr(stored[key], name)
+            if want is None or have is None:
+                same = want is have
+            else:
+                same = math.isclose(want, have, rel_tol=1e-9, abs_tol=1e-9)
+            if not same:
+                problems.append(f"{symbol} {key[0]} {key[1]:%Y-%m-%d %H:%M}: {name} is {have}, expected {want}")
+    return problems
+
+
+def coarsest_interval(hours, points):
+    """Coarsest rollup interval with at least `points` buckets in `hours`, None when only hourly rows do."""
+    coarsest = None
+    for interval, (size, _) in INTERVALS.items():
+        if hours * HOUR / size >= points:
+            coarsest = interval
+    return coarsest
+
+
+def load_closes(symbol, since, interval=None):
+    """(epoch seconds, close) arrays of `symbol` from `since` on, read from the `interval` rollups or hourly rows."""
+    if interval is None:
+        rows = CoinDetail.objects.for_symbol(symbol) \
+            .filter(time__gte=since, close_price__isnull=False) \
+            .order_by('time').values_list('time', 'close_price')
+    else:
+        start = to_datetime(bucket_start(int(since.timestamp()), interval))
+        rows = CoinRollup.objects.for_symbol(symbol) \
+            .filter(interval=interval, bucket__gte=start, close_price__isnull=False) \
+            .order_by('bucket').values_list('bucket', 'close_price')
+    rows = list(rows)
+
+    times = np.fromiter((row[0].timestamp() for row in rows), dtype=np.int64, count=len(rows))
+    closes = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    return times, closes
@@ -9,13 +9,10 @@ import json
 from dotenv import load_dotenv
 import os
 
-from openai import OpenAI
+from api import http_client, llm
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI()
-
 analyzer = SentimentIntensityAnalyzer()
 
 
@@ -35,7 +32,7 @@ analyzer = SentimentIntensityAnalyzer()
 def get_news_data(coin):
     """Fetch news articles related to the given coin using NewsAPI."""
     try:
-        newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'))
+        newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'), session=http_client.session('newsapi'))
         all_articles = newsapi.get_everything(
             q=coin,
             language='en',
@@ -87,16 +84,15 @@ def summarize_news(news_data, coin):
     )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
+        summary = llm.complete(
+            [
                 {"role": "system", "content": "You are an expert crypto analyst who summarizes crypto news."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=300,
             temperature=0.7,
         )
-        return response.choices[0].message.content.strip()
+        return summary.strip()
     except Exception as e:
         return f"Error while summarizing: {str(e)}"
 
@@ -118,11 +114,20 @@ def sentiment_and_prediction_analysis(coin, future_predictions):
         return cached_result
 
     news_data = get_news_data(coin)
-    sentiment_label, avg_score = get_sentiment_analysis(news_data)
     summary = summarize_news(news_data, coin)
+    result = score_sentiment(news_data, future_predictions) + (summary,)
+
+    # simpan cache selama 1 jam
+    cache.set(cache_key, result, timeout=60 * 60)
+    return result
+
+
+def score_sentiment(news_data, future_predictions):
+    """Sentiment label, recommendation and final score (0-100) from the news and the forecast."""
+    sentiment_label, avg_score = get_sentiment_analysis(news_data)
 
     if future_predictions is None or len(future_predictions) < 2:
-        return sentiment_label, "Hold", 50.0, summary
+        return sentiment_label, "Hold", 50.0
 
     price_change = future_predictions[-1] - future_predictions[0]
     recommendation = "Hold"
@@ -136,11 +141,7 @@ def sentiment_and_prediction_analysis(coin, future_predictions):
     price_score = 100 if price_change > 0 else 50
     final_score = round((sentiment_score + price_score) / 2, 2)
 
-    result = (sentiment_label, recommendation, final_score, summary)
-
-    # simpan cache selama 1 jam
-    cache.set(cache_key, result, timeout=60 * 60)
-    return result
+    return sentiment_label, recommendation, final_score
 
 
 
@@ -150,9 +151,8 @@ def news_analyze(text):
     if cached:
         return cached
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
+    result = llm.complete(
+        [
             {"role": "system", "content": (
                 "You are a sentiment analysis and summarization bot. "
                 "Return JSON: {\"sentiment\": \"Good|Neutral|Bad\", \"summary\": \"30 to 40 word summary\"}"
@@ -161,9 +161,7 @@ def news_analyze(text):
         ],
         max_tokens=100,
         temperature=0.3,
-    )
-
-    result = response.choices[0].message.content.strip()
+    ).strip()
     print("GPT Response:", result)  # ✅ for debugging
 
     try:
@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 
 from .models import *
+from .plotting import plot_url
 
 import re
 
@@ -101,22 +102,59 @@ class CryptoInsightSerializer(serializers.ModelSerializer):
         fields = ['title', 'link', 'date', 'source', 'image', 'category']
 
 
-class BasePredictionSerializer(serializers.ModelSerializer):
+class PredictionPointSerializer(serializers.ModelSerializer):
+    # Shared fields of the run, same shape as the old per-coin prediction rows
+    created_at = serializers.DateTimeField(source='run.created_at')
+    original_plot = serializers.SerializerMethodField()
+    predicted_plot = serializers.SerializerMethodField()
+    price_analysis = serializers.JSONField(source='run.price_analysis')
+    sentiment_label = serializers.CharField(source='run.sentiment_label')
+    recommendation = serializers.CharField(source='run.recommendation')
+    final_score = serializers.FloatField(source='run.final_score')
+    summarize = serializers.CharField(source='run.summarize')
+
     class Meta:
-        model = BTCUSDT_Prediction  # default, nanti akan diganti dinamis di view
-        fields = '__all__'
+        model = PredictionPoint
+        fields = [
+            'id', 'created_at', 'date', 'predicted_price', 'original_plot', 'predicted_plot',
+            'price_analysis', 'sentiment_label', 'recommendation', 'final_score', 'summarize',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('include_plots', True):
+            self.fields.pop('original_plot')
+            self.fields.pop('predicted_plot')
+
+    def _plot_url(self, digest):
+        if not digest:
+            return None
+        return plot_url(digest, request=self.context.get('request'))
 
-        def to_representation(self, instance):
-            data = super().to_representation(instance)
-        
-            if 'price_analysis' in data and 'daily_explanations' in data['price_analysis']:
-                explanations = data['price_analysis']['daily_explanations']
-                data['price_analysis']['daily_explanations'] = [
-                    re.sub(r'^\d+\.\s*', '', exp) for exp in explanations
-                ]
-            
-            return data
-        
+    def get_original_plot(self, obj):
+        return self._plot_url(obj.run.original_plot_id)
 
+    def get_predicted_plot(self, obj):
+        return self._plot_url(obj.run.predicted_plot_id)
 
 
+class PredictionJobSerializer(serializers.ModelSerializer):
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PredictionJob
+        fields = [
+            'id', 'symbol', 'no_of_days', 'status', 'stage', 'progress', 'error',
+            'created_at', 'started_at', 'finished_at', 'result',
+        ]
+
+    def get_result(self, obj):
+        if obj.result is None:
+            return None
+        # Stored as digests, the URLs depend on the host the client called
+        request = self.context.get('request')
+        result = dict(obj.result)
+        for key in ('original_plot', 'predicted_plot'):
+            if result.get(key):
+                result[key] = plot_url(result[key], request=request)
+        return result
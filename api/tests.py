@@ -1,3 +1,759 @@
-from django.test import TestCase
+import asyncio
+import io
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import numpy as np
+import pandas as pd
+
+from django.core.cache import cache
+from django.core.cache.backends import locmem
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from django.apps import apps
+
+from api import caching, http_client, llm
+from api.coins import forget_coin_snapshots, get_coin
+from api.cache_backends import CacheSizeCollector, LocMemCache, MetricsMixin
+from api.downsampling import lttb, lttb_indices
+from api.forecasting import BASE_DAYS, ForecastEngine
+from api.kline_fetcher import fetch_range, split_ranges
+from api.models import (
+    Candle, CryptoInsight, CoinDetail, CoinRollup, LatestCoinSnapshot, LLMResponse, PredictionJob, RenderedPlot, SyncCheckpoint,
+    TrackedCoin,
+)
+from api.market_data import DAY_MS, upsert_candles
+from api.plotting import chart_digest, line_chart, line_series
+from api.ratelimit import TokenBucket
+from api.management.commands.bench_forecast import legacy_forecast
+from api.management.commands.bench_windowing import legacy_windows
+from api.management.commands.fetch_coin_detail import Command as FetchCoinDetail
+from api.management.commands.fetch_crypto_insight import Command as FetchCryptoInsight
+from api.management.commands.run_prediction_worker import Command as PredictionWorker
+from api.rollups import rebuild_rollups, update_rollups
+from api.windowing import iter_window_chunks, sliding_windows
+
+
+class CoinChartViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        TrackedCoin.objects.get_or_create(symbol='BTCUSDT', defaults={'base_asset': 'BTC'})
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        CoinDetail.objects.bulk_create([
+            CoinDetail(symbol='BTCUSDT', time=now - timedelta(hours=hour), close_price=100.0 + hour)
+            for hour in range(48)
+        ])
+        rebuild_rollups('BTCUSDT')
+
+    def test_downsampled_chart_on_cold_cache(self):
+        for query in ({'points': 10}, {'resolution': '4h'}):
+            cache.clear()
+            response = self.client.get('/api/v1/chart/BTC/', {'hours': 24, **query})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json())
+
+            # Second request is served from the cache
+            self.assertEqual(self.client.get('/api/v1/chart/BTC/', {'hours': 24, **query}).json(), response.json())
+
+    def test_out_of_range_hours_are_clamped(self):
+        for query in ({}, {'points': 10}, {'resolution': '1h'}):
+            response = self.client.get('/api/v1/chart/BTC/', {'hours': 10 ** 12, **query})
+            self.assertEqual(response.status_code, 200, query)
+            self.assertTrue(response.json())
+            self.assertEqual(self.client.get('/api/v1/chart/BTC/', {'hours': -10 ** 12, **query}).status_code, 200)
+
+
+class ChartDigestTests(TestCase):
+    def chart(self, x):
+        return line_chart('BTCUSDT', [line_series('Close Price', x, np.arange(len(x)))])
+
+    def test_equal_tz_aware_dates_share_a_digest(self):
+        first = pd.date_range('2025-01-01', periods=30, tz='UTC')
+        second = pd.date_range('2025-01-01', periods=30, tz='UTC')
+        self.assertEqual(np.asarray(first).dtype, object)
+        self.assertEqual(chart_digest(self.chart(first)), chart_digest(self.chart(second)))
+        self.assertNotEqual(
+            chart_digest(self.chart(first)),
+            chart_digest(self.chart(pd.date_range('2025-01-02', periods=30, tz='UTC'))),
+        )
+
+    def test_object_arrays_that_are_not_dates_are_rejected(self):
+        with self.assertRaises(TypeError):
+            chart_digest(self.chart(np.array([object(), object()], dtype=object)))
+
+
+class PlotImageTests(TestCase):
+    digest = 'ab' * 32
+
+    def test_served_with_etag_and_revalidated(self):
+        RenderedPlot.objects.create(digest=self.digest, content_type='image/png', image=b'png bytes')
+        response = self.client.get(f'/api/v1/plots/{self.digest}.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'png bytes')
+
+        response = self.client.get(f'/api/v1/plots/{self.digest}.png', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_digest_is_not_found_even_when_revalidating(self):
+        response = self.client.get(f'/api/v1/plots/{self.digest}.png', HTTP_IF_NONE_MATCH=f'"{self.digest}"')
+        self.assertEqual(response.status_code, 404)
+
+
+class PredictionJobViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        TrackedCoin.objects.get_or_create(symbol='BTCUSDT', defaults={'base_asset': 'BTC'})
+
+    def post(self, no_of_days, coin='BTCUSDT'):
+        return self.client.post(
+            '/api/v1/predictedCryptoData/', {'coin': coin, 'no_of_days': no_of_days},
+            content_type='application/json')
+
+    def test_no_of_days_is_bounded(self):
+        for no_of_days in (0, 31, 30000, 100000, 'x'):
+            self.assertEqual(self.post(no_of_days).status_code, 400, no_of_days)
+        self.assertFalse(PredictionJob.objects.exists())
+
+    def test_duplicate_requests_share_a_job(self):
+        first = self.post(7)
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(self.post(7).json()['id'], first.json()['id'])
+        self.assertEqual(self.client.get(first['Location']).json()['status'], PredictionJob.QUEUED)
+
+    def test_symbol_is_normalized_and_checked(self):
+        for coin in ('', 'NOTACOINUSDT', 'X' * 100, 12):
+            self.assertEqual(self.post(7, coin=coin).status_code, 400, coin)
+        self.assertFalse(PredictionJob.objects.exists())
+
+        first = self.post(7)
+        self.assertEqual(self.post(7, coin=' btcusdt ').json()['id'], first.json()['id'])
+        self.assertEqual(PredictionJob.objects.get().symbol, 'BTCUSDT')
+
+
+class PredictionJobQueueTests(TestCase):
+    def test_superseded_run_cannot_overwrite_the_newer_one(self):
+        PredictionJob.objects.enqueue('BTCUSDT', 7)
+        stuck = PredictionJob.objects.claim()
+        stuck.report('inference', 20)
+
+        # Heartbeat looks stale: the job is requeued and claimed by another run
+        PredictionJob.objects.filter(pk=stuck.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(PredictionJob.objects.requeue_stale(timedelta(minutes=10), max_attempts=3), (1, 0))
+        current = PredictionJob.objects.claim()
+        self.assertEqual((current.pk, current.attempts), (stuck.pk, 2))
+
+        self.assertFalse(stuck.finish({'future_plot': [1.0]}))
+        self.assertFalse(stuck.fail('late failure'))
+        self.assertTrue(current.finish({'future_plot': [2.0]}))
+
+        job = PredictionJob.objects.get(pk=stuck.pk)
+        self.assertEqual((job.status, job.result, job.error), (PredictionJob.DONE, {'future_plot': [2.0]}, ''))
+
+    def test_claim_hands_out_each_job_once(self):
+        for symbol in ('BTCUSDT', 'ETHUSDT'):
+            PredictionJob.objects.enqueue(symbol, 2)
+        claimed = {PredictionJob.objects.claim().symbol, PredictionJob.objects.claim().symbol}
+        self.assertEqual(claimed, {'BTCUSDT', 'ETHUSDT'})
+        self.assertIsNone(PredictionJob.objects.claim())
+
+
+@override_settings(HTTP_MAX_RETRY_AFTER=5)
+class RetryAfterTests(TestCase):
+    def test_sync_retry_after_is_capped(self):
+        retry = http_client.ProviderSession('http://provider', limiter=None).get_adapter('http://provider').max_retries
+        response = mock.Mock(headers={'Retry-After': '60'})
+        self.assertEqual(retry.get_retry_after(response), 5)
+        response.headers = {'Retry-After': '2'}
+        self.assertEqual(retry.get_retry_after(response), 2)
+        self.assertEqual(retry.backoff_max, 5)
+
+    def test_async_retry_delay_is_capped(self):
+        self.assertEqual(http_client.retry_delay(httpx.Response(429, headers={'Retry-After': '60'}), 0), 5)
+        self.assertEqual(http_client.retry_delay(httpx.Response(429, headers={'Retry-After': '1'}), 0), 1)
+        self.assertEqual(http_client.retry_delay(httpx.Response(503), 10), 5)
+
+    @override_settings(HTTP_MAX_RETRY_AFTER=0.05)
+    def test_kline_backfill_retries_are_capped(self):
+        answers = iter([
+            httpx.Response(429, headers={'Retry-After': '3600'}),
+            httpx.Response(503, headers={'Retry-After': 'Wed, 21 Oct 2065 07:28:00 GMT'}),
+            httpx.Response(200, json=[[0, '1', '1', '1', '1']]),
+        ])
+
+        async def fetch():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(answers))) as client:
+                return await fetch_range(client, TokenBucket(1000), 'http://binance', 'BTCUSDT', 0, 10 * 86400000)
+
+        start = time.monotonic()
+        self.assertEqual(asyncio.run(fetch()), [[0, '1', '1', '1', '1']])
+        self.assertLess(time.monotonic() - start, 1)
+
+
+class LLMGatewayTests(TransactionTestCase):
+    # The gateway reads and writes LLMResponse from its own pool threads
+
+    def setUp(self):
+        self.stub = llm.StubBackend(reply=lambda messages: 'stub answer')
+        self.previous = llm.set_backend(self.stub)
+        self.addCleanup(llm.set_backend, self.previous)
+        self.messages = [{'role': 'user', 'content': 'Summarize BTC'}]
+
+    def test_identical_requests_in_flight_share_one_call(self):
+        self.stub.latency = 0.3
+        futures = [llm.submit(self.messages) for _ in range(5)]
+        self.assertEqual(len(set(map(id, futures))), 1)
+        self.assertEqual([future.result() for future in futures], ['stub answer'] * 5)
+        self.assertEqual(self.stub.calls, 1)
+
+    def test_answers_are_kept_in_the_database(self):
+        self.assertEqual(llm.complete(self.messages, temperature=0.2), 'stub answer')
+        self.assertEqual(llm.complete(self.messages, temperature=0.2), 'stub answer')
+        self.assertEqual(self.stub.calls, 1)
+        row = LLMResponse.objects.get()
+        self.assertEqual((row.prompt_tokens, row.completion_tokens), (2, 2))
+
+        # Other params, cache=False, or an answer past LLM_CACHE_TTL all reach the backend
+        llm.complete(self.messages, temperature=0.7)
+        self.assertEqual(self.stub.calls, 2)
+        llm.complete(self.messages, cache=False, temperature=0.2)
+        self.assertEqual(self.stub.calls, 3)
+        with override_settings(LLM_CACHE_TTL=60):
+            LLMResponse.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+            llm.complete(self.messages, temperature=0.2)
+        self.assertEqual(self.stub.calls, 4)
+        self.assertEqual(LLMResponse.objects.count(), 2)
+
+    def test_errors_are_not_cached(self):
+        self.stub.reply = mock.Mock(side_effect=[RuntimeError('rate limited'), 'stub answer'])
+        with self.assertRaises(RuntimeError):
+            llm.complete(self.messages)
+        self.assertFalse(LLMResponse.objects.exists())
+        self.assertEqual(llm.complete(self.messages), 'stub answer')
+        self.assertEqual(self.stub.calls, 2)
+
+    def test_stub_answers_are_not_served_to_another_backend(self):
+        messages = self.messages
+        self.assertEqual(llm.complete(messages), 'stub answer')
+
+        openai = mock.Mock(spec=['name', 'complete'])
+        openai.name = 'openai'
+        openai.complete.return_value = llm.Completion('real answer', 3, 2)
+        llm.set_backend(openai)
+        self.assertEqual(llm.complete(messages), 'real answer')
+        openai.complete.assert_called_once()
+        self.assertEqual(LLMResponse.objects.count(), 2)
+
+
+class CacheMetricsTests(TestCase):
+    def test_backends_without_a_count_are_skipped(self):
+        class Uncounted(MetricsMixin, locmem.LocMemCache):
+            metrics_label = 'uncounted'
+
+        caches = {'default': LocMemCache('default', {}), 'other': Uncounted('other', {})}
+        caches['default'].set('key', 1)
+        with mock.patch('api.cache_backends.caches') as patched:
+            patched.settings = caches
+            patched.__getitem__.side_effect = caches.__getitem__
+            gauge, = CacheSizeCollector().collect()
+        self.assertEqual([sample.labels for sample in gauge.samples], [{'cache': 'default', 'backend': 'locmem'}])
+        self.assertEqual(gauge.samples[0].value, 1)
+
+    def test_ready_can_run_twice(self):
+        apps.get_app_config('api').ready()
+
+
+class SlidingWindowTests(TestCase):
+    def test_matches_the_append_loop(self):
+        series = np.random.default_rng(4).random((250, 1))
+        for window in (1, 10, 100, 249):
+            x, y = sliding_windows(series, window)
+            legacy_x, legacy_y = legacy_windows(series, window)
+            np.testing.assert_array_equal(x, legacy_x)
+            np.testing.assert_array_equal(y, legacy_y)
+
+    def test_short_series_and_dtype(self):
+        x, y = sliding_windows(np.arange(5.0), 10)
+        self.assertEqual((x.shape, y.shape), ((0, 10, 1), (0, 1)))
+
+        x, y = sliding_windows(np.arange(120.0), 100, dtype=np.float32)
+        self.assertEqual((x.dtype, x.shape, y.shape), (np.float32, (20, 100, 1), (20, 1)))
+
+    def test_chunks_cover_every_window(self):
+        series = np.arange(300.0)
+        chunks = list(iter_window_chunks(series, 100, chunk_size=64))
+        self.assertEqual([len(x) for x, _ in chunks], [64, 64, 64, 8])
+        np.testing.assert_array_equal(np.concatenate([x for x, _ in chunks]), sliding_windows(series, 100)[0])
+
+
+def reference_lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets point by point, as in Steinarsson's thesis."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    def edge(bucket):
+        # floor(bucket * (n - 2) / (threshold - 2)) + 1, exactly
+        return bucket * (n - 2) // (threshold - 2) + 1
+
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        avg_start = edge(i + 1)
+        avg_end = min(edge(i + 2), n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+
+        best, best_area = None, -1
+        for j in range(edge(i), edge(i + 1)):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+class LTTBTests(TestCase):
+    def test_matches_the_reference_implementation(self):
+        rng = np.random.default_rng(15)
+        for n, threshold in ((1000, 100), (999, 37), (50, 3), (500, 499), (10, 9)):
+            x = np.cumsum(rng.integers(1, 5, n)).astype(float)
+            y = np.cumsum(rng.normal(size=n))
+            self.assertEqual(lttb_indices(x, y, threshold).tolist(), reference_lttb(x.tolist(), y.tolist(), threshold))
+
+    def test_small_thresholds_keep_every_point(self):
+        self.assertEqual(lttb_indices(np.arange(10), np.arange(10), 2).tolist(), list(range(10)))
+        self.assertEqual(lttb_indices(np.arange(10), np.arange(10), 20).tolist(), list(range(10)))
+
+    def test_keeps_the_spike(self):
+        y = np.zeros(1000)
+        y[567] = 100
+        kept_x, kept_y = lttb(np.arange(1000), y, 20)
+        self.assertEqual((kept_x[0], kept_x[-1]), (0, 999))
+        self.assertIn(567, kept_x)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=20)
+        self.hours = [start + timedelta(hours=hour) for hour in range(24 * 20)]
+        CoinDetail.objects.bulk_create([
+            CoinDetail(symbol='BTCUSDT', time=time, open_price=i, high_price=i + 2, low_price=i - 1,
+                       close_price=i + 1, volume_from=1, volume_to=i)
+            for i, time in enumerate(self.hours)
+        ])
+
+    def check(self):
+        call_command('rebuild_rollups', 'BTCUSDT', '--check', stdout=io.StringIO())
+
+    def test_rebuilt_rollups_pass_the_check(self):
+        rebuild_rollups('BTCUSDT')
+        self.check()
+
+        day = CoinRollup.objects.filter(symbol='BTCUSDT', interval='1d', hours=24).order_by('bucket').first()
+        first = self.hours.index(day.bucket)
+        self.assertEqual(
+            (day.open_price, day.high_price, day.low_price, day.close_price, day.volume_from),
+            (first, first + 23 + 2, first - 1, first + 23 + 1, 24),
+        )
+
+    def test_check_reports_drift(self):
+        rebuild_rollups('BTCUSDT')
+        CoinRollup.objects.filter(symbol='BTCUSDT', interval='4h').update(close_price=0)
+        with self.assertRaises(CommandError):
+            self.check()
+
+    def test_incremental_update_matches_a_rebuild(self):
+        rebuild_rollups('BTCUSDT')
+        last = self.hours[-1]
+        CoinDetail.objects.bulk_create([
+            CoinDetail(symbol='BTCUSDT', time=last + timedelta(hours=hour), open_price=1, high_price=5,
+                       low_price=0, close_price=2, volume_from=3, volume_to=4)
+            for hour in range(1, 30)
+        ])
+        update_rollups('BTCUSDT', last + timedelta(hours=1))
+        self.check()
+
+
+class GetOrSetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def slow_fetch(self):
+        self.calls += 1
+        time.sleep(0.2)
+        return {'price': 1}
+
+    def test_concurrent_misses_fetch_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(caching.get_or_set('coin', self.slow_fetch, 60)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [{'price': 1}] * 10)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(caching.get_or_set('coin', self.slow_fetch, 60), {'price': 1})
+        self.assertEqual(self.calls, 1)
+
+    def test_errors_propagate_and_are_not_cached(self):
+        def failing():
+            raise http_client.UpstreamError('coingecko answered 503', 503)
+
+        with self.assertRaises(http_client.UpstreamError):
+            caching.get_or_set('coin', failing, 60)
+        self.assertIsNone(cache.get('coin:lock'))
+        self.assertEqual(caching.get_or_set('coin', self.slow_fetch, 60), {'price': 1})
+
+    def test_waits_for_the_worker_holding_the_lock(self):
+        # Another worker is fetching: it holds the lock and stores the value a little later
+        cache.add('coin:lock', 'other worker', 30)
+        threading.Timer(0.2, cache.set, ('coin', {'price': 2}, 60)).start()
+        self.assertEqual(caching.get_or_set('coin', self.slow_fetch, 60), {'price': 2})
+        self.assertEqual(self.calls, 0)
+
+    def test_stops_waiting_on_an_abandoned_lock(self):
+        cache.add('coin:lock', 'crashed worker', 30)
+        self.assertEqual(caching.get_or_set('coin', self.slow_fetch, 60, lock_timeout=0.2), {'price': 1})
+        self.assertEqual(self.calls, 1)
+
+
+class GetOrRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        return self.calls
+
+    def wait_for_refresh(self, key):
+        # The refresh job drops its lock once the new value is stored, or once it failed
+        deadline = time.monotonic() + 5
+        while cache.get(f'{key}:refresh') is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_miss_then_fresh_hit(self):
+        self.assertEqual(caching.get_or_refresh('chart', self.fetch, 60, 600), 1)
+        self.assertEqual(caching.get_or_refresh('chart', self.fetch, 60, 600), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_served_while_refreshed(self):
+        cache.set('chart', caching.Entry('old', time.time() - 1), 600)
+        self.assertEqual(caching.get_or_refresh('chart', self.fetch, 60, 600), 'old')
+        self.wait_for_refresh('chart')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(caching.get_or_refresh('chart', self.fetch, 60, 600), 1)
+
+    def test_failed_refresh_keeps_the_stale_value(self):
+        def failing():
+            raise http_client.UpstreamError('coingecko answered 503', 503)
+
+        cache.set('chart', caching.Entry('old', time.time() - 1), 600)
+        with mock.patch('builtins.print') as printed:
+            self.assertEqual(caching.get_or_refresh('chart', failing, 60, 600), 'old')
+            self.wait_for_refresh('chart')
+        printed.assert_called_once()
+        self.assertEqual(cache.get('chart').value, 'old')
+        # The lock is gone, so the next request tries again
+        self.assertEqual(caching.get_or_refresh('chart', self.fetch, 60, 600), 'old')
+        self.wait_for_refresh('chart')
+        self.assertEqual(cache.get('chart').value, 1)
+
+
+class ClassifyCategoriesTests(TestCase):
+    articles = [('Bitcoin tops 100k', 'BTC...'), ('Ether ETF inflows', 'ETH...'), ('Fed holds rates', '...')]
+
+    def classify(self, raw_output):
+        with mock.patch('api.llm.complete', return_value=raw_output) as complete, \
+                mock.patch('builtins.print'):
+            categories = FetchCryptoInsight().classify_categories(self.articles)
+        complete.assert_called_once()
+        return categories
+
+    def test_json_in_surrounding_text(self):
+        raw = 'Sure:\n```json\n{"1": "bitcoin", "2": " ETHEREUM ", "3": "GENERAL"}\n```'
+        self.assertEqual(self.classify(raw), ['BITCOIN', 'ETHEREUM', 'GENERAL'])
+
+    def test_partial_answer_defaults_to_general(self):
+        self.assertEqual(self.classify('{"2": "ETHEREUM"}'), ['GENERAL', 'ETHEREUM', 'GENERAL'])
+
+    def test_invalid_entries_are_skipped(self):
+        raw = '{"1": "DOGE", "x": "BITCOIN", "0": "SOLANA", "4": "SOLANA", "2": null, "3": "ALTCOIN"}'
+        self.assertEqual(self.classify(raw), ['GENERAL', 'GENERAL', 'ALTCOIN'])
+
+    def test_malformed_output_is_all_general(self):
+        for raw in ['{"1": "BITCOIN", "2": ', 'BITCOIN, ETHEREUM, GENERAL', '', '["BITCOIN"]']:
+            with self.subTest(raw=raw):
+                self.assertEqual(self.classify(raw), ['GENERAL'] * 3)
+
+    def test_articles_saved_by_a_concurrent_run_are_not_counted(self):
+        news = {'Data': [
+            {'title': title, 'body': 'body', 'url': f'https://news.example/{i}', 'source': 'Example',
+             'published_on': 1700000000}
+            for i, (title, _) in enumerate(self.articles)
+        ]}
+
+        def classify(command, articles):
+            # Another run saves the first article while this one waits for the LLM
+            CryptoInsight.objects.create(
+                title=articles[0][0], link='https://news.example/0', date=timezone.now(), source='Example')
+            return ['GENERAL'] * len(articles)
+
+        stdout = io.StringIO()
+        with mock.patch('api.http_client.get', return_value=mock.Mock(json=mock.Mock(return_value=news))), \
+                mock.patch.object(FetchCryptoInsight, 'classify_categories', classify), \
+                mock.patch('builtins.print'):
+            call_command('fetch_crypto_insight', stdout=stdout)
+        self.assertIn('Successfully saved 2 new', stdout.getvalue())
+        self.assertEqual(CryptoInsight.objects.count(), 3)
+
+    def test_no_articles_skip_the_request(self):
+        with mock.patch('api.llm.complete') as complete:
+            self.assertEqual(FetchCryptoInsight().classify_categories([]), [])
+        complete.assert_not_called()
+
+
+class AsyncGetOrRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        return self.calls
+
+    def request(self):
+        # Like an async view under WSGI: every request runs on an event loop that closes after it
+        return asyncio.run(caching.aget_or_refresh('chart', self.fetch, 60, 600))
+
+    def test_stale_hit_then_fresh_value(self):
+        cache.set('chart', caching.Entry('old', time.time() - 1), 600)
+        self.assertEqual(self.request(), 'old')
+        deadline = time.monotonic() + 5
+        while cache.get('chart:refresh') is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.request(), 1)
+        self.assertEqual(self.request(), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_each_loop_closes_its_client(self):
+        async def use_client():
+            client = http_client.async_client()
+            self.assertIs(http_client.async_client(), client)
+            await http_client.aclose_async_client()
+            return client
+
+        first, second = asyncio.run(use_client()), asyncio.run(use_client())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed and second.is_closed)
+
+
+def tiny_lstm():
+    """Untrained stand-in for the production model, same input and output shapes."""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(0)
+    return tf.keras.Sequential([
+        tf.keras.Input(shape=(BASE_DAYS, 1)),
+        tf.keras.layers.LSTM(4),
+        tf.keras.layers.Dense(1),
+    ])
+
+
+class ForecastEngineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = tiny_lstm()
+        cls.windows = np.random.default_rng(0).random((3, BASE_DAYS)).astype(np.float32)
+
+    def test_rollout_matches_the_predict_loop(self):
+        engine = ForecastEngine(self.model)
+        for steps in (1, 7):
+            forecast = engine.forecast(self.windows, steps)
+            self.assertEqual(forecast.shape, (3, steps))
+            legacy = np.stack([legacy_forecast(self.model, window, steps) for window in self.windows])
+            np.testing.assert_allclose(forecast, legacy, rtol=1e-5, atol=1e-6)
+
+    def test_shapes(self):
+        engine = ForecastEngine(self.model)
+        self.assertEqual(engine.forecast(self.windows[:, :, np.newaxis], 30).shape, (3, 30))
+        self.assertEqual(engine.forecast(self.windows, 0).shape, (3, 0))
+        many = engine.forecast_many({'BTCUSDT': self.windows[0], 'ETHUSDT': self.windows[1]}, 2)
+        np.testing.assert_allclose(many['ETHUSDT'], engine.forecast(self.windows[1:2], 2)[0], rtol=1e-5)
+        with self.assertRaises(ValueError):
+            engine.forecast(self.windows[:, :50], 2)
+
+
+def kline(open_time, close):
+    # Binance kline row: open time, OHLC, volume, close time, quote volume, trades, taker volumes
+    return [open_time, '1.0', '2.0', '0.5', str(close), '10.0', open_time + DAY_MS - 1, '100.0', 5, '1.0', '2.0']
+
+
+class UpsertCandlesTests(TestCase):
+    start = 1700006400000
+
+    def test_overlapping_page_updates_the_open_candle(self):
+        first = [kline(self.start + day * DAY_MS, 100 + day) for day in range(3)]
+        self.assertEqual(upsert_candles('BTCUSDT', first), (3, 0))
+
+        # Next sync starts at the newest stored candle, still open when first fetched
+        second = [kline(self.start + day * DAY_MS, 200 + day) for day in range(2, 5)]
+        self.assertEqual(upsert_candles('BTCUSDT', second), (2, 1))
+
+        closes = list(Candle.objects.for_symbol('BTCUSDT').order_by('timestamp').values_list('close', flat=True))
+        self.assertEqual(closes, [100, 101, 202, 203, 204])
+        self.assertEqual(upsert_candles('BTCUSDT', []), (0, 0))
+
+
+class SyncCheckpointTests(TestCase):
+    def run_sync(self, order, failing=()):
+        """fetch_crypto_data with the ranges finishing in `order` (indexes), those in `failing` with an error."""
+        cursors = []
+
+        def fetch(jobs, writer, concurrency):
+            # Writes as the command builds the coroutine, on this thread and its test transaction
+            ranges = split_ranges(*jobs['BTCUSDT'])
+            for index in order:
+                start_time, end_time = ranges[index]
+                if index in failing:
+                    writer('BTCUSDT', start_time, end_time, None, ValueError('timeout'))
+                else:
+                    writer('BTCUSDT', start_time, end_time, [kline(start_time, 1)], None)
+                checkpoint = SyncCheckpoint.objects.get(symbol='BTCUSDT')
+                cursors.append((checkpoint.cursor, checkpoint.completed))
+            self.ranges = ranges
+            return asyncio.sleep(0)
+
+        with mock.patch('api.management.commands.fetch_crypto_data.tracked_symbols', return_value=['BTCUSDT']), \
+                mock.patch('api.management.commands.fetch_crypto_data.fetch_klines_concurrently', new=fetch):
+            call_command('fetch_crypto_data', '--days', '2500', stdout=io.StringIO())
+        return cursors
+
+    def test_checkpoint_stays_at_the_contiguous_prefix(self):
+        cursors = self.run_sync(order=[2, 0, 1], failing=[1])
+        self.assertEqual(len(self.ranges), 3)
+        first = self.ranges[0]
+        self.assertEqual(cursors, [
+            (first[0], False),  # the last range finished first: nothing contiguous yet
+            (first[1], False),
+            (first[1], False),  # the middle one failed
+        ])
+
+    def test_checkpoint_completes_once_every_range_finished(self):
+        cursors = self.run_sync(order=[1, 2, 0])
+        self.assertEqual(cursors[-1], (self.ranges[-1][1], True))
+        self.assertEqual(Candle.objects.count(), 3)
+
+
+class CoinSnapshotTests(TestCase):
+    LIST_KEYS = {
+        'coin', 'image_url', 'current_price', 'high_price', 'low_price', 'volume_to',
+        'percent_change_24h', 'percent_change_7d', 'market_cap',
+    }
+    DETAIL_KEYS = {
+        'coin', 'time', 'open_price', 'high_price', 'low_price', 'close_price', 'volume_from', 'volume_to',
+        'market_cap', 'supply', 'max_supply', 'circulating_supply', 'image_url', 'description',
+        'percent_change_24h', 'percent_change_7d',
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.coin = get_coin('BTC')
+
+    def ingest(self, hours, close, change_24h):
+        """fetch_coin_detail for BTC with stubbed CryptoCompare and CoinGecko answers."""
+        now = int(timezone.now().timestamp()) // 3600 * 3600
+        answers = {
+            '/data/v2/histohour': {'Response': 'Success', 'Data': {'Data': [
+                {'time': now - hour * 3600, 'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                 'volumefrom': 10, 'volumeto': 1000}
+                for hour in hours
+            ]}},
+            '/data/pricemultifull': {'RAW': {'BTC': {'USDT': {
+                'MKTCAP': 2e12, 'SUPPLY': 19e6, 'MAXSUPPLY': 21e6, 'CIRCULATINGSUPPLY': 19e6,
+                'IMAGEURL': '/media/btc.png',
+            }}}},
+            '/coins/bitcoin': {'description': {'en': 'Bitcoin'},
+                               'market_data': {'price_change_percentage_24h': change_24h,
+                                               'price_change_percentage_7d': 5.0}},
+        }
+
+        def get(provider, url, **kwargs):
+            return mock.Mock(status_code=200, json=mock.Mock(return_value=answers[url]))
+
+        latest = CoinDetail.objects.for_symbol('BTCUSDT').order_by('-time').values_list('time', flat=True).first()
+        with mock.patch('api.http_client.get', side_effect=get):
+            FetchCoinDetail(stdout=io.StringIO()).fetch_coin_data(self.coin, latest, {})
+        forget_coin_snapshots()
+
+    def test_responses_keep_their_shape_after_an_ingest(self):
+        self.ingest(hours=[3, 2], close=100.0, change_24h=1.5)
+        self.ingest(hours=[2, 1], close=110.0, change_24h=-2.5)
+
+        listed = [row for row in self.client.get('/api/v1/allCoinDetailList/').json() if row['coin'] == 'BTC']
+        self.assertEqual(len(listed), 1)
+        self.assertEqual(set(listed[0]), self.LIST_KEYS)
+        self.assertEqual((listed[0]['current_price'], listed[0]['percent_change_24h']), (110.0, -2.5))
+        self.assertEqual(listed[0]['image_url'], 'https://www.cryptocompare.com/media/btc.png')
+
+        detail = self.client.get('/api/v1/coin/BTC/').json()
+        self.assertEqual(set(detail), self.DETAIL_KEYS)
+        self.assertEqual((detail['close_price'], detail['max_supply'], detail['description']), (110.0, 21e6, 'Bitcoin'))
+        self.assertEqual(CoinDetail.objects.for_symbol('BTCUSDT').count(), 3)
+        self.assertEqual(LatestCoinSnapshot.objects.count(), 1)
+
+
+@override_settings(PREDICTION_STAGE_TIMEOUTS={'price_analysis': 0.2, 'news': 5, 'news_summary': 5})
+class PredictionStageTests(TransactionTestCase):
+    # The plot pool stores RenderedPlot rows from its own threads
+
+    def setUp(self):
+        closes = 100 + np.cumsum(np.random.default_rng(0).normal(size=700))
+        df = pd.DataFrame({'Close': closes}, index=pd.date_range('2024-01-01', periods=700, freq='D'))
+        engine = ForecastEngine(tiny_lstm())
+
+        def slow_analysis(symbol, future_predictions):
+            time.sleep(1)
+            return 'too late'
+
+        for target, value in [
+            ('load_daily_closes', mock.Mock(return_value=df)),
+            ('registry', mock.Mock(get_engine=mock.Mock(return_value=engine))),
+            ('price_prediction_analysis', slow_analysis),
+            ('get_news_data', mock.Mock(side_effect=httpx.ConnectError('newsapi down'))),
+            ('summarize_news', mock.Mock()),
+        ]:
+            patcher = mock.patch(f'api.prediction_pipeline.{target}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_slow_and_failing_stages_are_left_out(self):
+        PredictionJob.objects.enqueue('BTCUSDT', 3)
+        job = PredictionJob.objects.claim()
+        with mock.patch('builtins.print'):
+            PredictionWorker(stdout=io.StringIO()).run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PredictionJob.DONE)
+        result = job.result
+        self.assertEqual(len(result['future_plot']), 3)
+        self.assertIsNone(result['predict_price_analysis'])
+        self.assertIsNone(result['summarize'])
+        self.assertEqual(sorted(result['meta']['partial']), ['news', 'price_analysis'])
+        stages = result['meta']['stages']
+        self.assertEqual(stages['price_analysis']['status'], 'timeout')
+        self.assertLess(stages['price_analysis']['seconds'], 1)
+        self.assertEqual(stages['news']['status'], 'error')
+        self.assertNotIn('news_summary', stages)
+        self.assertEqual({stages[name]['status'] for name in ('market_data', 'inference', 'plots')}, {'ok'})
+        self.assertEqual(RenderedPlot.objects.count(), 2)
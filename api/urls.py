@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.urls import path
+from api import async_views
 from api.views import *
 
 
@@ -22,6 +24,8 @@ urlpatterns = [
     path('fetchCryptoData/', FetchCryptoData.as_view(), name='fetch-crypto-data'),
     path('fetchCryptoChart/', FetchCryptoChart.as_view(), name='fetch-crypto-chart'),
     path('predictedCryptoData/', fetchCryptoPrediction.as_view(), name='predicted-crypto-data'),
+    path('predictionJobs/<int:pk>/', PredictionJobView.as_view(), name='prediction-job'),
+    path('plots/<slug:digest>.<str:fmt>', plot_image, name='plot-image'),
     path('cryptoList/', CryptoListView.as_view(), name='crypto-list'),
 
     # news
@@ -42,4 +46,16 @@ urlpatterns = [
     
     # user
     path('userFeedback/', UserFeedbackView.as_view(), name='user-feedback'),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_VIEWS:
+    # Async variants of the CoinGecko proxies, only under an ASGI server (backend/asgi.py): under
+    # WSGI each request would run them on an event loop of its own
+    urlpatterns += [
+        path('async/fetchCryptoData/', async_views.fetch_crypto_data, name='async-fetch-crypto-data'),
+        path('async/fetchCryptoChart/', async_views.fetch_crypto_chart, name='async-fetch-crypto-chart'),
+        path('async/topVolumeCoin/', async_views.top_volume_coins, name='async-top-volume-coin'),
+        path('async/trendingCoin/', async_views.trending_coins, name='async-trending-coin-view'),
+        path('async/marketCapRankings/', async_views.market_cap_rankings, name='async-market-cap'),
+        path('async/topExchangesRankings/', async_views.top_exchanges, name='async-top-exchanges'),
+    ]
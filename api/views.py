@@ -1,16 +1,6 @@
 import json
-from datetime import timedelta, datetime
-import base64
-import io
-from rest_framework_simplejwt.tokens import AccessToken
-import matplotlib.pyplot as plt
-import matplotlib
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import load_model
-import yfinance as yf
-import numpy as np
-import pandas as pd
-import requests
+import math
+from datetime import timedelta
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -19,10 +9,6 @@ from .serializers import *
 from django.contrib.auth import authenticate
 from django.core.cache import cache
 
-from concurrent.futures import ThreadPoolExecutor
-
-from newsapi import NewsApiClient
-
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from django.utils import timezone
@@ -30,11 +16,19 @@ from django.utils import timezone
 import os
 from dotenv import load_dotenv
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
 from django.db import connection, OperationalError
 
-from api.prediction_analysis import price_prediction_analysis
-from api.sentiment_analysis import sentiment_and_prediction_analysis, news_analyze
+from api import http_client
+from api.caching import get_or_refresh
+from api.coins import ALL_COIN_DETAILS_CACHE_KEY, get_coin, is_tracked, tracked_coins
+from api.downsampling import lttb_indices
+from api.http_client import UpstreamError
+from api.model_registry import registry
+from api.plotting import CONTENT_TYPES
+from api.rollups import INTERVALS, RESOLUTIONS, coarsest_interval, load_closes
 from api.models import CryptoSymbols
 
 from django.core.validators import validate_email
@@ -42,8 +36,6 @@ from django.core.exceptions import ValidationError
 
 from .models import *
 
-from pycoingecko import CoinGeckoAPI
-
 from rest_framework import generics
 
 load_dotenv()
@@ -51,11 +43,8 @@ load_dotenv()
 
 # Create your views here.
 
-matplotlib.use('Agg')
-
 # Authentications
 
-cg = CoinGeckoAPI()
 
 
 
@@ -94,6 +83,26 @@ class UserFeedbackDeleteView(generics.DestroyAPIView):
 
 
 
+def plot_image(request, digest, fmt):
+    # Content-addressed, so the same URL always serves the same bytes
+    etag = f'"{digest}"'
+    plots = RenderedPlot.objects.filter(digest=digest, content_type=CONTENT_TYPES.get(fmt))
+    if request.headers.get('If-None-Match') == etag:
+        # Only the existence check, the client already has the bytes
+        if not plots.exists():
+            return JsonResponse({"error": "Plot not found"}, status=404)
+        response = HttpResponse(status=304)
+    else:
+        plot = plots.first()
+        if plot is None:
+            return JsonResponse({"error": "Plot not found"}, status=404)
+        response = HttpResponse(bytes(plot.image), content_type=plot.content_type)
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 def health_check(request):
     db_status = "ok"
     try:
@@ -105,9 +114,17 @@ def health_check(request):
     except OperationalError as e:
         db_status = f"error: {str(e)}"
 
+    if registry.is_ready():
+        model_status = "ready"
+    elif registry.is_loaded():
+        model_status = "loaded"
+    else:
+        model_status = "not_loaded"
+
     return JsonResponse({
         "api": "ok",
         "database": db_status,
+        "model": model_status,
         "status": "ok" if db_status == "ok" else "error"
     })
 
@@ -168,6 +185,50 @@ class LogoutView(APIView):
             return Response({"message": "Invalid token"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# CoinGecko requests and the summaries cached from them, shared with api.async_views
+CHART_PERIODS = {"week": 7, "month": 30}
+TOP_VOLUME_PARAMS = {'vs_currency': 'usd', 'order': 'volume_desc', 'per_page': 10, 'page': 1}
+MARKET_CAP_PARAMS = {'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': 10, 'page': 1}
+
+
+def coin_summary(data):
+    return {
+        "Price": data["market_data"]["current_price"]["usd"],
+        "PriceChangePercentage": data["market_data"].get("price_change_percentage_24h"),
+        "MarketCap": data["market_data"]["market_cap"]["usd"],
+        "MarketCapChangePercentage": data["market_data"].get("market_cap_change_percentage_24h"),
+        "Volume24h": data["market_data"]["total_volume"]["usd"],
+        "FDV": data["market_data"].get("fully_diluted_valuation", {}).get("usd"),
+        "TotalSupply": data["market_data"].get("total_supply"),
+        "MaxSupply": data["market_data"].get("max_supply"),
+        "CirculatingSupply": data["market_data"].get("circulating_supply"),
+        "Rank": data.get("market_cap_rank"),
+        "ATH": data["market_data"]["ath"]["usd"],
+        "ATHChangePercentage": data["market_data"]["ath_change_percentage"]["usd"],
+        "ATHDate": data["market_data"]["ath_date"]["usd"],
+        "ATL": data["market_data"]["atl"]["usd"],
+        "ATLChangePercentage": data["market_data"]["atl_change_percentage"]["usd"],
+        "ATLDate": data["market_data"]["atl_date"]["usd"],
+        "Homepage": data["links"]["homepage"][0] if data["links"]["homepage"] else None,
+        "Explorer": data["links"]["blockchain_site"][0] if data["links"]["blockchain_site"] else None,
+        "Description": data["description"].get("en", ""),
+    }
+
+
+def trending_summary(data):
+    simplified = []
+    for coin in data.get('coins', [])[:10]:
+        price_btc = coin['item']['price_btc']
+
+        simplified.append({
+            'name': coin['item']['name'],
+            'symbol': coin['item']['symbol'],
+            'market_cap_rank': coin['item']['market_cap_rank'],
+            'price_btc': price_btc,
+        })
+    return simplified
+
+
 # fetch crypto historical api
 
 class FetchCryptoData(APIView):
@@ -177,43 +238,13 @@ class FetchCryptoData(APIView):
             if not coin:
                 return Response({"error": "Coin parameter is required"}, status=400)
 
-            cache_key = f"crypto_{coin}"
-            cached_data = cache.get(cache_key)
-
-            if cached_data:
-                return Response(cached_data, status=200)
-
-            url = f"https://api.coingecko.com/api/v3/coins/{coin}"
-            response = requests.get(url)
-            if response.status_code != 200:
-                return Response({"error": "Failed to fetch data from API"}, status=response.status_code)
-
-            data = response.json()
-            coin_data = {
-                "Price": data["market_data"]["current_price"]["usd"],
-                "PriceChangePercentage": data["market_data"].get("price_change_percentage_24h"),
-                "MarketCap": data["market_data"]["market_cap"]["usd"],
-                "MarketCapChangePercentage": data["market_data"].get("market_cap_change_percentage_24h"),
-                "Volume24h": data["market_data"]["total_volume"]["usd"],
-                "FDV": data["market_data"].get("fully_diluted_valuation", {}).get("usd"),
-                "TotalSupply": data["market_data"].get("total_supply"),
-                "MaxSupply": data["market_data"].get("max_supply"),
-                "CirculatingSupply": data["market_data"].get("circulating_supply"),
-                "Rank": data.get("market_cap_rank"),
-                "ATH": data["market_data"]["ath"]["usd"],
-                "ATHChangePercentage": data["market_data"]["ath_change_percentage"]["usd"],
-                "ATHDate": data["market_data"]["ath_date"]["usd"],
-                "ATL": data["market_data"]["atl"]["usd"],
-                "ATLChangePercentage": data["market_data"]["atl_change_percentage"]["usd"],
-                "ATLDate": data["market_data"]["atl_date"]["usd"],
-                "Homepage": data["links"]["homepage"][0] if data["links"]["homepage"] else None,
-                "Explorer": data["links"]["blockchain_site"][0] if data["links"]["blockchain_site"] else None,
-                "Description": data["description"].get("en", ""),
-            }
-
+            def fetch():
+                return coin_summary(http_client.get_json('coingecko', f"/coins/{coin}"))
 
-            cache.set(cache_key, coin_data, timeout=7200)
+            coin_data = get_or_refresh(f"crypto_{coin}", fetch, timeout=7200, stale_timeout=3600)
             return Response(coin_data, status=200)
+        except UpstreamError as e:
+            return Response({"error": "Failed to fetch data from API"}, status=e.status_code)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
@@ -227,206 +258,72 @@ class FetchCryptoChart(APIView):
             if not coin:
                 return Response({"error": "Coin parameter is required"}, status=400)
 
-            period_mapping = {"week": 7, "month": 30,}
-            if period not in period_mapping:
+            if period not in CHART_PERIODS:
                 return Response({"error": "Invalid period"}, status=400)
 
-            days = period_mapping[period]
-            cache_key_chart = f"crypto_history_{coin}_{days}"
-            cached_chart = cache.get(cache_key_chart)
+            days = CHART_PERIODS[period]
+            params = {"vs_currency": "usd", "days": days, "interval": "daily"}
 
-            if cached_chart:
-                return Response({"chart": cached_chart}, status=200)
+            def fetch():
+                data = http_client.get_json('coingecko', f"/coins/{coin}/market_chart", params=params)
+                return data.get("prices", [])
 
-            url_history = f"https://api.coingecko.com/api/v3/coins/{coin}/market_chart?vs_currency=usd&days={days}&interval=daily"
-            response = requests.get(url_history)
-            if response.status_code != 200:
-                return Response({"error": "Failed to fetch historical data from API"}, status=response.status_code)
-
-            data = response.json()
-            prices = data.get("prices", [])
+            # Empty answers are cached too, so unknown coins don't go upstream on every request
+            prices = get_or_refresh(f"crypto_history_{coin}_{days}", fetch, timeout=600, stale_timeout=3600)
             if not prices:
                 return Response({"error": "No historical data available"}, status=404)
-
-            cache.set(cache_key_chart, prices, timeout=600)
             return Response({"chart": prices}, status=200)
+        except UpstreamError as e:
+            return Response({"error": "Failed to fetch historical data from API"}, status=e.status_code)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
 
- # Get the full path
-model = load_model(
-    'D:/Documents/Haikal Politeknik Negeri Batam/Semester 6/PBL/crypto_price_prediction/backend/backend/api/lstm_model.keras')  # Load the model
-
-# helper function to convert matplotlib plots
-
-
-# image
-def plot_to_base64(fig):
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png')
-    buf.seek(0)
-    data = base64.b64encode(buf.getbuffer()).decode('ascii')
-    buf.close()
-    return f"data:image/png;base64,{data}"
-
-
 # Crypto Prediction
 class fetchCryptoPrediction(APIView):
     def post(self, request):
+        symbol = str(request.data.get("coin") or "").strip().upper()  # Contoh: 'BTCUSDT'
+        if not symbol:
+            return Response({"error": "Missing coin parameter."}, status=400)
+        if not is_tracked(symbol):
+            return Response({"error": "Symbol not supported"}, status=400)
         try:
-            symbol = request.data.get("coin")  # Contoh: 'BTCUSDT'
             no_of_days = int(request.data.get("no_of_days", 2))
-
-            if not symbol:
-                return Response({"error": "Missing coin parameter."}, status=400)
-
-            cache_key = f"{symbol}_{no_of_days}_prediction"
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                return Response(cached_data, status=200)
-
-            # Get Binance Kline data (daily candles)
-            end_time = int(datetime.now().timestamp() * 1000)
-            start_time = int((datetime.now() - timedelta(days=365 * 10)).timestamp() * 1000)
-
-            all_data = []
-            while start_time < end_time:
-                url = "https://api.binance.com/api/v3/klines"
-                params = {
-                    "symbol": symbol.upper(),
-                    "interval": "1d",
-                    "startTime": start_time,
-                    "limit": 1000
-                }
-                response = requests.get(url, params=params)
-                data = response.json()
-
-                if isinstance(data, dict) and data.get("code"):
-                    return Response({"error": data.get("msg", "Failed to fetch Binance data.")}, status=400)
-
-                if not data:
-                    break
-
-                all_data.extend(data)
-                last_time = data[-1][0]
-                start_time = last_time + 24 * 60 * 60 * 1000  # Next day
-
-            # Parse data
-            df = pd.DataFrame(all_data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_asset_volume', 'num_trades',
-                'taker_buy_base_vol', 'taker_buy_quote_vol', 'ignore'
-            ])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            df['Close'] = df['close'].astype(float)
-
-            if df.empty:
-                return Response({"error": "No historical data found for this coin."}, status=400)
-
-            coin_data = df[['Close']]
-            splitting_len = int(len(coin_data) * 0.8)
-            x_test = coin_data[["Close"]][splitting_len:]
-
-            if x_test.empty:
-                return Response({"error": "Not enough data to make a prediction."}, status=400)
-
-            # Scale data
-            scaler = MinMaxScaler(feature_range=(0, 1))
-            scaled_data = scaler.fit_transform(x_test)
-
-            base_days = 100
-            x_data, y_data = [], []
-            for i in range(base_days, len(scaled_data)):
-                x_data.append(scaled_data[i-base_days: i])
-                y_data.append(scaled_data[i])
-
-            if not x_data or not y_data:
-                return Response({"error": "Not enough data after scaling to make prediction."}, status=400)
-
-            x_data = np.array(x_data)
-            y_data = np.array(y_data)
-
-            # Predictions
-            predictions = model.predict(x_data)
-            inv_predictions = scaler.inverse_transform(predictions)
-            inv_y_test = scaler.inverse_transform(y_data)
-
-            plotting_data = pd.DataFrame({
-                'Original Test Data': inv_y_test.flatten(),
-                'Predicted Test Data': inv_predictions.flatten()
-            }, index=x_test.index[base_days:])
-
-            # Plot 1
-            fig1 = plt.figure(figsize=(15, 6))
-            plt.plot(coin_data['Close'], label='Close Price')
-            plt.title(f'{symbol.upper()} Closing Price Over Time')
-            plt.xlabel('Date')
-            plt.ylabel('Close Price')
-            plt.legend()
-            original_plot = plot_to_base64(fig1)
-            plt.close(fig1)
-
-            # Plot 2
-            fig2 = plt.figure(figsize=(15, 6))
-            plt.plot(plotting_data['Original Test Data'], label='Original Test Data', color='blue')
-            plt.plot(plotting_data['Predicted Test Data'], label='Predicted Test Data', color='red')
-            plt.legend()
-            plt.title('Original vs Predicted')
-            plt.xlabel('Date')
-            plt.ylabel('Close Price')
-            predicted_plot = plot_to_base64(fig2)
-            plt.close(fig2)
-
-            # Predict future prices
-            last_100 = coin_data.tail(100)
-            last_100_scaled = scaler.transform(last_100)
-            last_100_scaled = last_100_scaled.reshape(1, -1, 1)
-
-            future_predictions = []
-            for _ in range(no_of_days):
-                next_day = model.predict(last_100_scaled)
-                future_predictions.append(scaler.inverse_transform(next_day))
-                last_100_scaled = np.append(last_100_scaled[:, 1:, :], next_day.reshape(1, 1, -1), axis=1)
-
-            future_predictions = np.array(future_predictions).flatten()
-
-            # Analysis
-            price_analysis_data = price_prediction_analysis(symbol, future_predictions)
-            sentiment_label, recommendation, final_score, summarize = sentiment_and_prediction_analysis(
-                symbol, future_predictions)
-
-            result = {
-                "original_plot": original_plot,
-                "predicted_plot": predicted_plot,
-                "future_plot": future_predictions.tolist(),
-                "predict_price_analysis": price_analysis_data,
-                "sentiment_label": sentiment_label,
-                "recommendation": recommendation,
-                "final_score": final_score,
-                "summarize": summarize,
-            }
-
-            # Cache result
-            cache.set(cache_key, result, timeout=3600)
-            return Response(result, status=200)
-
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid no_of_days parameter."}, status=400)
+        if not 1 <= no_of_days <= settings.PREDICTION_MAX_DAYS:
+            return Response(
+                {"error": f"no_of_days must be between 1 and {settings.PREDICTION_MAX_DAYS}."}, status=400)
+
+        # Runs in the run_prediction_worker command, the client polls the job URL
+        job, _ = PredictionJob.objects.enqueue(
+            symbol, no_of_days, reuse_for=timedelta(seconds=settings.PREDICTION_RESULT_TTL))
+        serializer = PredictionJobSerializer(job, context={'request': request})
+        status_code = 200 if job.status == PredictionJob.DONE else 202
+        return Response(serializer.data, status=status_code, headers={
+            'Location': request.build_absolute_uri(reverse('prediction-job', kwargs={'pk': job.pk})),
+        })
+
+
+class PredictionJobView(APIView):
+    def get(self, request, pk):
+        job = PredictionJob.objects.filter(pk=pk).first()
+        if job is None:
+            return Response({"error": "Prediction job not found"}, status=404)
+        return Response(PredictionJobSerializer(job, context={'request': request}).data)
 
 # Top Volume Coins
 class TopVolumeCoinView(APIView):
     def get(self, request):
-        cached_data = cache.get('top_volume_coins')
-        if cached_data:
-            return Response(cached_data)
-
-        url = 'https://api.coingecko.com/api/v3/coins/markets'
-        params = {'vs_currency': 'usd', 'order': 'volume_desc', 'per_page': 10, 'page': 1}
-        response = requests.get(url, params=params).json()
-
-        cache.set('top_volume_coins', response, timeout=300)
+        try:
+            response = get_or_refresh(
+                'top_volume_coins',
+                lambda: http_client.get_json('coingecko', '/coins/markets', params=TOP_VOLUME_PARAMS),
+                timeout=300,
+                stale_timeout=3600,
+            )
+        except UpstreamError as e:
+            return Response({"error": "Failed to fetch data from API"}, status=e.status_code)
 
         return Response(response)
 
@@ -434,60 +331,46 @@ class TopVolumeCoinView(APIView):
 # Trending Coins
 class TrendingCoinView(APIView):
     def get(self, request):
-        cached_data = cache.get('trending_coins')
-        if cached_data:
-            return Response(cached_data)
-
-        # Ambil trending coins
-        trending_url = 'https://api.coingecko.com/api/v3/search/trending'
-        trending_data = requests.get(trending_url).json()
-
-        coins = trending_data.get('coins', [])[:10]
-        
-        simplified = []
-        for coin in coins:
-            price_btc = coin['item']['price_btc']
-
-            simplified.append({
-                'name': coin['item']['name'],
-                'symbol': coin['item']['symbol'],
-                'market_cap_rank': coin['item']['market_cap_rank'],
-                'price_btc': price_btc,
-            })
-
-        cache.set('trending_coins', simplified, timeout=300)
+        try:
+            # Ambil trending coins
+            simplified = get_or_refresh(
+                'trending_coins',
+                lambda: trending_summary(http_client.get_json('coingecko', '/search/trending')),
+                timeout=300,
+                stale_timeout=3600,
+            )
+        except UpstreamError as e:
+            return Response({"error": "Failed to fetch data from API"}, status=e.status_code)
 
         return Response(simplified)
     
 # market cap
 class MarketCapRankingView(APIView):
     def get(self, request):
-        
-        cached_data = cache.get('market_cap_rankings')
-        if cached_data:
-            return Response(cached_data)
-
-        url = 'https://api.coingecko.com/api/v3/coins/markets'
-        params = {'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': 10, 'page': 1}
-        response = requests.get(url, params=params).json()
-
-        cache.set('market_cap_rankings', response, timeout=300)
+        try:
+            response = get_or_refresh(
+                'market_cap_rankings',
+                lambda: http_client.get_json('coingecko', '/coins/markets', params=MARKET_CAP_PARAMS),
+                timeout=300,
+                stale_timeout=3600,
+            )
+        except UpstreamError as e:
+            return Response({"error": "Failed to fetch data from API"}, status=e.status_code)
 
         return Response(response)
 
 # top exchanges 
 class TopExchangesView(APIView):
     def get(self, request):
-        
-        cached_data = cache.get('top_exchanges')
-        if cached_data:
-            return Response(cached_data)
-
-        url = 'https://api.coingecko.com/api/v3/exchanges'
-        data = requests.get(url).json()
-        top_exchanges = data[:10]  # ini baru aman kalau data itu list
-
-        cache.set('top_exchanges', top_exchanges, timeout=300)
+        try:
+            top_exchanges = get_or_refresh(
+                'top_exchanges',
+                lambda: http_client.get_json('coingecko', '/exchanges')[:10],
+                timeout=300,
+                stale_timeout=3600,
+            )
+        except UpstreamError as e:
+            return Response({"error": "Failed to fetch data from API"}, status=e.status_code)
 
         return Response(top_exchanges)
     
@@ -556,72 +439,57 @@ class CryptoInsightNewsListView(APIView):
 
 
 
-COIN_MODELS = {
-    "BTC": BTCUSDTDetail,
-    "ETH": ETHUSDTDetail,
-    "BNB": BNBUSDTDetail,
-    "SOL": SOLUSDTDetail,
-    "XRP": XRPUSDTDetail,
-    "TON": TONUSDTDetail,
-    "ADA": ADAUSDTDetail,
-    "DOGE": DOGEUSDTDetail,
-    "AVAX": AVAXUSDTDetail,
-    "LINK": LINKUSDTDetail,
-    "DOT": DOTUSDTDetail,
-    "MATIC": MATICUSDTDetail,
-    "ICP": ICPUSDTDetail,
-    "LTC": LTCUSDTDetail,
-    "SHIB": SHIBUSDTDetail,
-    "BCH": BCHUSDTDetail,
-    "UNI": UNIUSDTDetail,
-    "APT": APTUSDTDetail,
-    "NEAR": NEARUSDTDetail,
-    "XLM": XLMUSDTDetail,
-}
-
 class AllCoinDetailListView(APIView):
     def get(self, request):
-        now = datetime.utcnow().strftime('%Y-%m-%d_%H')
-        cache_key = f"all_coin_details_{now}"
-        cached_data = cache.get(cache_key)
+        cached_data = cache.get(ALL_COIN_DETAILS_CACHE_KEY)
 
         if cached_data:
             return Response(cached_data)
 
+        # One read of the snapshot table, without the description text
+        coins = {coin.symbol: coin for coin in tracked_coins()}
+        snapshots = {
+            row['symbol']: row for row in LatestCoinSnapshot.objects.filter(symbol__in=coins).values(
+                'symbol', 'image_url', 'close_price', 'high_price', 'low_price', 'volume_to',
+                'percent_change_24h', 'percent_change_7d', 'market_cap',
+            )
+        }
+
         data = []
-        for coin_symbol, model in COIN_MODELS.items():
-            latest = model.objects.order_by('-time').first()
+        for symbol, coin in coins.items():
+            latest = snapshots.get(symbol)
             if latest:
                 data.append({
-                    "coin": coin_symbol,
-                    "image_url": latest.image_url,
-                    "current_price": latest.close_price,
-                    "high_price": latest.high_price,
-                    "low_price": latest.low_price,
-                    "volume_to": latest.volume_to,
-                    "percent_change_24h": latest.percent_change_24h,
-                    "percent_change_7d": latest.percent_change_7d,
-                    "market_cap": latest.market_cap,
+                    "coin": coin.base_asset,
+                    "image_url": latest['image_url'],
+                    "current_price": latest['close_price'],
+                    "high_price": latest['high_price'],
+                    "low_price": latest['low_price'],
+                    "volume_to": latest['volume_to'],
+                    "percent_change_24h": latest['percent_change_24h'],
+                    "percent_change_7d": latest['percent_change_7d'],
+                    "market_cap": latest['market_cap'],
                 })
 
-        cache.set(cache_key, data, timeout=3600)  # 1 hour cache
+        # Dropped by fetch_coin_detail when the snapshots change
+        cache.set(ALL_COIN_DETAILS_CACHE_KEY, data, timeout=3600)
         return Response(data)
     
 
 class CoinDetailView(APIView):
     def get(self, request, coin_symbol):
         coin_symbol = coin_symbol.upper()
-        model = COIN_MODELS.get(coin_symbol)
+        coin = get_coin(coin_symbol)
 
-        if not model:
+        if not coin:
             return Response({"error": "Coin not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        latest = model.objects.order_by('-time').first()
+        latest = LatestCoinSnapshot.objects.filter(pk=coin.symbol).first()
         if not latest:
             return Response({"error": "No data found for this coin"}, status=status.HTTP_404_NOT_FOUND)
 
         data = {
-            "coin": coin_symbol,
+            "coin": coin.base_asset,
             "time": latest.time,
             "open_price": latest.open_price,
             "high_price": latest.high_price,
@@ -642,20 +510,31 @@ class CoinDetailView(APIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
+# Upper bounds for ?points= and ?hours= of CoinChartView, longer windows overflow the datetime math
+CHART_MAX_POINTS = 5000
+CHART_MAX_HOURS = 24 * 365 * 20
+
+
 class CoinChartView(APIView):
     def get(self, request, coin_symbol):
         coin_symbol = coin_symbol.upper()
-        model = COIN_MODELS.get(coin_symbol)
-        if not model:
+        coin = get_coin(coin_symbol)
+        if not coin:
             return Response({"error": "Coin not found"}, status=404)
 
         try:
             hours = int(request.GET.get('hours', 24))
         except:
             hours = 24
+        hours = min(max(hours, 1), CHART_MAX_HOURS)
+
+        points = request.GET.get('points')
+        resolution = request.GET.get('resolution')
+        if points is not None or resolution is not None:
+            return self.downsampled(coin, hours, points, resolution)
 
         since = timezone.now() - timedelta(hours=hours)
-        queryset = model.objects.filter(time__gte=since).order_by('time')
+        queryset = CoinDetail.objects.for_symbol(coin.symbol).filter(time__gte=since).order_by('time')
 
         data = [
             {
@@ -665,38 +544,48 @@ class CoinChartView(APIView):
             for item in queryset
         ]
         return Response(data)
-    
 
+    def downsampled(self, coin, hours, points, resolution):
+        """
+        At most `points` LTTB-selected closes (or one per `resolution`) with
+        epoch-second times, read from the coarsest rollup that still has enough buckets.
+        """
+        if resolution is not None:
+            if resolution not in RESOLUTIONS:
+                return Response({"error": f"resolution must be one of {', '.join(RESOLUTIONS)}."}, status=400)
+            interval = resolution if resolution in INTERVALS else None
+            points = math.ceil(hours * 3600 / RESOLUTIONS[resolution])
+        else:
+            try:
+                points = int(points)
+            except ValueError:
+                return Response({"error": "Invalid points parameter."}, status=400)
+            interval = coarsest_interval(hours, points)
+        points = max(3, min(points, CHART_MAX_POINTS))
+
+        # Windows end on the hour so every request within it shares the cached series
+        window_end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        cache_key = f"coin_chart_{coin.symbol}_{hours}_{points}_{interval}_{int(window_end.timestamp())}"
+        cached_data = cache.get(cache_key)
+        if cached_data is not None:
+            return Response(cached_data)
+
+        times, closes = load_closes(coin.symbol, window_end - timedelta(hours=hours), interval)
+        keep = lttb_indices(times, closes, points)
+        data = [
+            {"time": t, "close_price": c}
+            for t, c in zip(times[keep].tolist(), closes[keep].tolist())
+        ]
+        cache.set(cache_key, data, timeout=600)
+        return Response(data)
+    
 
 
-coin_prediction_models = {
-    "BTCUSDT": BTCUSDT_Prediction,
-    "ETHUSDT": ETHUSDT_Prediction,
-    "BNBUSDT": BNBUSDT_Prediction,
-    "SOLUSDT": SOLUSDT_Prediction,
-    "XRPUSDT": XRPUSDT_Prediction,
-    "TONUSDT": TONUSDT_Prediction,
-    "ADAUSDT": ADAUSDT_Prediction,
-    "DOGEUSDT": DOGEUSDT_Prediction,
-    "AVAXUSDT": AVAXUSDT_Prediction,
-    "LINKUSDT": LINKUSDT_Prediction,
-    "DOTUSDT": DOTUSDT_Prediction,
-    "MATICUSDT": MATICUSDT_Prediction,
-    "ICPUSDT": ICPUSDT_Prediction,
-    "LTCUSDT": LTCUSDT_Prediction,
-    "SHIBUSDT": SHIBUSDT_Prediction,
-    "BCHUSDT": BCHUSDT_Prediction,
-    "UNIUSDT": UNIUSDT_Prediction,
-    "APTUSDT": APTUSDT_Prediction,
-    "NEARUSDT": NEARUSDT_Prediction,
-    "XLMUSDT": XLMUSDT_Prediction,
-}
 
 class PredictionAPIView(APIView):
     def get(self, request, symbol):
         symbol = symbol.upper()
-        model = coin_prediction_models.get(symbol)
-        if not model:
+        if not is_tracked(symbol):
             return Response({"error": "Symbol not supported"}, status=400)
 
         try:
@@ -706,27 +595,28 @@ class PredictionAPIView(APIView):
         except ValueError:
             return Response({"error": "Invalid days parameter."}, status=400)
 
-        cache_key = f"prediction_{symbol}_{days}"
+        # Plot URLs are only two digests per row, they can be skipped with ?plots=false
+        include_plots = request.GET.get("plots", "true").lower() not in ("0", "false", "no")
+
+        cache_key = f"prediction_{symbol}_{days}_{int(include_plots)}"
         cached_data = cache.get(cache_key)
         if cached_data:
             return Response(cached_data, status=200)
 
-        # ✅ Step 1: Ambil semua data, urut berdasarkan created_at terbaru
-        all_data = model.objects.all().order_by('-created_at')
-
-        # ✅ Step 2: Simpan hanya 1 entri per tanggal
-        unique_by_date = {}
-        for item in all_data:
-            if item.date not in unique_by_date:
-                unique_by_date[item.date] = item
-            if len(unique_by_date) == days:
-                break
+        # Newest prediction per date, resolved in the database with one query
+        fields = [
+            'id', 'date', 'predicted_price', 'symbol', 'created_at', 'run', 'run__created_at',
+            'run__price_analysis', 'run__sentiment_label', 'run__recommendation',
+            'run__final_score', 'run__summarize',
+        ]
+        if include_plots:
+            fields += ['run__original_plot', 'run__predicted_plot']
 
-        # ✅ Step 3: Urutkan hasil berdasarkan tanggal (dari paling lama ke terbaru)
-        final_data = sorted(unique_by_date.values(), key=lambda x: x.date, reverse=True)
+        final_data = PredictionPoint.objects.latest_per_date(symbol) \
+            .select_related('run').only(*fields)[:days]
 
-        # ✅ Step 4: Serialize & cache
-        serializer = BasePredictionSerializer(final_data, many=True)
+        serializer = PredictionPointSerializer(
+            final_data, many=True, context={'request': request, 'include_plots': include_plots})
         cache.set(cache_key, serializer.data, timeout=3600)
 
         return Response(serializer.data, status=200)
\ No newline at end of file
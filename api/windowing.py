@@ -0,0 +1,35 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from api.forecasting import BASE_DAYS
+
+
+def sliding_windows(series, window=BASE_DAYS, dtype=None):
+    """
+    LSTM inputs and targets for a 1-D (or (n, 1)) series.
+
+    Returns `x` of shape (n, window, 1) where x[i] = series[i:i + window] and
+    `y` of shape (n, 1) where y[i] = series[i + window]. Both are read-only
+    strided views on the series, nothing is copied unless `dtype` differs
+    from the series dtype (then the series is converted once).
+    """
+    values = np.asarray(series)
+    if dtype is not None:
+        values = values.astype(dtype, copy=False)
+    values = values.reshape(-1)
+
+    count = len(values) - window
+    if count <= 0:
+        return (np.empty((0, window, 1), dtype=values.dtype),
+                np.empty((0, 1), dtype=values.dtype))
+
+    x = sliding_window_view(values[:-1], window)[:, :, np.newaxis]
+    y = values[window:, np.newaxis]
+    return x, y
+
+
+def iter_window_chunks(series, window=BASE_DAYS, chunk_size=1024, dtype=None):
+    """Yield (x, y) slices of `sliding_windows` holding at most `chunk_size` windows each."""
+    x, y = sliding_windows(series, window=window, dtype=dtype)
+    for start in range(0, len(x), chunk_size):
+        yield x[start:start + chunk_size], y[start:start + chunk_size]
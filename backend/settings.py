@@ -14,6 +14,7 @@ from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
 
 import dj_database_url
 
@@ -101,6 +102,35 @@ DATABASES = {
 
 DATABASES["default"] = dj_database_url.parse(os.getenv("DJANGO_DB_URL"))
 
+# Cache shared by the workers, chosen by CACHE_URL:
+#   redis://host:6379/1      Redis, give the cache a database of its own
+#   fakeredis://             in-memory Redis for tests (needs the fakeredis package)
+#   file:///var/tmp/cache    files, shared by the workers of one host (cache.add is not atomic,
+#                            so api.caching locks are best effort across workers)
+#   (unset)                  per-process memory, development only
+# Keys are prefixed with CACHE_KEY_PREFIX; bump CACHE_VERSION to drop every cached value
+# after a change in what is stored. Backends in api.cache_backends export hit/miss/size metrics.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'api.cache_backends.LocMemCache',
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'backend'),
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
+    },
+}
+if CACHE_URL.startswith(('redis://', 'rediss://', 'unix://')):
+    CACHES['default'].update(BACKEND='api.cache_backends.RedisCache', LOCATION=CACHE_URL)
+elif CACHE_URL.startswith('fakeredis://'):
+    from fakeredis import FakeConnection
+
+    CACHES['default'].update(
+        BACKEND='api.cache_backends.RedisCache',
+        LOCATION='redis://localhost:6379/0',
+        OPTIONS={'connection_class': FakeConnection},
+    )
+elif CACHE_URL.startswith('file://'):
+    CACHES['default'].update(BACKEND='api.cache_backends.FileBasedCache', LOCATION=CACHE_URL[len('file://'):])
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -145,6 +175,93 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Auth user model
 AUTH_USER_MODEL = 'api.CustomUser'
 
+# Prediction models, loaded lazily by api.model_registry
+PREDICTION_MODELS = {
+    'lstm': os.environ.get('LSTM_MODEL_PATH', BASE_DIR / 'api' / 'lstm_model.keras'),
+}
+
+# Load the models and run a dummy inference in the background at boot
+PREDICTION_MODEL_WARMUP = os.environ.get('PREDICTION_MODEL_WARMUP', 'False').lower() in ('1', 'true', 'yes')
+
+# Binance market data, request weight budget shared by the concurrent kline fetcher
+BINANCE_API_URL = os.environ.get('BINANCE_API_URL', 'https://api.binance.com')
+BINANCE_WEIGHT_PER_MINUTE = int(os.environ.get('BINANCE_WEIGHT_PER_MINUTE', 1200))
+
+# Outbound HTTP, see api.http_client. `rate` is requests (Binance: request weight) per second,
+# shared by every thread and process on the host through the files in HTTP_RATE_LIMIT_DIR.
+HTTP_PROVIDERS = {
+    'binance': {
+        'base_url': BINANCE_API_URL,
+        'rate': BINANCE_WEIGHT_PER_MINUTE / 60,
+        'capacity': 50,
+    },
+    'coingecko': {
+        'base_url': os.environ.get('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3'),
+        'rate': float(os.environ.get('COINGECKO_RATE_PER_SECOND', 1)),
+        'capacity': 1,
+    },
+    'cryptocompare': {
+        'base_url': os.environ.get('CRYPTOCOMPARE_API_URL', 'https://min-api.cryptocompare.com'),
+        'rate': float(os.environ.get('CRYPTOCOMPARE_RATE_PER_SECOND', 10)),
+        'capacity': 10,
+    },
+    'newsapi': {
+        'base_url': os.environ.get('NEWSAPI_URL', 'https://newsapi.org/v2'),
+        'rate': float(os.environ.get('NEWSAPI_RATE_PER_SECOND', 1)),
+        'capacity': 5,
+    },
+}
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 3))
+# Longest wait before a retry (Retry-After or backoff), retries sleep in the request's thread
+HTTP_MAX_RETRY_AFTER = float(os.environ.get('HTTP_MAX_RETRY_AFTER', 5))
+# Connections of the httpx client shared by the async views, see api.async_views. Further requests
+# wait for a free one; httpcore scans the whole pool per request, so a few hundred costs more CPU
+# than the waiting saves.
+HTTP_ASYNC_POOL_SIZE = int(os.environ.get('HTTP_ASYNC_POOL_SIZE', 50))
+HTTP_RATE_LIMIT_DIR = os.environ.get('HTTP_RATE_LIMIT_DIR', os.path.join(tempfile.gettempdir(), 'backend-ratelimit'))
+
+# Routes of the async views (api.async_views), turned on by backend/asgi.py
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False').lower() in ('1', 'true', 'yes')
+
+# Threads refreshing stale cache entries in the background, see api.caching.get_or_refresh
+CACHE_REFRESH_WORKERS = int(os.environ.get('CACHE_REFRESH_WORKERS', 2))
+
+# fetchCryptoPrediction jobs, see api.models.PredictionJob and the run_prediction_worker command.
+# Forecasts are at most PREDICTION_MAX_DAYS long. A finished prediction is served again for
+# PREDICTION_RESULT_TTL seconds; a running job without a progress report for PREDICTION_JOB_TIMEOUT
+# seconds is retried, up to PREDICTION_JOB_MAX_ATTEMPTS runs.
+PREDICTION_WORKERS = int(os.environ.get('PREDICTION_WORKERS', 2))
+PREDICTION_MAX_DAYS = int(os.environ.get('PREDICTION_MAX_DAYS', 30))
+PREDICTION_RESULT_TTL = int(os.environ.get('PREDICTION_RESULT_TTL', 3600))
+PREDICTION_JOB_TIMEOUT = int(os.environ.get('PREDICTION_JOB_TIMEOUT', 600))
+PREDICTION_JOB_MAX_ATTEMPTS = int(os.environ.get('PREDICTION_JOB_MAX_ATTEMPTS', 2))
+# Network-bound analysis of a prediction, see api.prediction_pipeline. A stage past its timeout
+# (seconds) is left out of the result instead of holding up the job.
+PREDICTION_ANALYSIS_WORKERS = int(os.environ.get('PREDICTION_ANALYSIS_WORKERS', 6))
+PREDICTION_STAGE_TIMEOUTS = {
+    'price_analysis': float(os.environ.get('PREDICTION_PRICE_ANALYSIS_TIMEOUT', 45)),
+    'news': float(os.environ.get('PREDICTION_NEWS_TIMEOUT', 10)),
+    'news_summary': float(os.environ.get('PREDICTION_NEWS_SUMMARY_TIMEOUT', 30)),
+}
+
+# Chat completions, see api.llm. LLM_BACKEND=stub answers offline without an OpenAI key.
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'openai')
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-3.5-turbo')
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 86400))
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 60))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+LLM_STUB_LATENCY = float(os.environ.get('LLM_STUB_LATENCY', 0))
+
+# Chart rendering, see api.plotting
+PLOT_RENDER_WORKERS = int(os.environ.get('PLOT_RENDER_WORKERS', 2))
+
+# Used to build absolute plot URLs outside of a request (management commands)
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', '')
+
 # default authentication
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [